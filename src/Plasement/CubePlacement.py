@@ -1,16 +1,33 @@
-import json
 import random
-import math
-import os
 from typing import List, Tuple
 
+import numpy as np
+
+from clearance import ClearanceMap
+from constraints import (
+    BATCH_SIZE,
+    Candidates,
+    compile_constraints,
+    feasible_mask,
+    item_approach_targets,
+    reserve_zones,
+    sample_candidates,
+)
+from debug_raster import RejectMap, debug_snapshot
+from footprint import load_footprint
 from glb_parser import load_room_from_glb, Room
-from pathfinding_astar import find_path_to_object
+from groups import Group, form_groups, load_templates, wall_contact
+from heightfield import HeightField, sample_on_top
+from pathfinding_astar import HUMAN_SIZE, build_walk_grid, reachable_mask
+from precheck import InfeasibleRequest, precheck
+from scene_store import SceneStore
+from shared_room import StaticRoom, entry_sources
+from wall_slots import WallIntervals, sample_slot_size, sample_wall_slots
 
 
-DEFAULT_GLB = "src/data/input/room.glb"
-DEFAULT_JSON = "src/data/input/objects.json"
-OUTPUT_JSON = "src/data/output/placement_result.json"
+# None — непрерывный поворот; число — дискретный шаг в градусах.
+# Предмет может переопределить через constraints.rotation_step_deg.
+ROTATION_STEP_DEG = None
 
 
 # ============================================================
@@ -18,9 +35,15 @@ OUTPUT_JSON = "src/data/output/placement_result.json"
 # ============================================================
 
 class Item:
-    def __init__(self, name, min_size, max_size, color, extra):
+    __slots__ = ("name", "sx", "sy", "sz", "min_size", "max_size", "color", "extra", "rules", "footprint")
+
+    def __init__(self, name, min_size, max_size, color, extra, mesh=None):
         self.name = name
 
+        # допустимый диапазон размеров (м) — нужен для ресайза при ремонте
+        self.min_size = tuple(v / 1000.0 for v in min_size)
+        self.max_size = tuple(v / 1000.0 for v in max_size)
+
         # случайный размер из диапазона (мм → м)
         self.sx = random.uniform(min_size[0], max_size[0]) / 1000.0
         self.sy = random.uniform(min_size[1], max_size[1]) / 1000.0
@@ -29,223 +52,342 @@ class Item:
         self.color = color
         self.extra = extra or {}
 
+        # ограничения разбираются один раз (кэш по содержимому в constraints.py)
+        self.rules = compile_constraints(self.extra, ROTATION_STEP_DEG)
 
-class PlacedItem:
-    def __init__(
-        self,
-        item: Item,
-        center: Tuple[float, float, float],
-        rotation_deg: float,
-        wall_contact_side: str | None = None,
-    ):
-        self.item = item
-        self.cx, self.cy, self.cz = center
-        self.rotation = rotation_deg  # в градусах (0..360)
-        self.wall_contact_side = wall_contact_side  # "front/back/left/right" или None
-
-        # реальный размер AABB в XY после поворота
-        self.rx, self.ry = rotated_size(item.sx, item.sy, rotation_deg)
-
-    # ---------- геометрия ----------
-
-    def aabb(self):
-        return {
-            "x_min": self.cx - self.rx / 2,
-            "x_max": self.cx + self.rx / 2,
-            "y_min": self.cy - self.ry / 2,
-            "y_max": self.cy + self.ry / 2,
-            "z_min": self.cz - self.item.sz / 2,
-            "z_max": self.cz + self.item.sz / 2,
-        }
-
-    def forward_vector(self) -> Tuple[float, float, float]:
-        """
-        Направление "вперёд" предмета в мировых координатах.
-        По соглашению: локальная ось +Y.
-        """
-        a = math.radians(self.rotation)
-        dx = math.cos(a)
-        dy = math.sin(a)
-        return dx, dy, 0.0
-
-    def local_sides(self) -> dict:
-        """
-        Центры каждой стороны (front/back/left/right/top/bottom)
-        в мировых координатах.
-        """
-        rx, ry = self.rx, self.ry
-        cx, cy, cz = self.cx, self.cy, self.cz
-        a = math.radians(self.rotation)
-
-        dx = math.cos(a)  # "вперёд"
-        dy = math.sin(a)
-
-        return {
-            "front": (cx + dx * ry / 2, cy + dy * ry / 2, cz),
-            "back":  (cx - dx * ry / 2, cy - dy * ry / 2, cz),
-            "right": (cx + dy * rx / 2, cy - dx * rx / 2, cz),
-            "left":  (cx - dy * rx / 2, cy + dx * rx / 2, cz),
-            "top":   (cx, cy, cz + self.item.sz / 2),
-            "bottom": (cx, cy, cz - self.item.sz / 2),
-        }
-
-    def is_side_touching_wall(self, side: str, room: Room, epsilon: float = 0.02) -> bool:
-        """
-        Проверка, что указанная сторона действительно у стенки комнаты.
-        Пока по AABB.
-        """
-        box = self.aabb()
-
-        if side == "front":
-            return abs(box["y_min"] - room.y_min) < epsilon
-        if side == "back":
-            return abs(box["y_max"] - room.y_max) < epsilon
-        if side == "left":
-            return abs(box["x_min"] - room.x_min) < epsilon
-        if side == "right":
-            return abs(box["x_max"] - room.x_max) < epsilon
+        # mesh — необязательная модель предмета: узкая фаза столкновений
+        # идёт по выпуклым оболочкам её следа (кэш по файлу в footprint.py)
+        self.footprint = load_footprint(mesh) if mesh else None
 
-        return False
+    @property
+    def size(self) -> Tuple[float, float, float]:
+        return self.sx, self.sy, self.sz
+
+    def set_size(self, size):
+        """Новый размер (м), зажатый в диапазон каталога."""
+        self.sx, self.sy, self.sz = (
+            min(hi, max(lo, float(v))) for v, lo, hi in zip(size, self.min_size, self.max_size)
+        )
+
+    def shrink(self, fraction: float):
+        """Сдвигает размер к минимальному на долю fraction оставшегося запаса."""
+        self.set_size(v - (v - lo) * fraction for v, lo in zip(self.size, self.min_size))
+
+    def at_min_size(self) -> bool:
+        return all(v <= lo + 1e-9 for v, lo in zip(self.size, self.min_size))
+
+
+# Размещённые предметы живут в SceneStore (массивы центров/размеров/AABB),
+# scene_store.PlacedItem — лёгкое представление одного из них по индексу.
 
 
 # ============================================================
 # ГЕОМЕТРИЯ
 # ============================================================
 
-def rotated_size(sx: float, sy: float, angle_deg: float) -> Tuple[float, float]:
+def random_rotation(item: Item) -> float:
     """
-    Корректный AABB в плоскости XY при произвольном повороте.
+    Поворот вокруг Z. Предметы у стены прижимаются гранью целиком,
+    поэтому для них только 0/90/180/270; остальные — шаг или любой угол.
     """
-    a = math.radians(angle_deg)
-    cos_a = abs(math.cos(a))
-    sin_a = abs(math.sin(a))
+    return item.rules.random_rotation()
+
 
-    rx = sx * cos_a + sy * sin_a
-    ry = sx * sin_a + sy * cos_a
-    return rx, ry
+def item_center_z(room: Room, item: Item) -> float:
+    """
+    Высота центра по правилам крепления (mount_height_m, потолок, стена, пол).
+    """
+    return item.rules.center_z(room, item.sz)
 
 
-def aabb_intersect(a, b) -> bool:
-    return not (
-        a["x_max"] <= b["x_min"] or
-        a["x_min"] >= b["x_max"] or
-        a["y_max"] <= b["y_min"] or
-        a["y_min"] >= b["y_max"] or
-        a["z_max"] <= b["z_min"] or
-        a["z_min"] >= b["z_max"]
-    )
+# ============================================================
+# РАССТАНОВКА С ПОВОРОТАМИ И КОНСТРЕЙНТАМИ
+# ============================================================
 
+SAMPLES_PER_ITEM = 800  # кандидатов на предмет за одну глобальную попытку
+SIZE_STAGES = 3         # размеров на предмет за попытку: исходный, затем всё ближе к min_size_mm
 
-def inside_room(aabb, room: Room) -> bool:
-    return (
-        aabb["x_min"] >= room.x_min and
-        aabb["x_max"] <= room.x_max and
-        aabb["y_min"] >= room.y_min and
-        aabb["y_max"] <= room.y_max and
-        aabb["z_min"] >= room.z_min and
-        aabb["z_max"] <= room.z_max
-    )
 
+class PlacementError(RuntimeError):
+    """
+    Расстановка не удалась. placed — лучшая частичная расстановка
+    (больше всего размещённых предметов) — стартовая точка для repair.
+    """
+
+    def __init__(self, message: str, placed: SceneStore):
+        super().__init__(message)
+        self.placed = placed
 
-# ============================================================
-# СЛУЧАЙНОЕ ПОЛОЖЕНИЕ
-# ============================================================
 
-def random_center(room: Room, rx: float, ry: float, sz: float) -> Tuple[float, float, float]:
+def place_item(
+    room: Room,
+    placed: SceneStore,
+    item: Item,
+    walls: WallIntervals = None,
+    heights: HeightField = None,
+    deadline=None,
+) -> bool:
     """
-    Случайный центр внутри комнаты (по XY и Z, до поправок on_floor/under_ceiling/mount_height).
+    Пытается поставить один предмет. Кандидаты сэмплируются пачками
+    сразу в допустимой области (стена, угол, free_side внутри комнаты)
+    и проверяются векторно против всей сцены (constraints.feasible_mask).
+    Берётся первый допустимый; его свободные зоны резервируются в сцене.
+
+    walls — свободные участки вдоль стен: предметы у стены и в углу
+    берут кандидатов прямо из свободных слотов (wall_slots.py).
+    heights — карта опор: предметы on_top встают на верхние грани
+    уже поставленных (heightfield.py).
+
+    Размер — тоже измерение поиска: бюджет кандидатов делится на
+    SIZE_STAGES этапов, и если при текущем размере места нет, предмет
+    уменьшается (resize_to_fit) и ищется заново. Уменьшенный размер
+    остаётся у предмета и на следующие попытки. Предмет, который
+    уменьшить нельзя, тратит весь бюджет на свой текущий размер.
+
+    deadline — anytime.Deadline: когда время вышло (или расстановку
+    отменили), поиск бросается после текущей пачки кандидатов.
     """
-    return (
-        random.uniform(room.x_min + rx / 2, room.x_max - rx / 2),
-        random.uniform(room.y_min + ry / 2, room.y_max - ry / 2),
-        random.uniform(room.z_min + sz / 2, room.z_max - sz / 2),
-    )
+    batches = -(-SAMPLES_PER_ITEM // (BATCH_SIZE * SIZE_STAGES))
+
+    for stage in range(SIZE_STAGES):
+        if stage and not resize_to_fit(room, item, walls, last=stage == SIZE_STAGES - 1):
+            # уменьшать некуда — бюджет оставшихся этапов уходит на текущий размер
+            return _place_sized(room, placed, item, walls, heights, batches * (SIZE_STAGES - stage), deadline)
+        if _place_sized(room, placed, item, walls, heights, batches, deadline):
+            return True
+
+    return False
+
+
+def resize_to_fit(room: Room, item: Item, walls: WallIntervals = None, last: bool = False) -> bool:
+    """
+    Уменьшает предмет после неудачи. Предметы у стены берут размер из
+    свободного слота (вдоль стены — не длиннее свободного участка,
+    wall_slots.sample_slot_size), остальные — на полпути к min_size_mm
+    (last=True — сразу минимальный). False — уменьшать некуда.
+    """
+    if item.at_min_size():
+        return False
+
+    rules = item.rules
+    if walls is not None and rules.wall_side is not None and rules.mount != "on_top":
+        size = sample_slot_size(walls, rules, room, item.min_size, item.size)
+        if size is None:
+            return False
+        item.set_size(size)
+    else:
+        item.shrink(1.0 if last else 0.5)
+    return True
+
+
+def _place_sized(
+    room: Room,
+    placed: SceneStore,
+    item: Item,
+    walls: WallIntervals,
+    heights: HeightField,
+    batches: int,
+    deadline=None,
+) -> bool:
+    """batches пачек кандидатов при текущем размере предмета."""
+    rules = item.rules
+
+    for _ in range(batches):
+        if deadline is not None and deadline.expired():
+            return False
+        cand = _sample_batch(room, placed, item, walls, heights)
+        if cand is None:
+            return False
+        mask = feasible_mask(cand, rules, placed, room, item.sx, item.sy, item.sz, footprint=item.footprint)
+        _note_rejects(placed, cand, mask)
+        ok = np.flatnonzero(mask)
+        if ok.size == 0:
+            continue
+
+        k = int(ok[0])
+        index = placed.add(
+            item,
+            (float(cand.cx[k]), float(cand.cy[k]), float(cand.cz[k])),
+            float(cand.rot[k]),
+            cand.walls[k],
+        )
+        reserve_zones(placed, index, rules, room)
+        if walls is not None:
+            walls.add_item(placed, index)
+        if heights is not None:
+            heights.add_item(placed, index)
+        return True
+
+    return False
+
+
+def _note_rejects(placed: SceneStore, cand: Candidates, mask: np.ndarray):
+    """Кандидаты, отсеянные feasible_mask, — в тепловую карту сцены (если она ведётся)."""
+    if placed.rejects is not None:
+        miss = cand.valid & ~mask
+        placed.rejects.add(cand.cx[miss], cand.cy[miss])
+
+
+def _sample_batch(room: Room, placed: SceneStore, item, walls: WallIntervals, heights: HeightField):
+    """
+    Пачка кандидатов для предмета (или группы): on_top — по карте опор,
+    у стены — из свободных слотов, иначе — по всей допустимой области.
+    None — опор для on_top нет.
+    """
+    rules = item.rules
+    if rules.mount == "on_top":
+        return sample_on_top(heights, placed, rules, room, item.sx, item.sy, item.sz) if heights else None
+
+    cand = None
+    if walls is not None and rules.wall_side is not None:
+        cand = sample_wall_slots(walls, rules, room, item.sx, item.sy, item.sz)
+    if cand is None:
+        cand = sample_candidates(rules, room, item.sx, item.sy, item.sz)
+    return cand
 
 
 # ============================================================
-# РАССТАНОВКА С ПОВОРОТАМИ И КОНСТРЕЙНТАМИ
+# ЖЁСТКИЕ ГРУППЫ (groups.py)
 # ============================================================
 
-def place_all(room: Room, items: List[Item]) -> List[PlacedItem]:
+GROUP_POSES_PER_BATCH = 4  # сколько допустимых положений оболочки проверять поучастно за пачку
+
+
+def place_group(
+    room: Room,
+    placed: SceneStore,
+    group: Group,
+    walls: WallIntervals = None,
+    heights: HeightField = None,
+    deadline=None,
+) -> bool:
     """
-    Рандомная расстановка с учётом:
-      - поворота (шаг 30°),
-      - mount_height_m (настенные/висячие),
-      - under_ceiling,
-      - "по умолчанию всё на полу".
+    Ставит группу как один предмет: кандидаты ищутся для оболочки
+    (все участники + общие свободные полосы) с ограничениями группы,
+    затем для первых допустимых положений оболочки каждый участник
+    проверяется одним кандидатом против сцены (_members_fit). Участники
+    добавляются в сцену как обычные предметы; общие полосы резервируются
+    зонами опорного. Размеры, как в place_item, уменьшаются по этапам.
     """
+    batches = -(-SAMPLES_PER_ITEM // (BATCH_SIZE * SIZE_STAGES))
 
-    for global_try in range(60):
-        placed: List[PlacedItem] = []
-        failed = False
+    for stage in range(SIZE_STAGES):
+        if stage:
+            if group.at_min_size():
+                return False
+            group.shrink(1.0 if stage == SIZE_STAGES - 1 else 0.5)
+
+        for _ in range(batches):
+            if deadline is not None and deadline.expired():
+                return False
+            cand = _sample_batch(room, placed, group, walls, heights)
+            mask = feasible_mask(cand, group.rules, placed, room, *group.size)
+            _note_rejects(placed, cand, mask)
+            ok = np.flatnonzero(mask)
+
+            for k in ok[:GROUP_POSES_PER_BATCH].tolist():
+                poses = _members_fit(room, placed, group, float(cand.cx[k]), float(cand.cy[k]), float(cand.rot[k]))
+                if poses is not None:
+                    commit_group(room, placed, group, poses, float(cand.cx[k]), float(cand.cy[k]), float(cand.rot[k]), walls, heights)
+                    return True
+
+    return False
+
+
+def _members_fit(room: Room, placed: SceneStore, group: Group, cx: float, cy: float, rot: float):
+    """
+    Поучастная проверка (по одному кандидату на участника): внутри
+    комнаты, прижат к стене, если должен, и допустим против сцены
+    (feasible_mask). Участники друг с другом не сверяются — их взаимное
+    положение задано шаблоном. Возвращает [(центр, поворот, стена)] или None.
+    """
+    poses = []
+    for item, (x, y, r) in zip(group.members, group.poses(cx, cy, rot).tolist()):
+        rules = item.rules
+        wall = None
+        if rules.wall_side is not None:
+            wall = wall_contact(room, rules, x, y, r, item.sx, item.sy)
+            if wall is None:
+                return None
+
+        cz = rules.center_z(room, item.sz)
+        cand = Candidates(np.array([x]), np.array([y]), cz, np.array([r]), [wall], np.array([True]), *item.size)
+        box = cand.boxes[0]
+        if (box[0] < room.x_min - 1e-9 or box[1] > room.x_max + 1e-9 or
+                box[2] < room.y_min - 1e-9 or box[3] > room.y_max + 1e-9):
+            return None
+        if not feasible_mask(cand, rules, placed, room, *item.size, footprint=item.footprint)[0]:
+            return None
+        poses.append(((x, y, cz), r, wall))
+    return poses
+
+
+def commit_group(room: Room, placed: SceneStore, group: Group, poses, cx, cy, rot, walls=None, heights=None):
+    """
+    Добавляет участников группы в сцену по позам [(центр, поворот, стена)]
+    с их зонами и общими полосами оболочки в (cx, cy, rot).
+    """
+    indices = [placed.add(item, center, r, wall) for item, (center, r, wall) in zip(group.members, poses)]
+
+    for item, index in zip(group.members, indices):
+        reserve_zones(placed, index, item.rules, room)
+
+    z0, z1 = room.z_min, room.z_min + HUMAN_SIZE[2]
+    for centers, sizes in group.clearance_rects(cx, cy, rot):
+        placed.zones.add(indices[0], centers, sizes, rot, z0, z1)
+
+    for index in indices:
+        if walls is not None:
+            walls.add_item(placed, index)
+        if heights is not None:
+            heights.add_item(placed, index)
 
-        for item in items:
-            success = False
-
-            for _ in range(800):
-                # поворот каждые 30°
-                rotation = random.choice(list(range(0, 360, 30)))
-                rx, ry = rotated_size(item.sx, item.sy, rotation)
-
-                # базовый центр
-                cx, cy, cz = random_center(room, rx, ry, item.sz)
-
-                extra = item.extra
-                mount_height = extra.get("mount_height_m")
-
-                # -------- ВЫСОТА (ГЛАВНОЕ ИЗМЕНЕНИЕ) --------
-                if mount_height is not None:
-                    # висячие / настенные — высота центра над полом
-                    cz = room.z_min + mount_height
-                elif extra.get("under_ceiling"):
-                    cz = room.z_max - item.sz / 2
-                else:
-                    # ВСЁ ОСТАЛЬНОЕ СТАВИМ НА ПОЛ
-                    cz = room.z_min + item.sz / 2
-
-                wall_contact_side = None
-
-                # -------- ПРИЖАТИЕ К СТЕНЕ --------
-                if extra.get("touch_wall"):
-                    allowed_sides = extra.get(
-                        "touch_wall_sides",
-                        ["front", "back", "left", "right"]
-                    )
-                    wall_contact_side = random.choice(allowed_sides)
-                    margin = 0.01
-
-                    if wall_contact_side == "back":
-                        cy = room.y_max - ry / 2 - margin
-                    elif wall_contact_side == "front":
-                        cy = room.y_min + ry / 2 + margin
-                    elif wall_contact_side == "left":
-                        cx = room.x_min + rx / 2 + margin
-                    elif wall_contact_side == "right":
-                        cx = room.x_max - rx / 2 - margin
-
-                candidate = PlacedItem(
-                    item,
-                    (cx, cy, cz),
-                    rotation_deg=rotation,
-                    wall_contact_side=wall_contact_side,
-                )
-                box = candidate.aabb()
-
-                if not inside_room(box, room):
-                    continue
-
-                if any(aabb_intersect(box, other.aabb()) for other in placed):
-                    continue
-
-                if extra.get("touch_wall") and wall_contact_side is not None:
-                    if not candidate.is_side_touching_wall(wall_contact_side, room):
-                        continue
-
-                placed.append(candidate)
-                success = True
-                break
 
-            if not success:
+def place_unit(room: Room, placed: SceneStore, unit, walls=None, heights=None, deadline=None) -> bool:
+    """place_item для предмета, place_group для группы."""
+    if isinstance(unit, Group):
+        return place_group(room, placed, unit, walls, heights, deadline)
+    return place_item(room, placed, unit, walls, heights, deadline)
+
+
+def place_all(room: Room, items: List, static=None, deadline=None, rejects=None) -> SceneStore:
+    """
+    Рандомная расстановка с учётом скомпилированных ограничений
+    (constraints.py): крепление и высота, прижатие гранью к стене,
+    угол, free_side, multi_side_access, свободное место под люстрой,
+    предметы на других предметах (ставятся после своих опор).
+    items — предметы и жёсткие группы (load_units).
+
+    static — статические слои комнаты (shared_room.StaticRoom) или None.
+    deadline — anytime.Deadline: по истечении бросается PlacementError
+    с лучшей частичной расстановкой, как после 60 неудачных попыток.
+    rejects — debug_raster.RejectMap: копит отклонённых кандидатов всех попыток.
+    """
+
+    # растр занятости в полосе роста человека: проверки free_side и
+    # multi_side_access сначала идут по таблице сумм (clearance.py)
+    clearance = ClearanceMap(
+        room, room.z_min, room.z_min + HUMAN_SIZE[2],
+        base=None if static is None else static.clearance,
+    )
+    keepout = None if static is None else static.keepout
+    placed = SceneStore(capacity=len(items), clearance=clearance, keepout=keepout, rejects=rejects)
+    best = SceneStore(capacity=len(items), keepout=keepout)
+    walls = WallIntervals(room, keepout)
+    heights = HeightField(room)
+
+    order = sorted(items, key=lambda it: it.rules.mount == "on_top")
+
+    for _ in range(60):
+        if deadline is not None and deadline.expired():
+            break
+        placed.clear()
+        walls.clear()
+        heights.clear()
+        failed = False
+
+        for item in order:
+            if not place_unit(room, placed, item, walls, heights, deadline):
                 print(f"⚠️ Не влез: {item.name}")
                 failed = True
                 break
@@ -253,113 +395,105 @@ def place_all(room: Room, items: List[Item]) -> List[PlacedItem]:
         if not failed:
             return placed
 
-    raise RuntimeError("❌ Не удалось расставить предметы")
+        if len(placed) > len(best):
+            best = placed.copy()
+
+    raise PlacementError("❌ Не удалось расставить предметы", best)
 
 
 # ============================================================
-# ПРОВЕРКА ДОСТУПА ЧЕЛОВЕКА (A*)
+# ПРОВЕРКА ДОСТУПА ЧЕЛОВЕКА (ЗАЛИВКА ОТ ВХОДОВ)
 # ============================================================
 
-def check_human_access_astar(room: Room, placed: List[PlacedItem]) -> bool:
+def items_without_access(room: Room, placed: SceneStore, static=None, first_only: bool = False) -> List[int]:
     """
-    Проверяем, что человек может подойти к предметам, для которых
-    constraints.human_approach = True, и которые НЕ висят:
-      - не under_ceiling
-      - нет mount_height_m
+    Индексы предметов, для которых constraints.human_approach = True,
+    которые НЕ висят (не under_ceiling, нет mount_height_m) и к которым
+    человек не может подойти ни с одной разрешённой стороны (approach_sides).
+    first_only=True — остановиться на первом таком предмете.
     """
 
-    room_dict = vars(room)
-
-    items_dicts = [
-        {
-            "name": p.item.name,
-            "aabb": p.aabb(),
-            "extra": p.item.extra,
-        }
-        for p in placed
-    ]
+    # сетка строится один раз прямо по массиву AABB хранилища поверх
+    # статического слоя; достижимость — одна заливка сразу от всех входов
+    boxes = placed.aabbs[: placed.count]
+    grid, world_to_grid, _, in_bounds = build_walk_grid(
+        vars(room), boxes, base=None if static is None else static.walk,
+    )
+    reach = reachable_mask(grid, entry_sources(room, world_to_grid, static))
 
-    for p, obj in zip(placed, items_dicts):
-        extra = p.item.extra
+    blocked = []
 
-        if not extra.get("human_approach", False):
-            continue
+    for p in placed:
+        rules = p.item.rules
 
-        if extra.get("under_ceiling") or extra.get("mount_height_m") is not None:
+        if not rules.needs_approach:
             # люстры / настенные светильники и т.п. — не проверяем
             continue
 
-        allowed_sides = ["front", "back", "left", "right"]
-        if "free_side_named" in extra:
-            allowed_sides = [extra["free_side_named"]["side"]]
-
-        box = obj["aabb"]
-        offset = 0.6
-
-        side_targets = {
-            "front": ((box["x_min"] + box["x_max"]) / 2, box["y_min"] - offset),
-            "back":  ((box["x_min"] + box["x_max"]) / 2, box["y_max"] + offset),
-            "left":  (box["x_min"] - offset, (box["y_min"] + box["y_max"]) / 2),
-            "right": (box["x_max"] + offset, (box["y_min"] + box["y_max"]) / 2),
-        }
-
-        path_found = False
-
-        for side in allowed_sides:
-            tx, ty = side_targets[side]
-
-            path = find_path_to_object(
-                room_dict,
-                items_dicts,
-                {
-                    "name": p.item.name,
-                    "aabb": box,
-                    "target_override": (tx, ty),
-                },
-            )
-
-            if path is not None:
-                path_found = True
-                break
+        path_found = any(
+            in_bounds(gx, gy) and reach[gx, gy]
+            for gx, gy in (world_to_grid(tx, ty) for tx, ty in item_approach_targets(rules, p.aabb(), p.rotation))
+        )
 
         if not path_found:
-            print(f"❌ Нет подхода к объекту: {p.item.name}")
-            return False
+            blocked.append(p.index)
+            if first_only:
+                break
 
+    return blocked
+
+
+def check_human_access_astar(room: Room, placed: SceneStore, static=None) -> bool:
+    """
+    Проверяем, что человек может подойти ко всем предметам, которым
+    нужен подход (см. items_without_access).
+    """
+    blocked = items_without_access(room, placed, static, first_only=True)
+    if blocked:
+        print(f"❌ Нет подхода к объекту: {placed.items[blocked[0]].name}")
+        return False
     return True
 
 
 # ============================================================
-# MAIN
+# СБОРКА ЗАДАЧИ И РЕЗУЛЬТАТА
 # ============================================================
 
-def main():
-    print("=== РАССТАНОВКА ОБЪЕКТОВ (ВСЁ НА ПОЛУ ПО УМОЛЧАНИЮ) ===")
-
-    glb_path = input(f"GLB комнаты [{DEFAULT_GLB}]: ").strip() or DEFAULT_GLB
-    json_path = input(f"JSON объектов [{DEFAULT_JSON}]: ").strip() or DEFAULT_JSON
+MAX_ATTEMPTS = 30  # сколько раз пересэмплировать размеры и пересобрать сцену
+REPAIR_ON_FAILURE = True  # доводить неудачную расстановку локальным поиском вместо рестарта
+INFEASIBLE_EXIT_CODE = 3  # код выхода CLI (__main__.py), если запрос заведомо невыполним (run_pipeline не повторяет)
 
-    room = load_room_from_glb(glb_path)
 
-    with open(json_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    items = [
+def load_items(data: dict) -> List[Item]:
+    """
+    Строит список Item из словаря формата objects.json.
+    Размеры сэмплируются заново при каждом вызове.
+    """
+    return [
         Item(
             obj["name"],
             obj["min_size_mm"],
             obj["max_size_mm"],
             obj.get("color", [1, 1, 1]),
             obj.get("constraints", {}),
+            obj.get("mesh"),
         )
         for obj in data["items"]
     ]
 
-    placed = place_all(room, items)
 
-    if not check_human_access_astar(room, placed):
-        raise RuntimeError("❌ ЧЕЛОВЕК НЕ МОЖЕТ ПОДОЙТИ КО ВСЕМ НУЖНЫМ ОБЪЕКТАМ")
+def load_units(data: dict) -> List:
+    """
+    Предметы из data, где наборы по шаблонам data["groups"] (groups.py)
+    собраны в жёсткие группы — по одной переменной поиска на группу.
+    """
+    return form_groups(load_items(data), load_templates(data.get("groups")), ROTATION_STEP_DEG)
+
 
+def build_result(room: Room, placed: SceneStore) -> dict:
+    """
+    Результат в формате placement_result.json.
+    """
     result = {
         "room": vars(room),
         "items": [],
@@ -378,20 +512,69 @@ def main():
             "wall_contact_side": p.wall_contact_side,
         })
 
-    os.makedirs("src/data/output", exist_ok=True)
+    return result
 
-    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=2, ensure_ascii=False)
 
-    print("\n✅ ГОТОВО! placement_result.json создан\n")
-    for item in result["items"]:
-        print(
-            item["name"],
-            "→ центр", item["center"],
-            "rot:", item["rotation"],
-            "wall_side:", item["wall_contact_side"],
-        )
+def run_placement(
+    room: Room,
+    data: dict,
+    attempts: int = MAX_ATTEMPTS,
+    repair: bool = REPAIR_ON_FAILURE,
+    static=None,
+    debug_dir=None,
+) -> dict:
+    """
+    Полный цикл в одном процессе: сэмплирование размеров, расстановка,
+    проверка подхода человека. Повторяется до attempts раз
+    (то же, что делает run_pipeline перезапуском скрипта, но без
+    старта интерпретатора и парсинга GLB).
 
+    repair=True: при неудаче прогресс не выбрасывается — лучшая частичная
+    (или недоступная) расстановка доводится локальным поиском (repair.py).
 
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+    Заведомо невыполнимый запрос (precheck.py) отсекается до поиска
+    исключением InfeasibleRequest.
+
+    static — заранее посчитанные слои комнаты (shared_room.StaticRoom,
+    в воркерах сервиса — из shared memory); None — считаются по room
+    и проёмам из data["openings"] (openings.py).
+
+    debug_dir — куда класть отладочный снимок каждой попытки
+    (debug_raster.py: сетка прохода, достижимость, занятость,
+    отклонённые кандидаты) — attempt_NN.png до repair.
+    """
+    report = precheck(room, data)
+    if not report.ok:
+        raise InfeasibleRequest(report)
+
+    if static is None:
+        static = StaticRoom.build(room, openings=data.get("openings"))
+
+    if repair:
+        from repair import repair_layout
+
+    for attempt in range(attempts):
+        units = load_units(data)
+        rejects = None if debug_dir is None else RejectMap(room)
+
+        try:
+            placed = place_all(room, units, static, rejects=rejects)
+        except PlacementError as e:
+            debug_snapshot(debug_dir, f"attempt_{attempt:02d}", room, e.placed, static, rejects)
+            if not repair:
+                continue
+            placed = repair_layout(room, units, e.placed, static=static)
+            if placed is None:
+                continue
+        else:
+            debug_snapshot(debug_dir, f"attempt_{attempt:02d}", room, placed, static, rejects)
+
+        if check_human_access_astar(room, placed, static):
+            return build_result(room, placed)
+
+        if repair:
+            placed = repair_layout(room, units, placed, static=static)
+            if placed is not None and check_human_access_astar(room, placed, static):
+                return build_result(room, placed)
+
+    raise RuntimeError("❌ НЕ УДАЛОСЬ СОБРАТЬ КОРРЕКТНУЮ СЦЕНУ")
@@ -1,11 +1,9 @@
 import json
 from typing import Dict, List, Tuple
 
-import matplotlib.pyplot as plt
-from mpl_toolkits.mplot3d.art3d import Poly3DCollection
-
 from glb_parser import load_room_from_glb, Room
-from pathfinding_astar import find_path_to_object, path_to_band
+from pathfinding_astar import build_walk_grid, find_path_to_object, path_to_band
+from pathfinding_hpa import make_path_finder
 
 DEFAULT_GLB = "src/data/input/room.glb"
 DEFAULT_JSON = "src/data/output/placement_result.json"
@@ -37,6 +35,8 @@ def draw_box(
     alpha: float = 0.3,
     wire: bool = False,
 ):
+    from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+
     v = box_vertices(aabb)
 
     faces = [
@@ -102,6 +102,8 @@ def draw_path_band_from_polys(
     band_polys — список четырёхугольников в 2D ([(x,y), ...]),
     здесь поднимаем их на уровень z и рисуем как 3D-полосы.
     """
+    from mpl_toolkits.mplot3d.art3d import Poly3DCollection
+
     faces_3d = []
     for quad in band_polys:
         if len(quad) != 4:
@@ -126,7 +128,7 @@ def draw_path_band_from_polys(
     ax.add_collection3d(poly)
 
 
-# ---------- MAIN ----------
+# ---------- ОТРИСОВКА И MAIN ----------
 
 def main():
     print("=== Визуализация комнаты, объектов и проходов (A*) ===")
@@ -140,6 +142,17 @@ def main():
     with open(json_path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
+    render_result(data)
+
+
+def render_result(data: dict):
+    """
+    Рисует комнату, предметы и полосы проходов из словаря формата
+    placement_result.json. matplotlib импортируется только здесь,
+    чтобы расстановка без отрисовки его не загружала.
+    """
+    import matplotlib.pyplot as plt
+
     room = data["room"]
     items = data["items"]
 
@@ -158,9 +171,11 @@ def main():
 
     floor_z = room["z_min"] + 0.02
 
-    # Пути ко всем объектам
+    # Пути ко всем объектам: сетка и поиск (HPA* на большой сетке) — одни на все запросы
+    walk = build_walk_grid(room, items)
+    find_path = make_path_finder(walk[0], walk[3])
     for obj in items:
-        path_world = find_path_to_object(room, items, obj)
+        path_world = find_path_to_object(room, items, obj, walk, find_path)
 
         if path_world is None:
             print(f"⚠️ Нет пути к объекту: {obj['name']}")
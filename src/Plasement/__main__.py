@@ -0,0 +1,243 @@
+"""
+Точка входа пакета расстановки (из любого каталога; пути по умолчанию —
+от src/data рядом с пакетом, явные пути — от текущего каталога):
+
+    python src/Plasement --items src/data/input/objects.json --seed 1 --no-render
+
+Тяжёлые зависимости грузятся только там, где нужны: pygltflib — при
+чтении GLB, matplotlib — только с --render.
+"""
+import time
+
+_STARTED = time.perf_counter()
+
+import argparse
+import importlib
+import json
+import os
+import random
+import sys
+from pathlib import Path
+from typing import List, Tuple
+
+
+# пути по умолчанию — от src/data рядом с пакетом, а не от текущего каталога
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+DEFAULT_GLB = str(DATA_DIR / "input" / "room.glb")
+DEFAULT_JSON = str(DATA_DIR / "input" / "objects.json")
+OUTPUT_JSON = str(DATA_DIR / "output" / "placement_result.json")
+DEBUG_DIR = str(DATA_DIR / "output" / "debug")
+
+# зависимости, о загрузке которых сообщает --profile-startup
+HEAVY_MODULES = ("numpy", "pygltflib", "matplotlib")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python src/Plasement",
+        description="Расстановка мебели в комнате (без интерактивных вопросов)",
+    )
+    parser.add_argument("--room", default=DEFAULT_GLB, help="GLB комнаты")
+    parser.add_argument("--plan", default=None, metavar="SVG", help="план этажа SVG вместо --room (svg_plan.py)")
+    parser.add_argument(
+        "--plan-mm-per-unit", type=float, default=None,
+        help="масштаб плана: миллиметров в единице viewBox (обязателен с --plan)",
+    )
+    parser.add_argument(
+        "--plan-room", type=int, default=None,
+        help="номер комнаты плана (по умолчанию — самая большая)",
+    )
+    parser.add_argument("--items", default=DEFAULT_JSON, help="JSON предметов (формат objects.json)")
+    parser.add_argument("--output", default=OUTPUT_JSON, help="куда записать placement_result.json")
+    parser.add_argument("--seed", type=int, default=None, help="сид генератора случайных чисел")
+    parser.add_argument("--attempts", type=int, default=None, help="число попыток (по умолчанию MAX_ATTEMPTS)")
+    parser.add_argument(
+        "--budget", type=float, default=None, metavar="S",
+        help="срок в секундах: вернуть лучшую частичную расстановку, если полная не найдена (anytime.py)",
+    )
+    parser.add_argument(
+        "--glb", default=None, metavar="PATH",
+        help="дополнительно записать сцену в GLB (комната из --room + предметы)",
+    )
+    parser.add_argument(
+        "--debug-raster", nargs="?", const=DEBUG_DIR, default=None, metavar="DIR",
+        help=f"PNG-снимок сетки прохода, достижимости, занятости и отклонённых кандидатов на каждую попытку "
+             f"(по умолчанию {DEBUG_DIR})",
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="cProfile + tracemalloc этого запуска рядом с --output (или переменная PLACEMENT_PROFILE=1)",
+    )
+    parser.add_argument(
+        "--replay", default=None, metavar="INPUT_JSON",
+        help="повторить запрос по *.input.json профиля: комната, предметы и сид оттуда",
+    )
+    parser.add_argument(
+        "--render", action=argparse.BooleanOptionalAction, default=False,
+        help="показать результат в matplotlib",
+    )
+    parser.add_argument(
+        "--profile-startup", action="store_true",
+        help="вывести время импорта модулей и загрузки комнаты",
+    )
+    return parser.parse_args(argv)
+
+
+# ============================================================
+# ПРОФИЛЬ СТАРТА
+# ============================================================
+
+def _timed(label: str, timings: List[Tuple[str, float]], fn, *args):
+    t = time.perf_counter()
+    value = fn(*args)
+    timings.append((label, time.perf_counter() - t))
+    return value
+
+
+def print_startup_profile(timings: List[Tuple[str, float]]):
+    total = time.perf_counter() - _STARTED
+    print("\n=== ПРОФИЛЬ СТАРТА ===")
+    for label, dt in timings:
+        print(f"  {label:<28} {dt * 1000:8.1f} мс")
+    print(f"  {'итого до готовности':<28} {total * 1000:8.1f} мс")
+
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    skipped = [name for name in HEAVY_MODULES if name not in sys.modules]
+    print(f"  загружены: {', '.join(loaded) or '—'}; не загружались: {', '.join(skipped) or '—'}\n")
+
+
+# ============================================================
+# MAIN
+# ============================================================
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    try:
+        return run(args)
+    except OSError as e:
+        # нет файла комнаты / предметов, нельзя записать результат
+        print(f"❌ {e}")
+        return 1
+
+
+def run(args: argparse.Namespace) -> int:
+    timings: List[Tuple[str, float]] = []
+
+    placement = _timed("import CubePlacement", timings, importlib.import_module, "CubePlacement")
+    from precheck import InfeasibleRequest
+    from request_profile import profiling_requested, request_profile
+    from pathfinding_astar import GRID_STEP
+    from shared_room import StaticRoom
+
+    # маска пола непрямоугольной комнаты плана (без неё пол — весь AABB)
+    floor_mask, mask_step = None, GRID_STEP
+
+    if args.replay:
+        # вход выброса из профиля: комната с маской пола, предметы, проёмы, сид
+        # и как его запускали (run_placement с attempts или place_anytime с budget_s)
+        with open(args.replay, "r", encoding="utf-8") as f:
+            replay = json.load(f)
+        room = placement.Room(**replay["room"])
+        if "floor_mask" in replay:
+            import numpy as np
+            floor_mask = np.array(replay["floor_mask"]["cells"], dtype=bool)
+            mask_step = replay["floor_mask"]["step"]
+        if args.seed is None:
+            args.seed = replay["seed"]
+        replay_run = replay.get("run", {})
+        if args.budget is None and replay_run.get("mode") == "place_anytime":
+            args.budget = replay_run["budget_s"]
+        if args.attempts is None and replay_run.get("mode") == "run_placement":
+            args.attempts = replay_run.get("attempts")
+    elif args.plan:
+        if args.plan_mm_per_unit is None:
+            print("❌ Для --plan нужен --plan-mm-per-unit")
+            return 2
+        from svg_plan import load_plan
+        plan = _timed("load_plan", timings, load_plan, args.plan, args.plan_mm_per_unit)
+        if not plan.rooms:
+            print(f"❌ На плане {args.plan} не найдено ни одной комнаты")
+            return 1
+        picked = plan.largest_room() if args.plan_room is None else plan.rooms[args.plan_room]
+        room = picked.room
+        floor_mask, mask_step = picked.floor_mask, plan.step
+    else:
+        room = _timed("load_room_from_glb", timings, placement.load_room_from_glb, args.room)
+
+    if args.replay:
+        data = replay["data"]
+    else:
+        with open(args.items, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+    # статический слой комнаты: двери / окна / радиаторы из data["openings"]
+    try:
+        static = _timed(
+            "static_layers", timings, lambda: StaticRoom.build(
+                room, floor_mask=floor_mask, mask_step=mask_step, openings=data.get("openings"),
+            ),
+        )
+    except RuntimeError as e:
+        print(e)
+        return 1
+
+    if args.profile_startup:
+        print_startup_profile(timings)
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    # профиль пишется рядом с результатом, с сидом и хэшем входа в имени
+    if args.budget is not None:
+        run_info = {"mode": "place_anytime", "budget_s": args.budget}
+    else:
+        run_info = {"mode": "run_placement", "attempts": args.attempts or placement.MAX_ATTEMPTS}
+    profile = request_profile(
+        profiling_requested(args.profile), os.path.dirname(args.output) or ".", room, data, args.seed,
+        run=run_info, floor_mask=floor_mask, mask_step=mask_step,
+    )
+    try:
+        with profile as prof:
+            if args.budget is not None:
+                from anytime import place_anytime
+                result = place_anytime(room, data, args.budget, static=static, debug_dir=args.debug_raster)
+            else:
+                result = placement.run_placement(
+                    room, data, attempts=args.attempts or placement.MAX_ATTEMPTS, static=static,
+                    debug_dir=args.debug_raster,
+                )
+    except InfeasibleRequest as e:
+        print(e)
+        return placement.INFEASIBLE_EXIT_CODE
+    except RuntimeError as e:
+        print(e)
+        return 1
+
+    if prof is not None:
+        result["profile"] = prof.files
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+    if args.glb:
+        from glb_export import export_glb
+        # комната из --plan / --replay — не room.glb: вместо неё плита пола по границам
+        from_glb = not (args.plan or args.replay)
+        export_glb(result, args.glb, room_glb=args.room if from_glb else None)
+
+    print(f"\n✅ ГОТОВО! {args.output} создан\n")
+    for item in result["items"]:
+        print(item["name"], "→ центр", item["center"], "rot:", item["rotation"])
+    for item in result.get("unplaced", []):
+        print(item["name"], "— не поставлен:", item["reason"])
+
+    if args.render:
+        from VisualizePlacement import render_result
+        render_result(result)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
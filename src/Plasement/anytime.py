@@ -0,0 +1,283 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+from clearance import ClearanceMap
+from constraints import layout_violations
+from debug_raster import RejectMap, debug_snapshot
+from glb_parser import Room
+from heightfield import SUPPORT_EPS, HeightField
+from pathfinding_astar import HUMAN_SIZE
+from precheck import InfeasibleRequest, precheck
+from repair import REPAIR_TIME_BUDGET_S, repair_layout
+from scene_store import SceneStore
+from shared_room import StaticRoom
+from wall_slots import WallIntervals
+from groups import flatten, group_members
+from CubePlacement import (
+    REPAIR_ON_FAILURE,
+    build_result,
+    items_without_access,
+    load_units,
+    place_unit,
+)
+
+
+# ============================================================
+# ПРИЧИНЫ, ПО КОТОРЫМ ПРЕДМЕТ НЕ ПОСТАВЛЕН
+# ============================================================
+
+NO_SPACE = "no_space"                # нет допустимого места даже при минимальном размере
+NO_SUPPORT = "no_support"            # on_top: нет подходящей опоры
+NO_ACCESS = "no_access"              # поставлен, но человек к нему не подходит — убран
+SUPPORT_REMOVED = "support_removed"  # стоял на предмете, убранном из-за подхода
+TIMEOUT = "timeout"                  # время вышло раньше, чем до предмета дошла очередь
+CANCELLED = "cancelled"              # расстановку отменили
+
+
+# ============================================================
+# СРОК И ОТМЕНА
+# ============================================================
+
+class Deadline:
+    """
+    Бюджет времени одного запроса. cancel — необязательный флаг отмены
+    с методом is_set() (threading.Event, multiprocessing.Event): поиск
+    проверяет expired() между пачками кандидатов и шагами отжига и
+    сам сворачивается — кооперативная отмена без убийства потока.
+    """
+
+    __slots__ = ("started", "until", "cancel")
+
+    def __init__(self, budget_s: float, cancel=None):
+        self.started = time.perf_counter()
+        self.until = self.started + max(0.0, budget_s)
+        self.cancel = cancel
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel is not None and self.cancel.is_set()
+
+    def expired(self) -> bool:
+        return self.cancelled or time.perf_counter() >= self.until
+
+    def remaining(self) -> float:
+        return 0.0 if self.cancelled else max(0.0, self.until - time.perf_counter())
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+# ============================================================
+# ОДИН ПРОХОД С ПРОПУСКОМ НЕВЛЕЗШИХ
+# ============================================================
+
+def place_pass(
+    room: Room, units: List, deadline: Deadline, static=None, rejects=None,
+) -> Tuple[SceneStore, Dict[int, str]]:
+    """
+    Как одна глобальная попытка place_all, но неудача одного предмета
+    (или группы) не обрывает проход: он записывается в причины, остальные
+    ставятся дальше. Возвращает сцену и {id(item): причина} для
+    непоставленных (у группы — для каждого участника).
+    rejects — debug_raster.RejectMap для отладочного снимка прохода.
+    """
+    clearance = ClearanceMap(
+        room, room.z_min, room.z_min + HUMAN_SIZE[2],
+        base=None if static is None else static.clearance,
+    )
+    placed = SceneStore(
+        capacity=len(flatten(units)), clearance=clearance,
+        keepout=None if static is None else static.keepout, rejects=rejects,
+    )
+    walls = WallIntervals(room, None if static is None else static.keepout)
+    heights = HeightField(room)
+    reasons: Dict[int, str] = {}
+
+    for unit in sorted(units, key=lambda it: it.rules.mount == "on_top"):
+        if deadline.expired() or not place_unit(room, placed, unit, walls, heights, deadline):
+            reason = _failure_reason(unit, deadline)
+            for item in flatten([unit]):
+                reasons[id(item)] = reason
+
+    return placed, reasons
+
+
+def _failure_reason(item, deadline: Deadline) -> str:
+    if deadline.cancelled:
+        return CANCELLED
+    if deadline.expired():
+        return TIMEOUT
+    return NO_SUPPORT if item.rules.mount == "on_top" else NO_SPACE
+
+
+def _carried_by(store: SceneStore, index: int) -> List[int]:
+    """Предметы on_top, стоящие на предмете index (как layout_edit._check_not_carrying)."""
+    box = store.aabbs[index]
+    top = float(box[5])
+    near = store.overlapping((box[0], box[1], box[2], box[3], top - SUPPORT_EPS, top + SUPPORT_EPS))
+    return [
+        j for j in near.tolist()
+        if j != index
+        and store.items[j].rules.mount == "on_top"
+        and abs(float(store.aabbs[j, 4]) - top) <= SUPPORT_EPS
+    ]
+
+
+def _with_group(placed: SceneStore, groups: Dict[int, List], index: int) -> List[int]:
+    """Индекс index и индексы остальных участников его группы в сцене."""
+    members = groups.get(id(placed.items[index]))
+    if members is None:
+        return [index]
+    ids = {id(m) for m in members}
+    return [j for j, item in enumerate(placed.items) if id(item) in ids]
+
+
+def _drop(placed: SceneStore, indices: List[int], reasons: Dict[int, str], groups: Dict[int, List]):
+    """
+    Убирает предметы indices (без подхода) и всё, что на них стоит.
+    Участник группы уходит вместе со всей группой и с той же причиной.
+    """
+    drop: Dict[int, str] = {}
+    for index in indices:
+        drop.update(dict.fromkeys(_with_group(placed, groups, index), NO_ACCESS))
+    for index in list(drop):
+        for j in _carried_by(placed, index):
+            for k in _with_group(placed, groups, j):
+                drop.setdefault(k, SUPPORT_REMOVED)
+    for i in sorted(drop, reverse=True):
+        reasons[id(placed.items[i])] = drop[i]
+        placed.remove(i)
+
+
+def drop_inaccessible(
+    room: Room,
+    placed: SceneStore,
+    reasons: Dict[int, str],
+    deadline: Deadline,
+    static=None,
+    units: Optional[List] = None,
+):
+    """
+    Убирает из сцены предметы без подхода человека, дописывая причины.
+    Жадно, по одному: убирается тот предмет, после которого без подхода
+    остаётся меньше всего (один предмет у входа может закрывать все
+    остальные — убирать их всех незачем). На нём стоящее уходит вместе с ним.
+    Когда время вышло, оставшиеся без подхода убираются разом: удаление
+    только освобождает проход, так что результат всё равно корректен.
+
+    units — предметы и группы запроса: жёсткая группа убирается целиком,
+    а не по участнику, чтобы в результате не оставалось её частей.
+    """
+    groups = group_members(units or [])
+    blocked = items_without_access(room, placed, static)
+
+    while blocked:
+        if deadline.expired():
+            _drop(placed, blocked, reasons, groups)
+            return
+
+        best = None
+        for i in range(placed.count):
+            if deadline.expired():
+                break
+            if _with_group(placed, groups, i)[0] != i:
+                continue  # группу пробуем один раз — по первому участнику
+            trial = placed.copy()
+            _drop(trial, [i], {}, groups)
+            left = len(items_without_access(room, trial, static))
+            # при равенстве — предмет, поставленный позже
+            if best is None or left <= best[0]:
+                best = (left, i)
+            if left == 0:
+                break
+
+        if best is None:
+            continue
+        _drop(placed, [best[1]], reasons, groups)
+        blocked = items_without_access(room, placed, static)
+
+
+def _score(room: Room, placed: SceneStore) -> Tuple[int, int]:
+    """Больше предметов, затем меньше нарушений ограничений."""
+    return placed.count, -len(layout_violations(placed, room))
+
+
+# ============================================================
+# РАССТАНОВКА С ОГРАНИЧЕНИЕМ ВРЕМЕНИ
+# ============================================================
+
+def place_anytime(
+    room: Room,
+    data: dict,
+    budget_s: float,
+    cancel=None,
+    static=None,
+    repair: bool = REPAIR_ON_FAILURE,
+    debug_dir=None,
+) -> dict:
+    """
+    Расстановка, которая всегда укладывается в budget_s (с точностью до
+    одной пачки кандидатов или шага отжига): проходы place_pass с
+    новыми размерами повторяются, пока есть время, и лучшая сцена
+    (больше предметов с подходом, меньше нарушений) запоминается.
+    Между проходами неудачная сцена доводится repair_layout — не дольше
+    половины оставшегося времени, чтобы успеть и другие проходы. Полная доступная расстановка возвращается сразу.
+
+    Результат — build_result лучшей сцены и поля:
+      complete  — поставлены все предметы
+      unplaced  — [{"name", "reason"}] для непоставленных (см. причины выше)
+      passes    — сколько проходов успели
+      elapsed_s — сколько заняло
+
+    Заведомо невыполнимый запрос отсекается InfeasibleRequest, как в run_placement.
+    static — как в run_placement: None — слои считаются по room и data["openings"].
+    debug_dir — как в run_placement: снимок каждого прохода (pass_NN.png) до repair.
+    """
+    deadline = Deadline(budget_s, cancel)
+
+    report = precheck(room, data)
+    if not report.ok:
+        raise InfeasibleRequest(report)
+
+    if static is None:
+        static = StaticRoom.build(room, openings=data.get("openings"))
+
+    best: Optional[Tuple[Tuple[int, int], SceneStore, List[dict]]] = None
+    passes = 0
+
+    while True:
+        units = load_units(data)
+        items = flatten(units)
+        rejects = None if debug_dir is None else RejectMap(room)
+        placed, reasons = place_pass(room, units, deadline, static, rejects)
+        debug_snapshot(debug_dir, f"pass_{passes:02d}", room, placed, static, rejects)
+        passes += 1
+
+        if repair and not deadline.expired() and (reasons or items_without_access(room, placed, static, first_only=True)):
+            fixed = repair_layout(
+                room, units, placed,
+                time_budget_s=min(REPAIR_TIME_BUDGET_S, deadline.remaining() / 2), stop=deadline, static=static,
+            )
+            if fixed is not None and not items_without_access(room, fixed, static, first_only=True):
+                placed, reasons = fixed, {}
+
+        drop_inaccessible(room, placed, reasons, deadline, static, units)
+
+        unplaced = [{"name": it.name, "reason": reasons[id(it)]} for it in items if id(it) in reasons]
+        score = _score(room, placed)
+        if best is None or score > best[0]:
+            best = (score, placed.copy(), unplaced)
+
+        if not unplaced or deadline.expired():
+            break
+
+    _, placed, unplaced = best
+    result = build_result(room, placed)
+    result["complete"] = not unplaced
+    result["unplaced"] = unplaced
+    result["passes"] = passes
+    result["elapsed_s"] = round(deadline.elapsed(), 3)
+
+    if unplaced:
+        print(f"⚠️ За {budget_s:g} с поставлено {placed.count} из {placed.count + len(unplaced)}")
+    return result
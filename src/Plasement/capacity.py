@@ -0,0 +1,106 @@
+from typing import Dict, Optional
+
+from anytime import Deadline
+from glb_parser import Room
+from layout_edit import EditError, LayoutEditor
+
+
+# ============================================================
+# НАСТРОЙКИ
+# ============================================================
+
+CAPACITY_BUDGET_S = 0.5    # ответ — за доли секунды
+MISSES_PER_PASS = 3        # столько неудачных add подряд — в этом проходе больше не влезает
+STALE_PASSES = 3           # столько проходов без улучшения — дальше не ищем
+
+
+# ============================================================
+# СКОЛЬКО ЭКЗЕМПЛЯРОВ ПОМЕСТИТСЯ
+# ============================================================
+
+def capacity(
+    room: Room,
+    entry,
+    placed: Optional[dict] = None,
+    static=None,
+    catalog: Optional[Dict[str, dict]] = None,
+    size_mm=None,
+    limit: Optional[int] = None,
+    budget_s: float = CAPACITY_BUDGET_S,
+    cancel=None,
+) -> dict:
+    """
+    Сколько экземпляров одного предмета каталога поместится в комнату
+    с его ограничениями и подходом человека ко всему, что в ней стоит.
+
+    entry  — имя из catalog или словарь формата objects.json
+    placed — уже стоящие предметы (результат в формате placement_result.json),
+             их ограничения берутся из catalog по имени
+    static — статические слои комнаты (двери, окна, маска пола)
+    size_mm — размер экземпляра; по умолчанию min_size_mm — самый плотный вариант
+    limit  — хватит и столька экземпляров (ответ на «влезет ли N»)
+
+    Упаковка жадная: экземпляры добавляются по одному через
+    LayoutEditor.add — те же слоты стен, карта опор, растр занятости и
+    локальный пересчёт сетки прохода, что у правок, без пересборки
+    сцены. Проход заканчивается после MISSES_PER_PASS отказов подряд;
+    проходы с новыми случайными кандидатами повторяются, пока есть
+    budget_s и результат улучшается, лучший запоминается.
+
+    Результат — build_result лучшей сцены (стоявшие предметы, затем
+    экземпляры) и поля item, count, size_mm, passes, elapsed_s.
+    """
+    deadline = Deadline(budget_s, cancel)
+    catalog = dict(catalog or {})
+
+    if isinstance(entry, dict):
+        src = entry
+    elif entry in catalog:
+        src = catalog[entry]
+    else:
+        raise EditError(f"❌ В базе нет предмета: {entry}", "unknown_item")
+
+    size = [float(v) for v in (size_mm or src["min_size_mm"])]
+    unit = {**src, "min_size_mm": size, "max_size_mm": size}
+
+    if placed is None:
+        placed = {"room": vars(room), "items": []}
+
+    best: Optional[tuple] = None
+    passes = stale = 0
+
+    while not deadline.expired() and stale < STALE_PASSES:
+        editor = LayoutEditor.from_result(placed, catalog, static)
+        count = misses = 0
+
+        while misses < MISSES_PER_PASS and (limit is None or count < limit) and not deadline.expired():
+            try:
+                editor.add(unit)
+            except EditError as e:
+                if e.reason not in ("no_room", "no_access"):
+                    raise
+                misses += 1
+                continue
+            count += 1
+            misses = 0
+
+        passes += 1
+        if best is None or count > best[0]:
+            best, stale = (count, editor.result()), 0
+        else:
+            stale += 1
+
+        if limit is not None and best[0] >= limit:
+            break
+
+    if best is None:
+        # бюджет кончился раньше первого прохода — отвечаем пустой упаковкой
+        best = (0, LayoutEditor.from_result(placed, catalog, static).result())
+
+    count, result = best
+    result["item"] = unit["name"]
+    result["count"] = count
+    result["size_mm"] = size
+    result["passes"] = passes
+    result["elapsed_s"] = round(deadline.elapsed(), 3)
+    return result
@@ -0,0 +1,145 @@
+import math
+from typing import Tuple
+
+import numpy as np
+
+
+# ============================================================
+# НАСТРОЙКИ
+# ============================================================
+
+CLEARANCE_STEP = 0.05   # сторона клетки растра занятости (м)
+
+
+# ============================================================
+# РАСТР ЗАНЯТОСТИ + ИНТЕГРАЛЬНОЕ ИЗОБРАЖЕНИЕ
+# ============================================================
+
+class ClearanceMap:
+    """
+    Растр занятости пола предметами, попадающими в полосу высот
+    z0..z1 (по умолчанию — рост человека), и его таблица сумм
+    (summed-area table): sat[i, j] = число занятых клеток в [0, i) x [0, j).
+
+    Клетка считается занятой, если предмет её хоть как-то задевает
+    (OBB, раздутый на половину диагонали клетки), поэтому нулевая сумма
+    по прямоугольнику гарантирует, что в нём нет предметов. Запрос
+    "пуста ли полоса" — четыре чтения таблицы; повёрнутая полоса
+    проверяется по своему AABB (консервативно).
+
+    Добавление/удаление предмета правит таблицу только правее и выше
+    его окна — без пересчёта всей таблицы.
+
+    base — готовая таблица статической занятости комнаты того же
+    размера (shared_room.StaticRoom.clearance): с неё начинается и к ней
+    возвращается clear(); сама base не меняется.
+    """
+
+    __slots__ = ("x_min", "y_min", "step", "nx", "ny", "z0", "z1", "sat", "base")
+
+    def __init__(self, room, z0: float, z1: float, step: float = CLEARANCE_STEP, base=None):
+        self.x_min, self.y_min = room.x_min, room.y_min
+        self.step = step
+        self.nx = max(1, int(math.ceil(room.width / step)))
+        self.ny = max(1, int(math.ceil(room.depth / step)))
+        self.z0, self.z1 = z0, z1
+        self.base = base
+        if base is None:
+            self.sat = np.zeros((self.nx + 1, self.ny + 1), dtype=np.int32)
+        else:
+            if base.shape != (self.nx + 1, self.ny + 1):
+                raise RuntimeError(f"❌ Таблица занятости {base.shape} не подходит комнате ({self.nx + 1}, {self.ny + 1})")
+            self.sat = np.array(base, dtype=np.int32)
+
+    def copy(self) -> "ClearanceMap":
+        other = ClearanceMap.__new__(ClearanceMap)
+        for name in ("x_min", "y_min", "step", "nx", "ny", "z0", "z1", "base"):
+            setattr(other, name, getattr(self, name))
+        other.sat = self.sat.copy()
+        return other
+
+    def clear(self):
+        if self.base is None:
+            self.sat[:] = 0
+        else:
+            self.sat[:] = self.base
+
+    # ---------- клетки ----------
+
+    def _cell_range(self, lo, hi, origin, n) -> Tuple[np.ndarray, np.ndarray]:
+        """Клетки, которые задевает отрезок [lo, hi] (включительно, обрезано по растру)."""
+        a = np.floor((np.asarray(lo) - origin) / self.step).astype(int)
+        b = np.floor((np.asarray(hi) - origin) / self.step).astype(int)
+        return np.clip(a, 0, n - 1), np.clip(b, 0, n - 1)
+
+    # ---------- обновление ----------
+
+    def add_box(self, cx: float, cy: float, sx: float, sy: float, rot: float, z0: float, z1: float, sign: int = 1):
+        """Отмечает (sign=+1) или снимает (sign=-1) предмет, если он в полосе высот."""
+        if z1 <= self.z0 or z0 >= self.z1:
+            return
+
+        a = math.radians(rot)
+        c, s = math.cos(a), math.sin(a)
+        hx = (abs(c) * sx + abs(s) * sy) / 2
+        hy = (abs(s) * sx + abs(c) * sy) / 2
+
+        if (cx + hx < self.x_min or cy + hy < self.y_min or
+                cx - hx > self.x_min + self.nx * self.step or cy - hy > self.y_min + self.ny * self.step):
+            return
+
+        x0, x1 = self._cell_range(cx - hx, cx + hx, self.x_min, self.nx)
+        y0, y1 = self._cell_range(cy - hy, cy + hy, self.y_min, self.ny)
+        gx = np.arange(x0, x1 + 1)
+        gy = np.arange(y0, y1 + 1)
+        px = self.x_min + (gx[:, None] + 0.5) * self.step - cx
+        py = self.y_min + (gy[None, :] + 0.5) * self.step - cy
+
+        # клетка задета, если её центр в OBB, раздутом на полдиагонали клетки
+        pad = self.step * math.sqrt(0.5)
+        u = px * c + py * s
+        v = -px * s + py * c
+        mask = ((np.abs(u) <= sx / 2 + pad) & (np.abs(v) <= sy / 2 + pad)).astype(np.int32) * sign
+
+        cum = mask.cumsum(axis=0).cumsum(axis=1)
+        i0, i1, j0, j1 = x0 + 1, x1 + 2, y0 + 1, y1 + 2
+        self.sat[i0:i1, j0:j1] += cum
+        self.sat[i1:, j0:j1] += cum[-1, :]
+        self.sat[i0:i1, j1:] += cum[:, -1:]
+        self.sat[i1:, j1:] += cum[-1, -1]
+
+    def add_item(self, store, index: int, sign: int = 1):
+        cx, cy, _ = store.centers[index].tolist()
+        sx, sy, _ = store.sizes[index].tolist()
+        box = store.aabbs[index]
+        self.add_box(cx, cy, sx, sy, float(store.rotations[index]), float(box[4]), float(box[5]), sign)
+
+    # ---------- запросы ----------
+
+    def occupancy(self) -> np.ndarray:
+        """Растр (nx, ny): сколько предметов задевает клетку — обратно из таблицы сумм."""
+        s = self.sat
+        return s[1:, 1:] - s[:-1, 1:] - s[1:, :-1] + s[:-1, :-1]
+
+    def covers(self, z0, z1) -> bool:
+        """Годится ли растр для запроса с диапазоном высот z0..z1."""
+        return bool(np.all(np.asarray(z0) >= self.z0) and np.all(np.asarray(z1) <= self.z1))
+
+    def occupied_in(self, x_lo, x_hi, y_lo, y_hi) -> np.ndarray:
+        """Число занятых клеток в K осевых прямоугольниках — O(1) на прямоугольник."""
+        x0, x1 = self._cell_range(x_lo, x_hi, self.x_min, self.nx)
+        y0, y1 = self._cell_range(y_lo, y_hi, self.y_min, self.ny)
+        s = self.sat
+        return s[x1 + 1, y1 + 1] - s[x0, y1 + 1] - s[x1 + 1, y0] + s[x0, y0]
+
+    def rects_empty(self, centers: np.ndarray, sizes: np.ndarray, rots) -> np.ndarray:
+        """
+        True — в повёрнутом прямоугольнике заведомо нет предметов
+        (проверяется его AABB). False — может быть занят, нужна точная проверка.
+        """
+        a = np.radians(rots)
+        c, s = np.abs(np.cos(a)), np.abs(np.sin(a))
+        hx = (c * sizes[..., 0] + s * sizes[..., 1]) / 2
+        hy = (s * sizes[..., 0] + c * sizes[..., 1]) / 2
+        cx, cy = centers[..., 0], centers[..., 1]
+        return self.occupied_in(cx - hx, cx + hx, cy - hy, cy + hy) == 0
@@ -0,0 +1,690 @@
+import json
+import random
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from footprint import refine_pairs
+from glb_parser import Room
+from obb import obb_overlap_pairs
+from pathfinding_astar import HUMAN_SIZE, approach_targets
+
+
+# ============================================================
+# СОГЛАШЕНИЯ
+# ============================================================
+# Локальные оси предмета: +X — "right", +Y — "front" (вперёд).
+# Стены комнаты называются как в wall_contact_side:
+#   front — y_min, back — y_max, left — x_min, right — x_max.
+
+SIDES = ("front", "back", "left", "right")
+
+# угол нормали грани в локальных осях предмета
+SIDE_NORMAL_DEG = {"right": 0.0, "front": 90.0, "left": 180.0, "back": 270.0}
+# угол нормали стены, смотрящей из комнаты наружу
+WALL_NORMAL_DEG = {"right": 0.0, "back": 90.0, "left": 180.0, "front": 270.0}
+# стены, образующие угол с данной
+WALL_NEIGHBOURS = {
+    "front": ("left", "right"),
+    "back": ("left", "right"),
+    "left": ("front", "back"),
+    "right": ("front", "back"),
+}
+
+ACCESS_DEPTH_M = 0.5        # глубина полосы подхода (человек 500 мм, см. intro.txt)
+WALL_MOUNT_CENTER_M = 1.5   # высота центра настенного предмета без mount_height_m
+WALL_MARGIN = 0.005         # зазор до стены, чтобы не вылезти за комнату из-за округления
+BATCH_SIZE = 64             # кандидатов за один векторизованный проход
+CLEARANCE_MIN_ITEMS = 32    # с какого числа предметов полосы сначала проверяются по растру занятости
+
+
+# ============================================================
+# СКОМПИЛИРОВАННЫЕ ОГРАНИЧЕНИЯ ПРЕДМЕТА
+# ============================================================
+
+class ItemRules:
+    """
+    Ограничения предмета (constraints из objects.json / furniture_types.json),
+    разобранные один раз в типизированные поля:
+
+      mount             — "floor" | "wall" | "ceiling" | "on_top" (стоит на другом предмете)
+      support_names     — на каких предметах может стоять on_top (пусто — на любом напольном)
+      mount_height      — высота центра над полом (м) или None
+      wall_side         — какая грань прижата к стене: сторона | "any" | None
+      walls             — к каким стенам комнаты можно прижимать
+      in_corner         — вторая (боковая) грань прижата к соседней стене
+      free_sides        — [(сторона, расстояние_м)] — должно быть свободно
+      free_below/above  — свободное место под/над предметом (м) или 0
+      free_any_side     — хотя бы одна сторона свободна на это расстояние (м) или 0
+      multi_side_access — со скольких сторон должен быть подход
+      human_approach    — нужен ли проход человека к предмету
+      approach_sides    — с каких сторон допустим подход (free_side_named)
+      rotation_step     — шаг поворота (градусы) или None — любой угол
+    """
+
+    __slots__ = (
+        "mount", "support_names", "mount_height", "wall_side", "walls", "in_corner",
+        "free_sides", "free_below", "free_above", "free_any_side",
+        "multi_side_access", "human_approach", "approach_sides", "rotation_step",
+    )
+
+    def __init__(self):
+        self.mount = "floor"
+        self.support_names: Tuple[str, ...] = ()
+        self.mount_height: Optional[float] = None
+        self.wall_side: Optional[str] = None
+        self.walls: Tuple[str, ...] = SIDES
+        self.in_corner = False
+        self.free_sides: Tuple[Tuple[str, float], ...] = ()
+        self.free_below = 0.0
+        self.free_above = 0.0
+        self.free_any_side = 0.0
+        self.multi_side_access = 0
+        self.human_approach = False
+        self.approach_sides: Tuple[str, ...] = SIDES
+        self.rotation_step: Optional[float] = None
+
+    # ---------- производные правила ----------
+
+    @property
+    def needs_approach(self) -> bool:
+        """
+        Подход проверяется только к тому, что стоит на полу или висит на
+        стене без явной высоты; к предмету на другом предмете — через опору.
+        """
+        return self.human_approach and self.mount in ("floor", "wall") and self.mount_height is None
+
+    @property
+    def is_support(self) -> bool:
+        """Верхняя грань предмета может служить опорой (heightfield.py)."""
+        return self.mount in ("floor", "on_top") and self.mount_height is None
+
+    def center_z(self, room: Room, sz: float) -> float:
+        """Высота центра по способу крепления (on_top ставится по карте опор heightfield.py)."""
+        if self.mount_height is not None:
+            return room.z_min + self.mount_height
+        if self.mount == "ceiling":
+            return room.z_max - sz / 2
+        if self.mount == "wall":
+            lo, hi = room.z_min + sz / 2, room.z_max - sz / 2
+            return min(hi, max(lo, room.z_min + WALL_MOUNT_CENTER_M))
+        return room.z_min + sz / 2
+
+    def random_rotation(self) -> float:
+        """Поворот вокруг Z: у стены — кратно 90°, иначе шаг или любой угол."""
+        if self.wall_side is not None:
+            return float(random.choice((0, 90, 180, 270)))
+        if self.rotation_step:
+            return float(random.choice(range(0, 360, int(self.rotation_step))))
+        return random.uniform(0.0, 360.0)
+
+
+def _distance_m(spec: dict) -> float:
+    if "distance_mm" in spec:
+        return float(spec["distance_mm"]) / 1000.0
+    return float(spec.get("distance", 0)) / 1000.0
+
+
+def _compile(extra: dict, default_rotation_step: Optional[float]) -> ItemRules:
+    rules = ItemRules()
+
+    # ---------- крепление ----------
+    mount = extra.get("mount_type")
+    if extra.get("under_ceiling") or extra.get("touch_ceiling") or mount == "ceiling":
+        rules.mount = "ceiling"
+    elif mount == "wall":
+        rules.mount = "wall"
+    elif mount == "on_top" or extra.get("on_top_of"):
+        rules.mount = "on_top"
+        support = extra.get("on_top_of") or ()
+        rules.support_names = (support,) if isinstance(support, str) else tuple(support)
+
+    if extra.get("mount_height_m") is not None:
+        rules.mount_height = float(extra["mount_height_m"])
+
+    # ---------- стена / угол ----------
+    touch_wall = extra.get("touch_wall")
+    if isinstance(touch_wall, dict):
+        rules.wall_side = touch_wall.get("side") if touch_wall.get("side") in SIDES else "any"
+    elif touch_wall:
+        rules.wall_side = "any"
+    elif rules.mount == "wall":
+        rules.wall_side = "back"
+
+    rules.in_corner = bool(extra.get("in_corner"))
+    if rules.in_corner and rules.wall_side is None:
+        rules.wall_side = "back"
+
+    walls = extra.get("touch_wall_sides")
+    if walls:
+        rules.walls = tuple(w for w in walls if w in SIDES) or SIDES
+
+    # ---------- свободные стороны ----------
+    free_sides: List[Tuple[str, float]] = []
+    for key in ("free_side", "free_side_named"):
+        spec = extra.get(key)
+        if not isinstance(spec, dict):
+            continue
+
+        side = spec.get("side")
+        dist = _distance_m(spec)
+        if side in SIDES:
+            free_sides.append((side, dist))
+        elif side == "bottom":
+            rules.free_below = max(rules.free_below, dist)
+        elif side == "top":
+            rules.free_above = max(rules.free_above, dist)
+        elif side is None:
+            rules.free_any_side = max(rules.free_any_side, dist)
+
+        if key == "free_side_named" and side in SIDES:
+            rules.approach_sides = (side,)
+
+    rules.free_sides = tuple(free_sides)
+    rules.multi_side_access = int(extra.get("multi_side_access") or 0)
+
+    rules.human_approach = bool(extra.get("human_approach", False))
+    rules.rotation_step = extra.get("rotation_step_deg", default_rotation_step)
+    return rules
+
+
+_COMPILED: Dict[Tuple[str, Optional[float]], ItemRules] = {}
+
+
+def compile_constraints(extra: dict, default_rotation_step: Optional[float] = None) -> ItemRules:
+    """
+    Компилирует словарь constraints в ItemRules. Результат кэшируется
+    по содержимому словаря, поэтому одинаковые предметы каталога
+    разбираются один раз на процесс.
+    """
+    key = (json.dumps(extra or {}, sort_keys=True, default=str), default_rotation_step)
+    rules = _COMPILED.get(key)
+    if rules is None:
+        rules = _compile(extra or {}, default_rotation_step)
+        _COMPILED[key] = rules
+    return rules
+
+
+# ============================================================
+# ГЕОМЕТРИЯ ПОЛОС У ГРАНЕЙ (ВЕКТОРНО)
+# ============================================================
+
+def side_rects(cx, cy, rot, sx, sy, side: str, depth: float):
+    """
+    Прямоугольники шириной в грань и глубиной depth, примыкающие
+    к грани side. Все аргументы — скаляры или массивы одной длины.
+    Возвращает центры (..., 2) и размеры (..., 2); поворот — rot.
+    """
+    a = np.radians(rot)
+    rx, ry = np.cos(a), np.sin(a)      # локальная +X
+    fx, fy = -ry, rx                   # локальная +Y (вперёд)
+
+    if side in ("front", "back"):
+        sign = 1.0 if side == "front" else -1.0
+        off = np.asarray(sy) / 2 + depth / 2
+        centers = np.stack([cx + sign * fx * off, cy + sign * fy * off], axis=-1)
+        sizes = np.stack(np.broadcast_arrays(np.asarray(sx, dtype=float), depth), axis=-1)
+    else:
+        sign = 1.0 if side == "right" else -1.0
+        off = np.asarray(sx) / 2 + depth / 2
+        centers = np.stack([cx + sign * rx * off, cy + sign * ry * off], axis=-1)
+        sizes = np.stack(np.broadcast_arrays(depth, np.asarray(sy, dtype=float)), axis=-1)
+
+    return centers, np.broadcast_to(sizes, centers.shape)
+
+
+# грань AABB в approach_targets по направлению мировой нормали стороны: +x, +y, -x, -y
+_TARGET_BY_NORMAL = (3, 1, 2, 0)
+
+
+def item_approach_targets(rules: ItemRules, box: Dict[str, float], rot: float) -> List[Tuple[float, float]]:
+    """
+    Точки подхода (pathfinding_astar.approach_targets) только у сторон
+    rules.approach_sides: сторона предмета переводится в грань AABB по
+    своей нормали после поворота rot (не кратный 90° — ближайшая грань).
+    """
+    targets = approach_targets(box)
+    if set(rules.approach_sides) == set(SIDES):
+        return targets
+    return [
+        targets[_TARGET_BY_NORMAL[int(round(((rot + SIDE_NORMAL_DEG[side]) % 360.0) / 90.0)) % 4]]
+        for side in rules.approach_sides
+    ]
+
+
+def half_extents(sizes: np.ndarray, rot) -> Tuple[np.ndarray, np.ndarray]:
+    """Полуразмеры AABB повёрнутых прямоугольников."""
+    a = np.radians(rot)
+    c, s = np.abs(np.cos(a)), np.abs(np.sin(a))
+    w, h = sizes[..., 0], sizes[..., 1]
+    return (c * w + s * h) / 2, (s * w + c * h) / 2
+
+
+# ============================================================
+# ПАЧКА КАНДИДАТОВ
+# ============================================================
+
+def footprint_extents(rules: ItemRules, sx: float, sy: float, rot):
+    """
+    Габарит предмета вместе с его free_side полосами относительно центра
+    при поворотах rot (массив): lo_x, hi_x, lo_y, hi_y.
+    """
+    rot = np.asarray(rot, dtype=float)
+    hx, hy = half_extents(np.array([sx, sy]), rot)
+    lo_x, hi_x, lo_y, hi_y = -hx, hx.copy(), -hy, hy.copy()
+
+    zeros = np.zeros(rot.shape)
+    for side, dist in rules.free_sides:
+        centers, sizes = side_rects(zeros, zeros, rot, sx, sy, side, dist)
+        shx, shy = half_extents(sizes, rot)
+        lo_x = np.minimum(lo_x, centers[..., 0] - shx)
+        hi_x = np.maximum(hi_x, centers[..., 0] + shx)
+        lo_y = np.minimum(lo_y, centers[..., 1] - shy)
+        hi_y = np.maximum(hi_y, centers[..., 1] + shy)
+
+    return lo_x, hi_x, lo_y, hi_y
+
+
+class Candidates:
+    """K кандидатов положения одного предмета в виде массивов (cz — скаляр или (K,))."""
+
+    __slots__ = ("cx", "cy", "cz", "rot", "walls", "valid", "boxes")
+
+    def __init__(self, cx, cy, cz, rot, walls, valid, sx, sy, sz):
+        self.cx, self.cy, self.rot = cx, cy, rot
+        self.cz = np.full_like(cx, cz)
+        self.walls = walls
+        self.valid = valid
+
+        hx, hy = half_extents(np.array([sx, sy]), rot)
+        self.boxes = np.stack([
+            cx - hx, cx + hx, cy - hy, cy + hy,
+            self.cz - sz / 2, self.cz + sz / 2,
+        ], axis=-1)
+
+    def __len__(self):
+        return len(self.cx)
+
+
+def make_rng() -> np.random.Generator:
+    # сид берём из модуля random, чтобы random.seed(...) воспроизводил расстановку
+    return np.random.default_rng(random.getrandbits(64))
+
+
+def sample_candidates(
+    rules: ItemRules,
+    room: Room,
+    sx: float,
+    sy: float,
+    sz: float,
+    k: int = BATCH_SIZE,
+) -> Candidates:
+    """
+    Сэмплирует k кандидатов сразу внутри допустимой области:
+    центр выбирается так, чтобы предмет вместе со своими free_side
+    полосами остался в комнате, а предметы у стены/в углу сразу
+    ставятся вплотную нужной гранью. Кандидаты с пустой областью
+    помечаются valid=False.
+    """
+    rng = make_rng()
+
+    # ---------- поворот и стена ----------
+    walls: List[Optional[str]] = [None] * k
+    if rules.wall_side is not None:
+        walls = [rules.walls[i] for i in rng.integers(0, len(rules.walls), k)]
+        if rules.wall_side == "any":
+            sides = [SIDES[i] for i in rng.integers(0, 4, k)]
+        else:
+            sides = [rules.wall_side] * k
+        rot = np.array([
+            (WALL_NORMAL_DEG[w] - SIDE_NORMAL_DEG[s]) % 360.0 for w, s in zip(walls, sides)
+        ])
+    elif rules.rotation_step:
+        step = float(rules.rotation_step)
+        rot = rng.integers(0, int(360 // step), k) * step
+    else:
+        rot = rng.uniform(0.0, 360.0, k)
+
+    hx, hy = half_extents(np.array([sx, sy]), rot)
+    lo_x, hi_x, lo_y, hi_y = footprint_extents(rules, sx, sy, rot)
+
+    x_lo, x_hi = room.x_min - lo_x, room.x_max - hi_x
+    y_lo, y_hi = room.y_min - lo_y, room.y_max - hi_y
+
+    valid = (x_lo <= x_hi) & (y_lo <= y_hi) & (sz <= room.height)
+    cx = rng.uniform(x_lo, np.maximum(x_lo, x_hi))
+    cy = rng.uniform(y_lo, np.maximum(y_lo, y_hi))
+
+    # ---------- прижатие к стене и в угол ----------
+    if rules.wall_side is not None:
+        ends = rng.integers(0, 2, k)
+        for i, w in enumerate(walls):
+            if w == "front":
+                cy[i] = room.y_min + hy[i] + WALL_MARGIN
+            elif w == "back":
+                cy[i] = room.y_max - hy[i] - WALL_MARGIN
+            elif w == "left":
+                cx[i] = room.x_min + hx[i] + WALL_MARGIN
+            else:
+                cx[i] = room.x_max - hx[i] - WALL_MARGIN
+
+            if rules.in_corner:
+                corner = WALL_NEIGHBOURS[w][ends[i]]
+                if corner == "left":
+                    cx[i] = room.x_min + hx[i] + WALL_MARGIN
+                elif corner == "right":
+                    cx[i] = room.x_max - hx[i] - WALL_MARGIN
+                elif corner == "front":
+                    cy[i] = room.y_min + hy[i] + WALL_MARGIN
+                else:
+                    cy[i] = room.y_max - hy[i] - WALL_MARGIN
+
+        tol = 1e-9
+        valid &= (cx >= x_lo - tol) & (cx <= x_hi + tol) & (cy >= y_lo - tol) & (cy <= y_hi + tol)
+
+    cz = rules.center_z(room, sz)
+    return Candidates(cx, cy, cz, rot, walls, valid, sx, sy, sz)
+
+
+# ============================================================
+# ПРОВЕРКА ПАЧКИ ПРОТИВ СЦЕНЫ
+# ============================================================
+
+def _rects_hit_items(centers, sizes, rots, z0, z1, store, exclude: int = -1, footprint=None) -> np.ndarray:
+    """
+    Какие из K прямоугольников (с диапазоном высот z0..z1) пересекают
+    хоть один предмет сцены. Если у сцены есть растр занятости
+    (store.clearance), заведомо пустые прямоугольники отсекаются за O(1)
+    по таблице сумм (когда предметов достаточно, чтобы это окупилось);
+    остальные — широкая фаза AABB и узкая SAT.
+    footprint — след меша самих прямоугольников (footprint.py) или None.
+    """
+    cmap = store.clearance
+    if cmap is not None and store.count >= CLEARANCE_MIN_ITEMS and len(centers) and cmap.covers(z0, z1):
+        rots = np.broadcast_to(rots, (len(centers),))
+        hit = np.zeros(len(centers), dtype=bool)
+        maybe = np.flatnonzero(~cmap.rects_empty(centers, sizes, rots))
+        if maybe.size:
+            hit[maybe] = _rects_hit_items_exact(
+                centers[maybe], sizes[maybe], rots[maybe],
+                np.broadcast_to(z0, (len(centers),))[maybe],
+                np.broadcast_to(z1, (len(centers),))[maybe],
+                store, exclude, footprint,
+            )
+        return hit
+
+    return _rects_hit_items_exact(centers, sizes, rots, z0, z1, store, exclude, footprint)
+
+
+def _rects_hit_items_exact(centers, sizes, rots, z0, z1, store, exclude: int = -1, footprint=None) -> np.ndarray:
+    k = len(centers)
+    hit = np.zeros(k, dtype=bool)
+    n = store.count
+    if n == 0 or k == 0:
+        return hit
+
+    hx, hy = half_extents(sizes, rots)
+    a = store.aabbs[:n]
+    z0 = np.broadcast_to(z0, (k,))
+    z1 = np.broadcast_to(z1, (k,))
+
+    broad = (
+        (centers[:, None, 0] - hx[:, None] < a[None, :, 1]) &
+        (centers[:, None, 0] + hx[:, None] > a[None, :, 0]) &
+        (centers[:, None, 1] - hy[:, None] < a[None, :, 3]) &
+        (centers[:, None, 1] + hy[:, None] > a[None, :, 2]) &
+        (z0[:, None] < a[None, :, 5]) &
+        (z1[:, None] > a[None, :, 4])
+    )
+    if 0 <= exclude < n:
+        broad[:, exclude] = False
+
+    ki, ni = np.nonzero(broad)
+    if ki.size:
+        rots = np.broadcast_to(rots, (k,))
+        narrow = obb_overlap_pairs(
+            centers[ki], sizes[ki], rots[ki],
+            store.centers[ni, :2], store.sizes[ni, :2], store.rotations[ni],
+        )
+        ki, ni = ki[narrow], ni[narrow]
+
+        # у предметов с мешем — ещё проверка по выпуклым оболочкам следа
+        footprints = [store.items[j].footprint for j in ni.tolist()]
+        if ki.size and (footprint is not None or any(f is not None for f in footprints)):
+            keep = refine_pairs(
+                centers[ki], sizes[ki], rots[ki], footprint,
+                store.centers[ni, :2], store.sizes[ni, :2], store.rotations[ni], footprints,
+            )
+            ki = ki[keep]
+        hit[ki] = True
+
+    return hit
+
+
+def _rects_hit_zones(centers, sizes, rots, z0, z1, zones, exclude: int = -1) -> np.ndarray:
+    """Какие из K прямоугольников заходят в чужие зарезервированные зоны."""
+    k = len(centers)
+    hit = np.zeros(k, dtype=bool)
+    m = zones.count
+    if m == 0 or k == 0:
+        return hit
+
+    z0 = np.broadcast_to(z0, (k,))
+    z1 = np.broadcast_to(z1, (k,))
+    owners_ok = zones.owners[:m] != exclude
+    broad = (
+        (z0[:, None] < zones.z[None, :m, 1]) &
+        (z1[:, None] > zones.z[None, :m, 0]) &
+        owners_ok[None, :]
+    )
+
+    ki, zi = np.nonzero(broad)
+    if ki.size:
+        narrow = obb_overlap_pairs(
+            centers[ki], sizes[ki], np.broadcast_to(rots, (k,))[ki],
+            zones.centers[zi], zones.sizes[zi], zones.angles[zi],
+        )
+        hit[ki[narrow]] = True
+
+    return hit
+
+
+def _rects_hit_keepout(centers, sizes, rots, z0, z1, keepout) -> np.ndarray:
+    """Какие из K прямоугольников заходят в статические запретные объёмы (SceneStore.keepout)."""
+    k = len(centers)
+    hit = np.zeros(k, dtype=bool)
+    if keepout is None or len(keepout) == 0 or k == 0:
+        return hit
+
+    rots = np.broadcast_to(rots, (k,))
+    hx, hy = half_extents(sizes, rots)
+    z0 = np.broadcast_to(z0, (k,))
+    z1 = np.broadcast_to(z1, (k,))
+    broad = (
+        (centers[:, 0, None] - hx[:, None] < keepout[None, :, 1]) &
+        (centers[:, 0, None] + hx[:, None] > keepout[None, :, 0]) &
+        (centers[:, 1, None] - hy[:, None] < keepout[None, :, 3]) &
+        (centers[:, 1, None] + hy[:, None] > keepout[None, :, 2]) &
+        (z0[:, None] < keepout[None, :, 5]) &
+        (z1[:, None] > keepout[None, :, 4])
+    )
+
+    ki, oi = np.nonzero(broad)
+    if ki.size:
+        boxes = keepout[oi]
+        narrow = obb_overlap_pairs(
+            centers[ki], sizes[ki], rots[ki],
+            np.column_stack(((boxes[:, 0] + boxes[:, 1]) / 2, (boxes[:, 2] + boxes[:, 3]) / 2)),
+            np.column_stack((boxes[:, 1] - boxes[:, 0], boxes[:, 3] - boxes[:, 2])),
+            np.zeros(ki.size),
+        )
+        hit[ki[narrow]] = True
+
+    return hit
+
+
+def _rects_inside_room(centers, sizes, rots, room: Room) -> np.ndarray:
+    hx, hy = half_extents(sizes, rots)
+    return (
+        (centers[:, 0] - hx >= room.x_min - 1e-9) & (centers[:, 0] + hx <= room.x_max + 1e-9) &
+        (centers[:, 1] - hy >= room.y_min - 1e-9) & (centers[:, 1] + hy <= room.y_max + 1e-9)
+    )
+
+
+def item_zones(rules: ItemRules, room: Room, cx, cy, cz, rot, sx, sy, sz):
+    """
+    Зоны, которые предмет резервирует за собой: free_side полосы
+    (от пола до роста человека) и свободное место под/над предметом.
+    Список (центры (K, 2), размеры (K, 2), z0, z1) — по одной записи на зону.
+    """
+    zones = []
+    floor_z0, floor_z1 = room.z_min, room.z_min + HUMAN_SIZE[2]
+
+    for side, dist in rules.free_sides:
+        centers, sizes = side_rects(cx, cy, rot, sx, sy, side, dist)
+        zones.append((centers, sizes, floor_z0, floor_z1))
+
+    foot_c = np.stack(np.broadcast_arrays(cx, cy), axis=-1)
+    foot_s = np.broadcast_to(np.array([sx, sy], dtype=float), foot_c.shape)
+    bottom, top = np.asarray(cz) - sz / 2, np.asarray(cz) + sz / 2
+
+    if rules.free_below > 0:
+        zones.append((foot_c, foot_s, np.maximum(room.z_min, bottom - rules.free_below), bottom))
+    if rules.free_above > 0:
+        zones.append((foot_c, foot_s, top, np.minimum(room.z_max, top + rules.free_above)))
+
+    return zones
+
+
+def free_side_flags(cand: Candidates, sx, sy, depth: float, store, room: Room, exclude: int = -1) -> np.ndarray:
+    """
+    (K, 4) — у каких сторон (в порядке SIDES) каждого кандидата есть
+    свободная полоса глубиной depth внутри комнаты.
+    """
+    flags = np.zeros((len(cand), len(SIDES)), dtype=bool)
+    z0, z1 = room.z_min, room.z_min + HUMAN_SIZE[2]
+
+    for s, side in enumerate(SIDES):
+        centers, sizes = side_rects(cand.cx, cand.cy, cand.rot, sx, sy, side, depth)
+        ok = _rects_inside_room(centers, sizes, cand.rot, room)
+        # чужие свободные зоны подходу не мешают — это тоже проход
+        ok &= ~_rects_hit_items(centers, sizes, cand.rot, z0, z1, store, exclude)
+        flags[:, s] = ok
+
+    return flags
+
+
+def feasible_mask(
+    cand: Candidates,
+    rules: ItemRules,
+    store,
+    room: Room,
+    sx: float,
+    sy: float,
+    sz: float,
+    exclude: int = -1,
+    footprint=None,
+) -> np.ndarray:
+    """
+    Векторная проверка пачки кандидатов против уже размещённых предметов:
+      - пересечения (AABB + SAT, у предметов с мешем — по оболочкам следа),
+      - кандидат не заходит в статические запретные объёмы (двери, окна, радиаторы),
+      - кандидат не заходит в чужие зарезервированные зоны,
+      - собственные зоны кандидата не заняты,
+      - multi_side_access / free_side без имени стороны.
+    exclude — индекс предмета сцены, который не учитывается (перепроверка).
+    footprint — след меша кандидата (Item.footprint) или None — прямоугольник.
+    """
+    valid = cand.valid.copy()
+    centers = np.column_stack((cand.cx, cand.cy))
+    sizes = np.broadcast_to(np.array([sx, sy]), centers.shape)
+    z0, z1 = cand.boxes[:, 4], cand.boxes[:, 5]
+
+    valid &= ~_rects_hit_items(centers, sizes, cand.rot, z0, z1, store, exclude, footprint)
+    valid &= ~_rects_hit_keepout(centers, sizes, cand.rot, z0, z1, store.keepout)
+    valid &= ~_rects_hit_zones(centers, sizes, cand.rot, z0, z1, store.zones, exclude)
+
+    for z_centers, z_sizes, zz0, zz1 in item_zones(rules, room, cand.cx, cand.cy, cand.cz, cand.rot, sx, sy, sz):
+        if not valid.any():
+            return valid
+        valid &= ~_rects_hit_items(z_centers, z_sizes, cand.rot, zz0, zz1, store, exclude)
+
+    if rules.multi_side_access and valid.any():
+        flags = free_side_flags(cand, sx, sy, ACCESS_DEPTH_M, store, room, exclude)
+        valid &= flags.sum(axis=1) >= rules.multi_side_access
+
+    if rules.free_any_side and valid.any():
+        valid &= free_side_flags(cand, sx, sy, rules.free_any_side, store, room, exclude).any(axis=1)
+
+    return valid
+
+
+def reserve_zones(store, index: int, rules: ItemRules, room: Room):
+    """
+    Записывает зоны предмета index сцены в store.zones. Для
+    multi_side_access и free_side без стороны резервируются полосы
+    у тех сторон, что свободны в момент постановки, — иначе следующие
+    предметы могли бы закрыть подход.
+    """
+    cx, cy, cz = store.centers[index].tolist()
+    sx, sy, sz = store.sizes[index].tolist()
+    rot = float(store.rotations[index])
+
+    for centers, sizes, z0, z1 in item_zones(rules, room, cx, cy, cz, rot, sx, sy, sz):
+        store.zones.add(index, centers, sizes, rot, float(z0), float(z1))
+
+    z0, z1 = room.z_min, room.z_min + HUMAN_SIZE[2]
+    for need, depth in ((rules.multi_side_access, ACCESS_DEPTH_M), (bool(rules.free_any_side), rules.free_any_side)):
+        if not need:
+            continue
+
+        cand = Candidates(
+            np.array([cx]), np.array([cy]), cz, np.array([rot]),
+            [store.wall_sides[index]], np.array([True]), sx, sy, sz,
+        )
+        flags = free_side_flags(cand, sx, sy, depth, store, room, exclude=index)[0]
+        for s in np.flatnonzero(flags)[: int(need)]:
+            centers, sizes = side_rects(cx, cy, rot, sx, sy, SIDES[s], depth)
+            store.zones.add(index, centers, sizes, rot, z0, z1)
+
+
+def layout_violations(store, room: Room) -> List[Tuple[int, str]]:
+    """
+    Перепроверка готовой сцены: для каждого предмета — попадает ли он
+    в область, допустимую его ограничениями, с учётом всех остальных.
+    Возвращает [(индекс, причина)].
+    """
+    problems = []
+
+    for i in range(store.count):
+        item = store.items[i]
+        rules = item.rules
+        cx, cy, cz = store.centers[i].tolist()
+        sx, sy, sz = store.sizes[i].tolist()
+        rot = np.array([store.rotations[i]])
+
+        box = store.aabbs[i]
+        if (
+            box[0] < room.x_min - 1e-6 or box[1] > room.x_max + 1e-6 or
+            box[2] < room.y_min - 1e-6 or box[3] > room.y_max + 1e-6 or
+            box[4] < room.z_min - 1e-6 or box[5] > room.z_max + 1e-6
+        ):
+            problems.append((i, "outside_room"))
+            continue
+
+        if rules.wall_side is not None and store.wall_sides[i] is None:
+            problems.append((i, "touch_wall"))
+            continue
+
+        if _rects_hit_keepout(np.array([[cx, cy]]), np.array([[sx, sy]]), rot, box[4], box[5], store.keepout)[0]:
+            problems.append((i, "keepout"))
+            continue
+
+        cand = Candidates(
+            np.array([cx]), np.array([cy]), cz, rot,
+            [store.wall_sides[i]], np.array([True]), sx, sy, sz,
+        )
+        if not feasible_mask(cand, rules, store, room, sx, sy, sz, exclude=i, footprint=item.footprint)[0]:
+            problems.append((i, "collision_or_clearance"))
+
+    return problems
@@ -0,0 +1,288 @@
+import math
+import os
+import struct
+import time
+import zlib
+from typing import Dict, Optional
+
+import numpy as np
+
+from clearance import CLEARANCE_STEP, ClearanceMap
+from constraints import item_approach_targets
+from glb_parser import Room
+from pathfinding_astar import GRID_STEP, HUMAN_SIZE, build_walk_grid, reachable_mask
+from scene_store import AABB_KEYS
+from shared_room import entry_sources
+
+
+# ============================================================
+# НАСТРОЙКИ
+# ============================================================
+
+DEBUG_DIR = "src/data/output/debug"
+PX_PER_M = 40        # пикселей на метр во всех панелях
+GAP_PX = 4           # разделитель между панелями
+
+# палитра (RGB)
+FREE = (255, 255, 255)
+STATIC = (90, 90, 90)          # закрыто статическим слоем (вне пола, радиаторы)
+INFLATED = (255, 190, 120)     # закрыто мебелью, раздутой на полчеловека
+FURNITURE = (140, 80, 30)      # сами предметы (по OBB)
+KEEPOUT = (90, 140, 255)       # запретные зоны дверей / окон / радиаторов (подмешивается)
+REACH = (150, 220, 150)        # достижимо от входов
+POCKET = (235, 90, 90)         # проходимо, но от входов не достижимо
+BLOCKED = (200, 0, 200)        # предмет, к которому нет подхода
+ENTRY = (0, 0, 255)            # клетки входа
+BACKGROUND = (40, 40, 40)
+
+
+# ============================================================
+# ТЕПЛОВАЯ КАРТА ОТКЛОНЁННЫХ КАНДИДАТОВ
+# ============================================================
+
+class RejectMap:
+    """
+    Сколько раз кандидат с центром в клетке (сетка GRID_STEP, как у
+    сетки прохода) не прошёл feasible_mask. Ведётся вместе со сценой
+    (SceneStore.rejects) через все глобальные попытки одного прохода:
+    place_all сбрасывает сцену, но не карту.
+    """
+
+    __slots__ = ("x_min", "y_min", "step", "counts")
+
+    def __init__(self, room: Room, step: float = GRID_STEP):
+        self.x_min, self.y_min, self.step = room.x_min, room.y_min, step
+        nx = int((room.x_max - room.x_min) / step) + 1
+        ny = int((room.y_max - room.y_min) / step) + 1
+        self.counts = np.zeros((nx, ny), dtype=np.int32)
+
+    def add(self, xs: np.ndarray, ys: np.ndarray):
+        if len(xs) == 0:
+            return
+        nx, ny = self.counts.shape
+        gx = np.clip(((xs - self.x_min) / self.step).astype(int), 0, nx - 1)
+        gy = np.clip(((ys - self.y_min) / self.step).astype(int), 0, ny - 1)
+        np.add.at(self.counts, (gx, gy), 1)
+
+    def clear(self):
+        self.counts[:] = 0
+
+
+# ============================================================
+# СЛОИ СНИМКА
+# ============================================================
+
+def _cell_grid(room: Room, step: float, shape):
+    xs = room.x_min + (np.arange(shape[0]) + 0.5) * step
+    ys = room.y_min + (np.arange(shape[1]) + 0.5) * step
+    return xs, ys
+
+
+def _obb_cells(store, indices, room: Room, step: float, shape) -> np.ndarray:
+    """Клетки, чьи центры лежат в OBB предметов indices (окно — по их AABB)."""
+    mask = np.zeros(shape, dtype=bool)
+    xs, ys = _cell_grid(room, step, shape)
+    for i in indices:
+        box = store.aabbs[i]
+        wx = np.flatnonzero((xs >= box[0]) & (xs <= box[1]))
+        wy = np.flatnonzero((ys >= box[2]) & (ys <= box[3]))
+        if wx.size == 0 or wy.size == 0:
+            continue
+        cx, cy, _ = store.centers[i].tolist()
+        sx, sy, _ = store.sizes[i].tolist()
+        a = math.radians(float(store.rotations[i]))
+        c, s = math.cos(a), math.sin(a)
+        px = xs[wx][:, None] - cx
+        py = ys[wy][None, :] - cy
+        inside = (np.abs(px * c + py * s) <= sx / 2) & (np.abs(-px * s + py * c) <= sy / 2)
+        mask[np.ix_(wx, wy)] |= inside
+    return mask
+
+
+def _box_cells(boxes: np.ndarray, room: Room, step: float, shape) -> np.ndarray:
+    mask = np.zeros(shape, dtype=bool)
+    xs, ys = _cell_grid(room, step, shape)
+    for box in boxes.reshape(-1, 6):
+        mask[np.ix_((xs >= box[0]) & (xs <= box[1]), (ys >= box[2]) & (ys <= box[3]))] = True
+    return mask
+
+
+def debug_layers(room: Room, store, static=None, rejects: Optional[RejectMap] = None) -> Dict[str, np.ndarray]:
+    """
+    Все слои отладочного снимка сцены — те же массивы, по которым идёт
+    поиск (их и рисует render_debug):
+      base, walk   (nx, ny) bool — сетка прохода пустой комнаты и со сценой
+      furniture    (nx, ny) bool — клетки под предметами
+      keepout      (nx, ny) bool — запретные зоны статического слоя
+      reach        (nx, ny) bool — достижимо от входов (одна заливка)
+      blocked      (nx, ny) bool — клетки предметов без подхода
+      entries      (E, 2) int    — клетки входа
+      clearance    (cx, cy) int  — растр занятости в полосе роста человека
+      rejects      (nx, ny) int  — отклонённые кандидаты (нули без карты)
+    """
+    n = store.count
+    grid, world_to_grid, _, in_bounds = build_walk_grid(
+        vars(room), store.aabbs[:n], base=None if static is None else static.walk,
+    )
+    base = np.ones_like(grid) if static is None else np.asarray(static.walk, dtype=bool)
+    entries = entry_sources(room, world_to_grid, static)
+    reach = reachable_mask(grid, entries)
+
+    blocked = [
+        i for i in range(n)
+        if store.items[i].rules.needs_approach and not any(
+            in_bounds(gx, gy) and reach[gx, gy]
+            for gx, gy in (
+                world_to_grid(tx, ty)
+                for tx, ty in item_approach_targets(
+                    store.items[i].rules, dict(zip(AABB_KEYS, store.aabbs[i])), float(store.rotations[i]),
+                )
+            )
+        )
+    ]
+
+    clearance = store.clearance
+    if clearance is None:
+        clearance = ClearanceMap(
+            room, room.z_min, room.z_min + HUMAN_SIZE[2],
+            base=None if static is None else static.clearance,
+        )
+        for i in range(n):
+            clearance.add_item(store, i)
+
+    keepout = np.zeros((0, 6)) if static is None else static.keepout
+    return {
+        "base": base,
+        "walk": grid,
+        "furniture": _obb_cells(store, range(n), room, GRID_STEP, grid.shape),
+        "keepout": _box_cells(keepout, room, GRID_STEP, grid.shape),
+        "reach": reach,
+        "blocked": _obb_cells(store, blocked, room, GRID_STEP, grid.shape),
+        "entries": np.array(entries, dtype=int).reshape(-1, 2),
+        "clearance": clearance.occupancy(),
+        "rejects": np.zeros(grid.shape, dtype=np.int32) if rejects is None else rejects.counts,
+    }
+
+
+# ============================================================
+# ПАНЕЛИ
+# ============================================================
+
+def _paint(rgb: np.ndarray, mask: np.ndarray, color, alpha: float = 1.0):
+    if alpha >= 1.0:
+        rgb[mask] = color
+    else:
+        rgb[mask] = (rgb[mask] * (1.0 - alpha) + np.array(color) * alpha).astype(np.uint8)
+
+
+def _canvas(shape, color=FREE) -> np.ndarray:
+    rgb = np.empty((*shape, 3), dtype=np.uint8)
+    rgb[...] = color
+    return rgb
+
+
+def _to_image(rgb: np.ndarray, step: float) -> np.ndarray:
+    """Растр (nx, ny, 3) -> картинка (строки — y сверху вниз), клетка — квадрат пикселей."""
+    k = max(1, int(round(PX_PER_M * step)))
+    img = np.repeat(np.repeat(rgb, k, axis=0), k, axis=1)
+    return img.transpose(1, 0, 2)[::-1]
+
+
+def _walk_panel(layers) -> np.ndarray:
+    rgb = _canvas(layers["walk"].shape)
+    _paint(rgb, layers["base"] & ~layers["walk"], INFLATED)
+    _paint(rgb, ~layers["base"], STATIC)
+    _paint(rgb, layers["furniture"], FURNITURE)
+    _paint(rgb, layers["keepout"], KEEPOUT, 0.5)
+    return rgb
+
+
+def _reach_panel(layers) -> np.ndarray:
+    rgb = _canvas(layers["walk"].shape, STATIC)
+    _paint(rgb, layers["walk"] & ~layers["reach"], POCKET)
+    _paint(rgb, layers["reach"], REACH)
+    _paint(rgb, layers["furniture"], FURNITURE)
+    _paint(rgb, layers["blocked"], BLOCKED)
+    for gx, gy in layers["entries"].tolist():
+        rgb[max(gx - 1, 0): gx + 2, max(gy - 1, 0): gy + 2] = ENTRY
+    return rgb
+
+
+def _clearance_panel(layers) -> np.ndarray:
+    occ = layers["clearance"]
+    rgb = _canvas(occ.shape)
+    # 1 предмет — серый, наложения — темнее
+    shade = np.clip(255 - 90 * occ, 40, 255).astype(np.uint8)
+    rgb[occ > 0] = shade[occ > 0, None]
+    return rgb
+
+
+def _rejects_panel(layers) -> np.ndarray:
+    counts = layers["rejects"]
+    rgb = _canvas(counts.shape)
+    hot = counts > 0
+    if hot.any():
+        # от жёлтого (единицы) к красному (максимум), шкала логарифмическая
+        t = np.log1p(counts[hot]) / np.log1p(counts.max())
+        rgb[hot] = np.column_stack((np.full(t.shape, 255), 230 * (1 - t), np.zeros(t.shape))).astype(np.uint8)
+    _paint(rgb, layers["furniture"], FURNITURE, 0.4)
+    return rgb
+
+
+def compose(layers: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Картинка снимка: панели слева направо — сетка прохода (раздутые
+    предметы, статика, запретные зоны), достижимость от входов, растр
+    занятости, тепловая карта отклонённых кандидатов. Ось y — вверх.
+    """
+    panels = [
+        _to_image(_walk_panel(layers), GRID_STEP),
+        _to_image(_reach_panel(layers), GRID_STEP),
+        _to_image(_clearance_panel(layers), CLEARANCE_STEP),
+        _to_image(_rejects_panel(layers), GRID_STEP),
+    ]
+    h = max(p.shape[0] for p in panels)
+    row = []
+    for p in panels:
+        pad = np.empty((h - p.shape[0], p.shape[1], 3), dtype=np.uint8)
+        pad[...] = BACKGROUND
+        row.append(np.vstack((pad, p)))
+        gap = np.empty((h, GAP_PX, 3), dtype=np.uint8)
+        gap[...] = BACKGROUND
+        row.append(gap)
+    return np.hstack(row[:-1])
+
+
+# ============================================================
+# ЗАПИСЬ PNG (БЕЗ MATPLOTLIB)
+# ============================================================
+
+def write_png(path: str, img: np.ndarray):
+    """RGB uint8 (h, w, 3) -> PNG: фильтр None, zlib — миллисекунды на снимок."""
+    h, w, _ = img.shape
+    raw = np.hstack((np.zeros((h, 1), dtype=np.uint8), img.reshape(h, w * 3))).tobytes()
+
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", w, h, 8, 2, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw, 6)))
+        f.write(chunk(b"IEND", b""))
+
+
+def render_debug(path: str, room: Room, store, static=None, rejects: Optional[RejectMap] = None) -> str:
+    """Снимок сцены store в PNG path (см. compose); возвращает path."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    write_png(path, compose(debug_layers(room, store, static, rejects)))
+    return path
+
+
+def debug_snapshot(debug_dir: Optional[str], name: str, room: Room, store, static=None, rejects=None):
+    """Снимок попытки в debug_dir/name.png; debug_dir=None — ничего не делает."""
+    if debug_dir is None:
+        return
+    started = time.perf_counter()
+    path = render_debug(os.path.join(debug_dir, f"{name}.png"), room, store, static, rejects)
+    print(f"🖼️ {path} ({(time.perf_counter() - started) * 1000:.0f} мс)")
@@ -0,0 +1,251 @@
+import math
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from svg_plan import PLAN_CACHE_DIR, file_hash
+
+
+# ============================================================
+# НАСТРОЙКИ
+# ============================================================
+
+FOOTPRINT_CACHE_DIR = PLAN_CACHE_DIR   # тот же src/data/cache, что у разбора планов
+MAX_PARTS = 4            # больше мешей в модели — одна общая оболочка
+HULL_ROUND_M = 1e-3      # точки проекции округляются до мм перед построением оболочки
+EPS = 1e-9
+
+Parts = Tuple[np.ndarray, ...]   # выпуклые многоугольники (M, 2) против часовой стрелки
+
+# glTF: accessor.componentType
+FLOAT = 5126
+
+
+# ============================================================
+# ЧТЕНИЕ МЕША
+# ============================================================
+
+def _node_matrix(node) -> np.ndarray:
+    if node.matrix:
+        return np.array(node.matrix, dtype=float).reshape(4, 4).T   # glTF — по столбцам
+
+    m = np.eye(4)
+    if node.scale:
+        m = np.diag([*node.scale, 1.0]) @ m
+    if node.rotation:
+        x, y, z, w = node.rotation
+        r = np.array([
+            [1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)],
+            [2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)],
+            [2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)],
+        ])
+        rm = np.eye(4)
+        rm[:3, :3] = r
+        m = rm @ m
+    if node.translation:
+        tm = np.eye(4)
+        tm[:3, 3] = node.translation
+        m = tm @ m
+    return m
+
+
+def _positions(gltf, blob: bytes, accessor_index: int) -> np.ndarray:
+    accessor = gltf.accessors[accessor_index]
+    if accessor.componentType != FLOAT:
+        raise RuntimeError(f"❌ POSITION не float32 (componentType {accessor.componentType})")
+
+    view = gltf.bufferViews[accessor.bufferView]
+    offset = (view.byteOffset or 0) + (accessor.byteOffset or 0)
+    stride = view.byteStride or 12
+    return np.ndarray(
+        (accessor.count, 3), dtype=np.float32, buffer=blob, offset=offset, strides=(stride, 4),
+    ).astype(float)
+
+
+def read_mesh_parts(path: str) -> List[np.ndarray]:
+    """
+    Вершины модели (GLB или glTF с внешними буферами) в метрах, с учётом
+    трансформов узлов сцены, спроецированные на пол: по массиву (N, 2)
+    на каждый экземпляр меша. Оси — как у комнаты (glb_parser):
+    X = X_raw, Y = Z_raw, высота — Y_raw.
+    """
+    # pygltflib нужен только при разборе модели — не тянем его при импорте модуля
+    from pygltflib import GLTF2, BufferFormat
+
+    gltf = GLTF2().load(path)
+    gltf.convert_buffers(BufferFormat.BINARYBLOB)
+    blob = gltf.binary_blob()
+    if blob is None:
+        raise RuntimeError(f"❌ В {path} нет данных буфера")
+
+    parts = []
+
+    def visit(index: int, parent: np.ndarray):
+        node = gltf.nodes[index]
+        m = parent @ _node_matrix(node)
+        if node.mesh is not None:
+            pts = [
+                _positions(gltf, blob, prim.attributes.POSITION)
+                for prim in gltf.meshes[node.mesh].primitives
+                if prim.attributes.POSITION is not None
+            ]
+            if pts:
+                v = np.vstack(pts)
+                v = v @ m[:3, :3].T + m[:3, 3]
+                parts.append(v[:, [0, 2]])
+        for child in node.children or ():
+            visit(child, m)
+
+    scene = gltf.scenes[gltf.scene or 0] if gltf.scenes else None
+    roots = scene.nodes if scene is not None else range(len(gltf.nodes))
+    for root in roots:
+        visit(root, np.eye(4))
+
+    if not parts:
+        raise RuntimeError(f"❌ В {path} не найдено ни одной вершины POSITION")
+    return parts
+
+
+# ============================================================
+# ВЫПУКЛАЯ ОБОЛОЧКА
+# ============================================================
+
+def convex_hull(points: np.ndarray) -> np.ndarray:
+    """Выпуклая оболочка точек (монотонная цепочка Эндрю), против часовой стрелки."""
+    pts = np.unique(np.round(points / HULL_ROUND_M).astype(np.int64), axis=0)
+    if len(pts) < 3:
+        return pts.astype(float) * HULL_ROUND_M
+
+    def chain(seq):
+        out = []
+        for p in seq:
+            while len(out) >= 2:
+                (ax, ay), (bx, by) = out[-2], out[-1]
+                if (bx - ax) * (p[1] - ay) - (by - ay) * (p[0] - ax) > 0:
+                    break
+                out.pop()
+            out.append(p)
+        return out
+
+    seq = pts.tolist()   # np.unique уже отсортировал по x, затем по y
+    lower, upper = chain(seq), chain(reversed(seq))
+    return np.array(lower[:-1] + upper[:-1], dtype=float) * HULL_ROUND_M
+
+
+def build_footprint(parts: Sequence[np.ndarray]) -> Parts:
+    """
+    Оболочки частей в долях габарита модели: весь след вписан в
+    [-0.5, 0.5]^2, поэтому масштабируется под любой сэмплированный
+    размер предмета умножением на (sx, sy).
+    """
+    if len(parts) > MAX_PARTS:
+        parts = [np.vstack(parts)]
+
+    pts = np.vstack(parts)
+    lo, hi = pts.min(axis=0), pts.max(axis=0)
+    span = np.maximum(hi - lo, EPS)
+    center = (lo + hi) / 2
+
+    hulls = [convex_hull(p) for p in parts]
+    return tuple((h - center) / span for h in hulls if len(h) >= 3)
+
+
+# ============================================================
+# КЭШ ПО МОДЕЛИ
+# ============================================================
+
+_LOADED: Dict[Tuple[str, float, int], Parts] = {}   # (путь, mtime, размер) -> след
+_BY_HASH: Dict[str, Parts] = {}                     # хэш содержимого -> след (копии одной модели)
+
+
+def load_footprint(path: str, cache_dir: Optional[str] = FOOTPRINT_CACHE_DIR) -> Parts:
+    """
+    След модели на полу — по выпуклой оболочке на часть. Считается один
+    раз на файл: в памяти процесса — по (путь, mtime, размер) без чтения
+    файла, иначе по хэшу содержимого в памяти и в cache_dir (.npz),
+    так что в следующих запусках меш не читается.
+    """
+    st = os.stat(path)
+    stamp = (os.path.abspath(path), st.st_mtime, st.st_size)
+    if stamp in _LOADED:
+        return _LOADED[stamp]
+
+    key = file_hash(path)[:16]
+    footprint = _BY_HASH.get(key)
+    if footprint is None:
+        footprint = _load_hashed(path, key, cache_dir)
+        _BY_HASH[key] = footprint
+
+    _LOADED[stamp] = footprint
+    return footprint
+
+
+def _load_hashed(path: str, key: str, cache_dir: Optional[str]) -> Parts:
+    cached = os.path.join(cache_dir, f"footprint_{key}.npz") if cache_dir else None
+    if cached and os.path.exists(cached):
+        with np.load(cached) as z:
+            return tuple(np.split(z["points"], z["splits"]))
+
+    footprint = build_footprint(read_mesh_parts(path))
+    # пустой след (вырожденная модель) не кэшируется на диск: vstack от пустого кортежа падает
+    if cached and footprint:
+        os.makedirs(cache_dir, exist_ok=True)
+        splits = np.cumsum([len(h) for h in footprint])[:-1]
+        np.savez_compressed(cached, points=np.vstack(footprint), splits=splits)
+    return footprint
+
+
+# ============================================================
+# УЗКАЯ ФАЗА ПО ОБОЛОЧКАМ
+# ============================================================
+
+_UNIT_RECT = (np.array([[-0.5, -0.5], [0.5, -0.5], [0.5, 0.5], [-0.5, 0.5]]),)
+
+
+def place_parts(footprint: Optional[Parts], cx: float, cy: float, sx: float, sy: float, rot: float) -> List[np.ndarray]:
+    """Части следа в мировых осях; None — сам прямоугольник sx x sy."""
+    a = math.radians(rot)
+    c, s = math.cos(a), math.sin(a)
+    r = np.array([[c, s], [-s, c]])    # строка-точка @ r — поворот на rot
+    return [(part * (sx, sy)) @ r + (cx, cy) for part in footprint or _UNIT_RECT]
+
+
+def _separated(a: np.ndarray, b: np.ndarray) -> bool:
+    """Есть разделяющая ось среди нормалей рёбер a (касание — разделение)."""
+    edges = np.roll(a, -1, axis=0) - a
+    normals = np.column_stack((edges[:, 1], -edges[:, 0]))
+    pa = a @ normals.T
+    pb = b @ normals.T
+    return bool(np.any((pb.min(axis=0) >= pa.max(axis=0) - EPS) | (pa.min(axis=0) >= pb.max(axis=0) - EPS)))
+
+
+def parts_overlap(a: List[np.ndarray], b: List[np.ndarray]) -> bool:
+    """Пересекаются ли хоть какие-то выпуклые части a и b (SAT)."""
+    return any(not _separated(pa, pb) and not _separated(pb, pa) for pa in a for pb in b)
+
+
+def refine_pairs(
+    centers_a: np.ndarray,
+    sizes_a: np.ndarray,
+    rots_a: np.ndarray,
+    footprint_a: Optional[Parts],
+    centers_b: np.ndarray,
+    sizes_b: np.ndarray,
+    rots_b: np.ndarray,
+    footprints_b: List[Optional[Parts]],
+) -> np.ndarray:
+    """
+    Уточняет пары, уже перекрывшиеся по OBB: у кого есть след — тот
+    берётся вместо прямоугольника. Пары без следов с обеих сторон
+    остаются перекрытыми без пересчёта.
+    """
+    hit = np.ones(len(centers_a), dtype=bool)
+    for k in range(len(centers_a)):
+        fb = footprints_b[k]
+        if footprint_a is None and fb is None:
+            continue
+        pa = place_parts(footprint_a, *centers_a[k], *sizes_a[k], float(rots_a[k]))
+        pb = place_parts(fb, *centers_b[k], *sizes_b[k], float(rots_b[k]))
+        hit[k] = parts_overlap(pa, pb)
+    return hit
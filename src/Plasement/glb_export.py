@@ -0,0 +1,188 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+DEFAULT_GLB = "src/data/input/room.glb"
+OUTPUT_GLB = "src/data/output/placement_result.glb"
+
+ROOM_COLOR = (0.85, 0.85, 0.85)
+FLOOR_THICKNESS_M = 0.01   # пол отдельной комнаты (без room.glb) — тонкая плита
+
+# glTF: bufferView.target, accessor.componentType
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+FLOAT = 5126
+UNSIGNED_SHORT = 5123
+
+
+# ============================================================
+# ЕДИНИЧНЫЙ КУБ
+# ============================================================
+
+def unit_box() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Куб [-0.5, 0.5]^3: 24 вершины (у каждой грани свои нормали),
+    нормали и 36 индексов треугольников.
+    """
+    positions, normals, indices = [], [], []
+
+    for axis in range(3):
+        for sign in (-1.0, 1.0):
+            normal = [0.0, 0.0, 0.0]
+            normal[axis] = sign
+            u, v = [a for a in range(3) if a != axis]
+
+            base = len(positions)
+            for du, dv in ((-0.5, -0.5), (0.5, -0.5), (0.5, 0.5), (-0.5, 0.5)):
+                p = [0.0, 0.0, 0.0]
+                p[axis], p[u], p[v] = sign * 0.5, du, dv
+                positions.append(p)
+                normals.append(normal)
+
+            # обход против часовой стрелки, если смотреть снаружи
+            a, b, c = (np.array(positions[base + k]) for k in range(3))
+            outward = np.dot(np.cross(b - a, c - a), normal) > 0
+            quad = (0, 1, 2, 0, 2, 3) if outward else (0, 2, 1, 0, 3, 2)
+            indices.extend(base + q for q in quad)
+
+    return (
+        np.array(positions, dtype=np.float32),
+        np.array(normals, dtype=np.float32),
+        np.array(indices, dtype=np.uint16),
+    )
+
+
+# ============================================================
+# ПРЕОБРАЗОВАНИЕ КООРДИНАТ
+# ============================================================
+
+def to_gltf(x: float, y: float, z: float) -> List[float]:
+    """
+    Наши оси -> оси room.glb (обратное к маппингу glb_parser):
+    X = X_raw, Y = Z_raw, Z = Y_raw.
+    """
+    return [x, z, y]
+
+
+def item_transform(center, size, rotation_deg: float):
+    """
+    translation, rotation (кватернион xyzw), scale узла предмета.
+    Маппинг осей — отражение, поэтому поворот на +a вокруг нашей Z —
+    это поворот на -a вокруг Y glTF.
+    """
+    half = -math.radians(rotation_deg) / 2
+    rotation = [0.0, math.sin(half), 0.0, math.cos(half)]
+    sx, sy, sz = size
+    return to_gltf(*center), rotation, [sx, sz, sy]
+
+
+# ============================================================
+# ЭКСПОРТ
+# ============================================================
+
+def export_glb(result: dict, path: str = OUTPUT_GLB, room_glb: Optional[str] = DEFAULT_GLB) -> str:
+    """
+    Пишет сцену (комната + предметы из placement_result) в один GLB.
+
+    Геометрия куба хранится один раз; каждый предмет — узел со своим
+    переносом/поворотом/масштабом, ссылающийся на общий меш (по мешу на
+    цвет — они делят одни и те же accessor'ы). Все данные — в одном
+    упакованном бинарном буфере. room_glb — исходная комната: её узлы,
+    меши и буфер сохраняются, предметы дописываются в ту же сцену;
+    None — вместо неё кладётся плита пола по размерам комнаты.
+    """
+    # pygltflib нужен только при экспорте — не тянем его при импорте модуля
+    from pygltflib import (
+        GLTF2, Accessor, Asset, Attributes, Buffer, BufferView, Material,
+        Mesh, Node, PbrMetallicRoughness, Primitive, Scene,
+    )
+
+    if room_glb is not None:
+        gltf = GLTF2().load(room_glb)
+        blob = gltf.binary_blob()
+        if blob is None:
+            raise RuntimeError(f"❌ В {room_glb} нет встроенного буфера (нужен .glb)")
+    else:
+        gltf = GLTF2(asset=Asset(version="2.0"), scenes=[Scene(nodes=[])], scene=0)
+        blob = b""
+
+    if not gltf.buffers:
+        gltf.buffers.append(Buffer(byteLength=0))
+    if not gltf.scenes:
+        gltf.scenes.append(Scene(nodes=[]))
+        gltf.scene = 0
+    scene = gltf.scenes[gltf.scene or 0]
+
+    # ---------- общий буфер куба ----------
+    positions, normals, indices = unit_box()
+    data = bytearray(blob)
+
+    def append_view(array: np.ndarray, target: int) -> int:
+        data.extend(b"\0" * (-len(data) % 4))
+        gltf.bufferViews.append(BufferView(
+            buffer=0, byteOffset=len(data), byteLength=array.nbytes, target=target,
+        ))
+        data.extend(array.tobytes())
+        return len(gltf.bufferViews) - 1
+
+    pos_view = append_view(positions, ARRAY_BUFFER)
+    nrm_view = append_view(normals, ARRAY_BUFFER)
+    idx_view = append_view(indices, ELEMENT_ARRAY_BUFFER)
+
+    accessor = len(gltf.accessors)
+    gltf.accessors.extend([
+        Accessor(bufferView=pos_view, componentType=FLOAT, count=len(positions), type="VEC3",
+                 min=positions.min(axis=0).tolist(), max=positions.max(axis=0).tolist()),
+        Accessor(bufferView=nrm_view, componentType=FLOAT, count=len(normals), type="VEC3"),
+        Accessor(bufferView=idx_view, componentType=UNSIGNED_SHORT, count=len(indices), type="SCALAR"),
+    ])
+
+    meshes: Dict[Tuple[float, ...], int] = {}
+
+    def box_mesh(color) -> int:
+        key = tuple(round(float(c), 4) for c in color[:3])
+        if key not in meshes:
+            gltf.materials.append(Material(
+                name=f"color_{len(meshes)}",
+                pbrMetallicRoughness=PbrMetallicRoughness(
+                    baseColorFactor=[*key, 1.0], metallicFactor=0.0, roughnessFactor=0.9,
+                ),
+            ))
+            gltf.meshes.append(Mesh(primitives=[Primitive(
+                attributes=Attributes(POSITION=accessor, NORMAL=accessor + 1),
+                indices=accessor + 2,
+                material=len(gltf.materials) - 1,
+            )]))
+            meshes[key] = len(gltf.meshes) - 1
+        return meshes[key]
+
+    def add_node(node) -> None:
+        gltf.nodes.append(node)
+        scene.nodes.append(len(gltf.nodes) - 1)
+
+    # ---------- комната ----------
+    if room_glb is None:
+        r = result["room"]
+        center = ((r["x_min"] + r["x_max"]) / 2, (r["y_min"] + r["y_max"]) / 2, r["z_min"] - FLOOR_THICKNESS_M / 2)
+        size = (r["x_max"] - r["x_min"], r["y_max"] - r["y_min"], FLOOR_THICKNESS_M)
+        translation, rotation, scale = item_transform(center, size, 0.0)
+        add_node(Node(name="floor", mesh=box_mesh(ROOM_COLOR),
+                      translation=translation, rotation=rotation, scale=scale))
+
+    # ---------- предметы ----------
+    for i, obj in enumerate(result["items"]):
+        translation, rotation, scale = item_transform(obj["center"], obj["size"], obj["rotation"])
+        add_node(Node(
+            name=f"{obj['name']}_{i}",
+            mesh=box_mesh(obj.get("color") or (1.0, 1.0, 1.0)),
+            translation=translation, rotation=rotation, scale=scale,
+            extras={"name": obj["name"], "wall_contact_side": obj.get("wall_contact_side")},
+        ))
+
+    data.extend(b"\0" * (-len(data) % 4))
+    gltf.buffers[0].byteLength = len(data)
+    gltf.set_binary_blob(bytes(data))
+    gltf.save_binary(path)
+    return path
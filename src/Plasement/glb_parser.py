@@ -1,4 +1,3 @@
-from pygltflib import GLTF2
 import numpy as np
 
 
@@ -40,6 +39,9 @@ def load_room_from_glb(path: str) -> Room:
         Y = ширина  = Z_raw
         Z = высота  = Y_raw
     """
+    # pygltflib нужен только при разборе файла — не тянем его при импорте модуля
+    from pygltflib import GLTF2
+
     print("Чтение GLB:", path)
 
     gltf = GLTF2().load(path)
@@ -0,0 +1,269 @@
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from constraints import (
+    SIDE_NORMAL_DEG,
+    SIDES,
+    WALL_NORMAL_DEG,
+    ItemRules,
+    compile_constraints,
+    half_extents,
+    side_rects,
+)
+
+
+# ============================================================
+# ШАБЛОНЫ ГРУПП (КАТАЛОГ)
+# ============================================================
+# Шаблон из furniture_types.json / objects.json ("groups"):
+#   {
+#     "name": "bed_with_nightstands",
+#     "constraints": {...},             # ограничения группы как целого (стена, угол)
+#     "clearance_mm": {"front": 800},   # общая свободная полоса у сторон группы
+#     "members": [
+#       {"name": "bed_double", "constraints": {...}},   # первый — опорный предмет
+#       {"name": "nightstand", "side": "left", "align": "back", "gap_mm": 50},
+#       ...
+#     ]
+#   }
+# Положение участника задаётся относительно граней опорного предмета
+# в его локальных осях (x — вправо, y — вперёд):
+#   side        — у какой грани опорного стоит (front/back/left/right)
+#   align       — к какому краю этой грани прижат (для front/back — left/right,
+#                 для left/right — front/back; по умолчанию center)
+#   along       — сдвиг вдоль грани в долях её длины (-0.5 .. 0.5)
+#   gap_mm      — зазор до грани
+#   rotation_deg — поворот участника относительно опорного
+#   constraints — ограничения участника внутри группы вместо каталожных
+# Поэтому шаблон подходит к любым сэмплированным размерам предметов.
+
+ALIGN_SIDES = {
+    "front": ("left", "right"), "back": ("left", "right"),
+    "left": ("front", "back"), "right": ("front", "back"),
+}
+
+
+class GroupTemplate:
+    __slots__ = ("name", "constraints", "clearance", "members")
+
+    def __init__(self, spec: dict):
+        self.name = spec["name"]
+        self.constraints = spec.get("constraints") or {"mount_type": "floor"}
+
+        self.clearance: Dict[str, float] = {}
+        for side, mm in (spec.get("clearance_mm") or {}).items():
+            if side not in SIDES:
+                raise RuntimeError(f"❌ Группа {self.name}: неизвестная сторона clearance_mm {side}")
+            self.clearance[side] = float(mm) / 1000.0
+
+        members = spec.get("members") or []
+        if len(members) < 2:
+            raise RuntimeError(f"❌ Группа {self.name}: нужен опорный предмет и хотя бы один участник")
+
+        for m in members[1:]:
+            side, align = m.get("side"), m.get("align", "center")
+            if side not in SIDES:
+                raise RuntimeError(f"❌ Группа {self.name}: у {m.get('name')} неизвестная сторона {side}")
+            if align != "center" and align not in ALIGN_SIDES[side]:
+                raise RuntimeError(f"❌ Группа {self.name}: {m['name']} у {side} нельзя выровнять по {align}")
+        self.members = members
+
+    @property
+    def names(self) -> List[str]:
+        return [m["name"] for m in self.members]
+
+
+def load_templates(specs: Optional[Sequence[dict]]) -> List[GroupTemplate]:
+    return [GroupTemplate(spec) for spec in specs or ()]
+
+
+# ============================================================
+# ГРУППА — ОДНА ПЕРЕМЕННАЯ ПОИСКА
+# ============================================================
+
+class Group:
+    """
+    Жёсткая группа предметов по шаблону. Для поиска выглядит как один
+    предмет (name, rules, sx/sy/sz): прямоугольник-оболочка всех
+    участников вместе с общими свободными полосами clearance_mm. По
+    центру и повороту оболочки poses() даёт позы участников.
+
+      members — Item участников (первый — опорный)
+      local   — (K, 3): центр участника и его поворот в осях опорного
+      offset  — центр оболочки в осях опорного
+    """
+
+    __slots__ = ("template", "members", "rules", "sx", "sy", "sz", "local", "offset")
+
+    def __init__(self, template: GroupTemplate, members: List, rotation_step: Optional[float] = None):
+        self.template = template
+        self.members = members
+        self.rules: ItemRules = compile_constraints(template.constraints, rotation_step)
+
+        for item, spec in zip(members, template.members):
+            if "constraints" in spec:
+                item.extra = spec["constraints"]
+                item.rules = compile_constraints(item.extra, rotation_step)
+
+        self.layout()
+
+    @property
+    def name(self) -> str:
+        return self.template.name
+
+    @property
+    def size(self) -> Tuple[float, float, float]:
+        return self.sx, self.sy, self.sz
+
+    # ---------- раскладка по шаблону ----------
+
+    def layout(self):
+        """Пересчитывает позы участников и оболочку по текущим размерам."""
+        anchor = self.members[0]
+        ax, ay = anchor.sx, anchor.sy
+        local = [(0.0, 0.0, 0.0)]
+        lo_x, hi_x, lo_y, hi_y = -ax / 2, ax / 2, -ay / 2, ay / 2
+
+        for item, spec in zip(self.members[1:], self.template.members[1:]):
+            rot = float(spec.get("rotation_deg", 0.0))
+            ex, ey = (float(v) for v in half_extents(np.array([item.sx, item.sy]), rot))
+            gap = float(spec.get("gap_mm", 0.0)) / 1000.0
+            side, align = spec["side"], spec.get("align", "center")
+            along = float(spec.get("along", 0.0))
+
+            if side in ("front", "back"):
+                y = (ay / 2 + gap + ey) * (1.0 if side == "front" else -1.0)
+                x = along * ax + {"left": -ax / 2 + ex, "right": ax / 2 - ex}.get(align, 0.0)
+            else:
+                x = (ax / 2 + gap + ex) * (1.0 if side == "right" else -1.0)
+                y = along * ay + {"back": -ay / 2 + ey, "front": ay / 2 - ey}.get(align, 0.0)
+
+            local.append((x, y, rot))
+            lo_x, hi_x = min(lo_x, x - ex), max(hi_x, x + ex)
+            lo_y, hi_y = min(lo_y, y - ey), max(hi_y, y + ey)
+
+        # общие свободные полосы входят в оболочку — поиск сам держит их пустыми
+        c = self.template.clearance
+        lo_x, hi_x = lo_x - c.get("left", 0.0), hi_x + c.get("right", 0.0)
+        lo_y, hi_y = lo_y - c.get("back", 0.0), hi_y + c.get("front", 0.0)
+
+        self.local = np.array(local)
+        self.offset = ((lo_x + hi_x) / 2, (lo_y + hi_y) / 2)
+        self.sx, self.sy = hi_x - lo_x, hi_y - lo_y
+        self.sz = max(item.sz for item in self.members)
+
+    def poses(self, cx: float, cy: float, rot: float) -> np.ndarray:
+        """(K, 3): мировые центр XY и поворот участников при оболочке в (cx, cy, rot)."""
+        a = math.radians(rot)
+        c, s = math.cos(a), math.sin(a)
+        lx = self.local[:, 0] - self.offset[0]
+        ly = self.local[:, 1] - self.offset[1]
+        return np.column_stack((
+            cx + lx * c - ly * s,
+            cy + lx * s + ly * c,
+            (rot + self.local[:, 2]) % 360.0,
+        ))
+
+    def clearance_rects(self, cx: float, cy: float, rot: float):
+        """Общие свободные полосы в мировых осях: [(центр, размер)] с поворотом rot."""
+        c = self.template.clearance
+        core = (self.sx - c.get("left", 0.0) - c.get("right", 0.0),
+                self.sy - c.get("back", 0.0) - c.get("front", 0.0))
+        shift = ((c.get("left", 0.0) - c.get("right", 0.0)) / 2, (c.get("back", 0.0) - c.get("front", 0.0)) / 2)
+        a = math.radians(rot)
+        ccx = cx + shift[0] * math.cos(a) - shift[1] * math.sin(a)
+        ccy = cy + shift[0] * math.sin(a) + shift[1] * math.cos(a)
+        return [side_rects(ccx, ccy, rot, core[0], core[1], side, depth) for side, depth in c.items() if depth > 0]
+
+    # ---------- размеры ----------
+
+    def at_min_size(self) -> bool:
+        return all(item.at_min_size() for item in self.members)
+
+    def shrink(self, fraction: float):
+        for item in self.members:
+            item.shrink(fraction)
+        self.layout()
+
+
+# ============================================================
+# ПРОВЕРКА УЧАСТНИКА
+# ============================================================
+
+WALL_CONTACT_EPS = 0.02   # зазор до стены, при котором грань участника считается прижатой
+
+
+def wall_contact(room, rules: ItemRules, cx: float, cy: float, rot: float, sx: float, sy: float) -> Optional[str]:
+    """
+    Стена комнаты, к которой прижата нужная грань участника (rules.wall_side),
+    или None. Грань смотрит на стену, если её нормаль совпадает с нормалью
+    стены (как в wall_slots), и прижата, если зазор меньше WALL_CONTACT_EPS.
+    """
+    hx, hy = (float(v) for v in half_extents(np.array([sx, sy]), rot))
+    gaps = {
+        "front": cy - hy - room.y_min, "back": room.y_max - cy - hy,
+        "left": cx - hx - room.x_min, "right": room.x_max - cx - hx,
+    }
+    faces = SIDES if rules.wall_side == "any" else (rules.wall_side,)
+
+    for face in faces:
+        normal = (rot + SIDE_NORMAL_DEG[face]) % 360.0
+        for wall, wall_normal in WALL_NORMAL_DEG.items():
+            diff = abs((normal - wall_normal + 180.0) % 360.0 - 180.0)
+            if diff < 1e-3 and gaps[wall] < WALL_CONTACT_EPS:
+                return wall
+    return None
+
+
+# ============================================================
+# СБОРКА ГРУПП ИЗ ЗАПРОСА
+# ============================================================
+
+def form_groups(items: List, templates: Sequence[GroupTemplate], rotation_step: Optional[float] = None) -> List:
+    """
+    Заменяет в списке предметов наборы, совпавшие с шаблоном (опорный
+    и все участники по именам), на Group. Шаблоны применяются по
+    порядку, каждый — сколько раз набирается. Группа встаёт на место
+    своего опорного предмета, остальные предметы — как были.
+    """
+    free = list(items)
+    groups: Dict[int, Group] = {}
+
+    for template in templates:
+        while True:
+            picked, taken = [], set()
+            for name in template.names:
+                k = next((k for k, it in enumerate(free) if it is not None and k not in taken and it.name == name), None)
+                if k is None:
+                    break
+                picked.append(k)
+                taken.add(k)
+            else:
+                groups[picked[0]] = Group(template, [free[k] for k in picked], rotation_step)
+                for k in picked:
+                    free[k] = None
+                continue
+            break
+
+    units = []
+    for k, item in enumerate(free):
+        if k in groups:
+            units.append(groups[k])
+        elif item is not None:
+            units.append(item)
+    return units
+
+
+def flatten(units: List) -> List:
+    """Список предметов по списку из предметов и групп."""
+    items = []
+    for unit in units:
+        items.extend(unit.members if isinstance(unit, Group) else (unit,))
+    return items
+
+
+def group_members(units: List) -> Dict[int, List]:
+    """{id(участника): все участники его группы} — группа убирается только целиком."""
+    return {id(item): unit.members for unit in units if isinstance(unit, Group) for item in unit.members}
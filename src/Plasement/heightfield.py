@@ -0,0 +1,212 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+from constraints import BATCH_SIZE, Candidates, ItemRules, make_rng
+from glb_parser import Room
+
+
+# ============================================================
+# НАСТРОЙКИ
+# ============================================================
+
+HEIGHTFIELD_STEP = 0.05   # сторона клетки карты высот (м)
+SUPPORT_EPS = 1e-6        # допуск сравнения высот опоры
+FLOOR_OWNER = -1
+
+
+# ============================================================
+# КАРТА ВЫСОТ ОПОР (2.5D)
+# ============================================================
+
+class HeightField:
+    """
+    Растр опорных поверхностей: для каждой клетки — высота самой верхней
+    поверхности, на которую можно что-то поставить (пол или верхняя грань
+    предмета), и её владелец (индекс в SceneStore, -1 — пол).
+
+    Запрос "на что я встану в точке (x, y)" — чтение одной клетки.
+    Постановка предмета обновляет только клетки под ним.
+    """
+
+    __slots__ = ("room", "step", "nx", "ny", "top", "owner")
+
+    def __init__(self, room: Room, step: float = HEIGHTFIELD_STEP):
+        self.room = room
+        self.step = step
+        self.nx = max(1, int(np.ceil(room.width / step)))
+        self.ny = max(1, int(np.ceil(room.depth / step)))
+        self.top = np.full((self.nx, self.ny), room.z_min)
+        self.owner = np.full((self.nx, self.ny), FLOOR_OWNER, dtype=np.int32)
+
+    def clear(self):
+        self.top[:] = self.room.z_min
+        self.owner[:] = FLOOR_OWNER
+
+    # ---------- клетки ----------
+
+    def cells(self, x, y) -> Tuple[np.ndarray, np.ndarray]:
+        gx = np.clip(((np.asarray(x) - self.room.x_min) / self.step).astype(int), 0, self.nx - 1)
+        gy = np.clip(((np.asarray(y) - self.room.y_min) / self.step).astype(int), 0, self.ny - 1)
+        return gx, gy
+
+    def cell_centers(self, gx, gy) -> Tuple[np.ndarray, np.ndarray]:
+        return (
+            self.room.x_min + (np.asarray(gx) + 0.5) * self.step,
+            self.room.y_min + (np.asarray(gy) + 0.5) * self.step,
+        )
+
+    def _footprint(self, cx, cy, sx, sy, rot):
+        """Окно клеток под AABB предмета и маска клеток, центр которых внутри OBB."""
+        a = np.radians(rot)
+        c, s = np.cos(a), np.sin(a)
+        hx = (abs(c) * sx + abs(s) * sy) / 2
+        hy = (abs(s) * sx + abs(c) * sy) / 2
+
+        (x0, x1), (y0, y1) = self.cells([cx - hx, cx + hx], [cy - hy, cy + hy])
+        gx = np.arange(x0, x1 + 1)
+        gy = np.arange(y0, y1 + 1)
+        px, py = self.cell_centers(gx[:, None], gy[None, :])
+
+        # координаты центров клеток в локальных осях предмета
+        dx, dy = px - cx, py - cy
+        u = dx * c + dy * s
+        v = -dx * s + dy * c
+        mask = (np.abs(u) <= sx / 2) & (np.abs(v) <= sy / 2)
+        return (slice(x0, x1 + 1), slice(y0, y1 + 1)), mask
+
+    # ---------- обновление ----------
+
+    def add(self, owner: int, cx: float, cy: float, sx: float, sy: float, rot: float, z_top: float):
+        window, mask = self._footprint(cx, cy, sx, sy, rot)
+        top = self.top[window]
+        higher = mask & (z_top >= top - SUPPORT_EPS)
+        top[higher] = z_top
+        self.owner[window][higher] = owner
+
+    def add_item(self, store, index: int):
+        """Верхняя грань предмета index становится опорой (если он может ей быть)."""
+        if not store.items[index].rules.is_support:
+            return
+        cx, cy, _ = store.centers[index].tolist()
+        sx, sy, _ = store.sizes[index].tolist()
+        self.add(index, cx, cy, sx, sy, float(store.rotations[index]), float(store.aabbs[index, 5]))
+
+    def rebuild(self, store):
+        self.clear()
+        # снизу вверх, чтобы верхние опоры перекрыли нижние
+        for index in np.argsort(store.aabbs[: store.count, 5], kind="stable"):
+            self.add_item(store, int(index))
+
+    def remove_item(self, store, index: int, box):
+        """
+        Вызывается после store.remove(index): box — AABB удалённого предмета.
+        Клетки под ним перестраиваются по оставшимся предметам, индексы
+        владельцев после index сдвигаются как в SceneStore.
+        """
+        owned = self.owner == index
+        self.top[owned] = self.room.z_min
+        self.owner[owned] = FLOOR_OWNER
+        self.owner[self.owner > index] -= 1
+        self._restack(store, box)
+
+    def lift_item(self, store, index: int, box):
+        """
+        Снимает предмет index с карты, оставляя его в store (перед переносом):
+        клетки под ним перестраиваются по остальным опорам. Вернуть —
+        add_item после store.move.
+        """
+        owned = self.owner == index
+        self.top[owned] = self.room.z_min
+        self.owner[owned] = FLOOR_OWNER
+        self._restack(store, box, skip=index)
+
+    def _restack(self, store, box, skip: int = -1):
+        """Заново кладёт (снизу вверх) опоры, задевающие box в плане."""
+        floor_box = (box[0], box[1], box[2], box[3], -np.inf, np.inf)
+        touching = store.overlapping(floor_box)
+        touching = touching[touching != skip]
+        for i in touching[np.argsort(store.aabbs[touching, 5], kind="stable")]:
+            self.add_item(store, int(i))
+
+    # ---------- запросы ----------
+
+    def at(self, x, y) -> Tuple[np.ndarray, np.ndarray]:
+        """Высота опоры и её владелец в точках (x, y) — O(1) на точку."""
+        gx, gy = self.cells(x, y)
+        return self.top[gx, gy], self.owner[gx, gy]
+
+    def support_under(self, cx, cy, sx, sy, rot):
+        """
+        Опора под K прямоугольниками: высота и владелец под центром и
+        флаг "под центром и всеми углами (с отступом в полклетки) одна и
+        та же опора" — предмет стоит на ней целиком.
+        """
+        a = np.radians(rot)
+        c, s = np.cos(a), np.sin(a)
+        hx = np.maximum(sx / 2 - self.step / 2, 0.0)
+        hy = np.maximum(sy / 2 - self.step / 2, 0.0)
+
+        top, owner = self.at(cx, cy)
+        flat = np.ones(np.shape(cx), dtype=bool)
+        for su, sv in ((-1, -1), (1, -1), (1, 1), (-1, 1)):
+            px = cx + su * hx * c - sv * hy * s
+            py = cy + su * hx * s + sv * hy * c
+            t, o = self.at(px, py)
+            flat &= (o == owner) & (np.abs(t - top) <= SUPPORT_EPS)
+
+        return top, owner, flat
+
+
+# ============================================================
+# КАНДИДАТЫ "НА ДРУГОМ ПРЕДМЕТЕ"
+# ============================================================
+
+def supports_for(store, rules: ItemRules) -> np.ndarray:
+    """Индексы предметов сцены, на которые можно поставить предмет с правилами rules."""
+    return np.array([
+        i for i in range(store.count)
+        if store.items[i].rules.is_support
+        and (not rules.support_names or store.items[i].name in rules.support_names)
+    ], dtype=np.int32)
+
+
+def sample_on_top(
+    heights: HeightField,
+    store,
+    rules: ItemRules,
+    room: Room,
+    sx: float,
+    sy: float,
+    sz: float,
+    k: int = BATCH_SIZE,
+) -> Optional[Candidates]:
+    """
+    k кандидатов на верхних гранях подходящих опор: случайные клетки,
+    владелец которых — допустимая опора, поворот — как у опоры с шагом 90°.
+    Кандидат допустим, если опора под ним целиком одна и та же и он
+    помещается по высоте. None — подходящих опор в сцене нет.
+    """
+    allowed = supports_for(store, rules)
+    if allowed.size == 0:
+        return None
+
+    cells = np.flatnonzero(np.isin(heights.owner, allowed))
+    if cells.size == 0:
+        return None
+
+    rng = make_rng()
+    pick = cells[rng.integers(0, cells.size, k)]
+    gx, gy = np.unravel_index(pick, heights.owner.shape)
+    owners = heights.owner[gx, gy]
+
+    cx, cy = heights.cell_centers(gx, gy)
+    cx = cx + rng.uniform(-0.5, 0.5, k) * heights.step
+    cy = cy + rng.uniform(-0.5, 0.5, k) * heights.step
+    rot = (store.rotations[owners] + 90.0 * rng.integers(0, 4, k)) % 360.0
+
+    top, owner, flat = heights.support_under(cx, cy, sx, sy, rot)
+    valid = flat & (owner == owners) & (top + sz <= room.z_max + SUPPORT_EPS)
+
+    walls = [None] * k
+    return Candidates(cx, cy, top + sz / 2, rot, walls, valid, sx, sy, sz)
@@ -0,0 +1,473 @@
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from clearance import ClearanceMap
+from constraints import (
+    SIDE_NORMAL_DEG,
+    SIDES,
+    WALL_MARGIN,
+    WALL_NEIGHBOURS,
+    WALL_NORMAL_DEG,
+    Candidates,
+    feasible_mask,
+    footprint_extents,
+    half_extents,
+    item_approach_targets,
+    reserve_zones,
+)
+from CubePlacement import Item, build_result, place_item
+from glb_parser import Room
+from heightfield import SUPPORT_EPS, HeightField, supports_for
+from pathfinding_astar import (
+    HUMAN_SIZE,
+    build_walk_grid,
+    reachable_mask,
+    update_reachable,
+    update_walk_grid,
+)
+from pathfinding_hpa import HPA_MIN_CELLS, HierarchicalGrid
+from scene_store import AABB_KEYS, SceneStore
+from shared_room import entry_sources
+from wall_slots import WallIntervals
+
+
+# ============================================================
+# НАСТРОЙКИ
+# ============================================================
+
+FURNITURE_DB = "src/data/input/furniture_types.json"
+RESULT_JSON = "src/data/output/placement_result.json"
+
+WALL_SNAP_M = 0.15     # ближе к стене/углу — предмет притягивается вплотную
+ADD_TRIES = 10         # сколько раз искать место для add без координат
+ANGLE_EPS = 1e-6
+
+
+class EditError(RuntimeError):
+    """Правка отклонена; сцена осталась как была. reason — код причины."""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+# ============================================================
+# РЕДАКТОР ГОТОВОЙ РАССТАНОВКИ
+# ============================================================
+
+class LayoutEditor:
+    """
+    Правки готового placement_result.json по одной: add / move / remove.
+
+    Вместе со сценой (SceneStore с растром занятости) живут все индексы,
+    которые ведёт place_all: свободные участки стен, карта опор, а ещё
+    сетка проходимости, достижимость от входа и флаг подхода каждого
+    предмета. Правка проверяет только сам предмет (feasible_mask против
+    остальных), пересчитывает сетку в окне вокруг старого и нового места
+    и перепроверяет подход лишь у предметов, чьи точки подхода попали
+    в клетки, где достижимость изменилась. Правка, после которой к
+    какому-то предмету не подойти, откатывается (EditError).
+
+    На большой сетке (от HPA_MIN_CELLS клеток, целый дом) вместо маски
+    достижимости ведётся иерархический граф pathfinding_hpa: правка
+    перестраивает только задетые кластеры, а подход перепроверяется у
+    предметов в кластерах, где достижимость могла измениться.
+    """
+
+    def __init__(self, room: Room, store: SceneStore, catalog: Dict[str, dict], static=None):
+        self.room = room
+        self.store = store
+        self.catalog = catalog
+        # статические слои комнаты (shared_room.StaticRoom): основа сетки прохода и входы
+        self.static = static
+
+        for i in range(store.count):
+            reserve_zones(store, i, store.items[i].rules, room)
+
+        self.walls = WallIntervals(room, store.keepout)
+        self.walls.rebuild(store)
+        self.heights = HeightField(room)
+        self.heights.rebuild(store)
+
+        self.base = None if static is None else static.walk
+        self.walk = build_walk_grid(vars(room), store.aabbs[: store.count], base=self.base)
+        self.sources = entry_sources(room, self.walk[1], static)
+        self.hpa = None
+        self.reach = None
+        if self.walk[0].size >= HPA_MIN_CELLS:
+            self.hpa = HierarchicalGrid(self.walk[0])
+            self.hpa.reach_from(self.sources)
+        else:
+            self.reach = reachable_mask(self.walk[0], self.sources)
+        self.access = [self._has_access(i) for i in range(store.count)]
+
+        # что сделала последняя правка: операция, время, перепроверенные предметы
+        self.last_edit: dict = {}
+
+    # ---------- загрузка ----------
+
+    @classmethod
+    def from_result(cls, result: dict, catalog: Dict[str, dict], static=None) -> "LayoutEditor":
+        """
+        result — словарь формата placement_result.json. Ограничения
+        предметов берутся из каталога по имени (в результате их нет).
+        static — статические слои той же комнаты (двери, окна, маска пола).
+        """
+        room = Room(**{key: result["room"][key] for key in AABB_KEYS})
+        items = result["items"]
+
+        clearance = ClearanceMap(
+            room, room.z_min, room.z_min + HUMAN_SIZE[2],
+            base=None if static is None else static.clearance,
+        )
+        store = SceneStore(
+            capacity=len(items), clearance=clearance,
+            keepout=None if static is None else static.keepout,
+        )
+        for entry in items:
+            item = _make_item(catalog, entry["name"], entry.get("color"), entry["size"])
+            store.add(item, tuple(entry["center"]), float(entry["rotation"]), entry.get("wall_contact_side"))
+
+        return cls(room, store, catalog, static)
+
+    @classmethod
+    def load(cls, result_path: str = RESULT_JSON, catalog_path: str = FURNITURE_DB) -> "LayoutEditor":
+        with open(result_path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+        with open(catalog_path, "r", encoding="utf-8") as f:
+            catalog = {item["name"]: item for item in json.load(f)["items"]}
+        return cls.from_result(result, catalog)
+
+    def result(self) -> dict:
+        return build_result(self.room, self.store)
+
+    # ---------- правки ----------
+
+    def add(self, entry, center: Optional[Tuple[float, float]] = None, rotation: Optional[float] = None) -> dict:
+        """
+        Добавляет предмет: entry — имя из каталога или словарь формата
+        objects.json. Без center место ищется как в place_all (слоты
+        стен, опоры, кандидаты пачками), иначе предмет ставится в
+        (x, y) — с притяжением к стене/в угол, если он должен там стоять.
+        """
+        started = time.perf_counter()
+        store = self.store
+
+        if isinstance(entry, dict):
+            item = _make_item({entry["name"]: entry}, entry["name"], entry.get("color"))
+        else:
+            item = _make_item(self.catalog, entry)
+
+        for _ in range(ADD_TRIES if center is None else 1):
+            if center is None:
+                if not place_item(self.room, store, item, self.walls, self.heights):
+                    raise EditError(f"❌ Нет места для {item.name}", "no_room")
+                index = store.count - 1
+            else:
+                pose, wall = self._pose(item, center[0], center[1], rotation, exclude=-1)
+                index = store.add(item, pose[:3], pose[3], wall)
+                reserve_zones(store, index, item.rules, self.room)
+                self.walls.add_item(store, index)
+                self.heights.add_item(store, index)
+
+            self.access.append(False)
+            blocked = self._relayout(store.aabbs[index].tolist(), index)
+            if not blocked:
+                self._finish("add", started, index)
+                return self.result()
+
+            self._drop(index)
+
+        raise EditError(f"❌ {item.name} закрывает подход к: {', '.join(blocked)}", "no_access")
+
+    def move(self, index: int, center: Tuple[float, float], rotation: Optional[float] = None) -> dict:
+        """Переносит предмет index в (x, y); rotation=None — прежний поворот."""
+        started = time.perf_counter()
+        store = self.store
+        item = self._item(index)
+        self._check_not_carrying(index)
+
+        if rotation is None:
+            rotation = float(store.rotations[index])
+
+        old_pose = (*store.centers[index].tolist(), float(store.rotations[index]))
+        old_wall = store.wall_sides[index]
+        old_box = store.aabbs[index].tolist()
+        old_zones = store.zones.copy()
+
+        self.heights.lift_item(store, index, old_box)
+        try:
+            pose, wall = self._pose(item, center[0], center[1], rotation, exclude=index)
+        except EditError:
+            self.heights.add_item(store, index)
+            raise
+
+        self._set(index, pose, wall)
+        reserve_zones(store, index, item.rules, self.room)
+        self.walls.rebuild(store)
+        self.heights.add_item(store, index)
+
+        blocked = self._relayout(_union(old_box, store.aabbs[index].tolist()), index)
+        if blocked:
+            new_box = store.aabbs[index].tolist()
+            self.heights.lift_item(store, index, new_box)
+            self._set(index, old_pose, old_wall)
+            store.zones = old_zones
+            self.walls.rebuild(store)
+            self.heights.add_item(store, index)
+            self._relayout(_union(old_box, new_box), index)
+            raise EditError(f"❌ {item.name} закрывает подход к: {', '.join(blocked)}", "no_access")
+
+        self._finish("move", started, index)
+        return self.result()
+
+    def remove(self, index: int) -> dict:
+        """Убирает предмет index (индексы следующих сдвигаются на один)."""
+        started = time.perf_counter()
+        self._item(index)
+        self._check_not_carrying(index)
+
+        self._drop(index)
+        self._finish("remove", started, index)
+        return self.result()
+
+    # ---------- внутреннее ----------
+
+    def _item(self, index: int) -> Item:
+        if not 0 <= index < self.store.count:
+            raise EditError(f"❌ Нет предмета с индексом {index}", "no_item")
+        return self.store.items[index]
+
+    def _check_not_carrying(self, index: int):
+        """На предмете что-то стоит — сначала нужно убрать/перенести это."""
+        box = self.store.aabbs[index]
+        top = float(box[5])
+        near = self.store.overlapping((box[0], box[1], box[2], box[3], top - SUPPORT_EPS, top + SUPPORT_EPS))
+        carried = [
+            self.store.items[j].name for j in near.tolist()
+            if j != index
+            and self.store.items[j].rules.mount == "on_top"
+            and abs(float(self.store.aabbs[j, 4]) - top) <= SUPPORT_EPS
+        ]
+        if carried:
+            raise EditError(
+                f"❌ На {self.store.items[index].name} стоит: {', '.join(carried)}", "carries_items"
+            )
+
+    def _pose(self, item: Item, x: float, y: float, rot: Optional[float], exclude: int):
+        """
+        Проверяет постановку item в (x, y) с поворотом rot против сцены
+        (exclude — сам переносимый предмет). Возвращает ((cx, cy, cz, rot), стена).
+        """
+        rules, room = item.rules, self.room
+        sx, sy, sz = item.sx, item.sy, item.sz
+
+        wall = None
+        if rules.wall_side is not None:
+            x, y, rot, wall = self._snap_to_wall(item, x, y, rot)
+        elif rot is None:
+            rot = 0.0
+        rot = float(rot) % 360.0
+
+        if rules.rotation_step and wall is None:
+            k = rot / float(rules.rotation_step)
+            if abs(k - round(k)) > ANGLE_EPS:
+                raise EditError(f"❌ {item.name}: поворот кратен {rules.rotation_step}°", "rotation_step")
+
+        lo_x, hi_x, lo_y, hi_y = (float(v[0]) for v in footprint_extents(rules, sx, sy, np.array([rot])))
+        tol = 1e-9
+        if not (
+            room.x_min - lo_x - tol <= x <= room.x_max - hi_x + tol and
+            room.y_min - lo_y - tol <= y <= room.y_max - hi_y + tol
+        ):
+            raise EditError(f"❌ {item.name} не помещается в комнате в этом месте", "outside_room")
+
+        if rules.mount == "on_top":
+            top, owner, flat = self.heights.support_under(
+                np.array([x]), np.array([y]), sx, sy, np.array([rot])
+            )
+            if not (flat[0] and owner[0] in supports_for(self.store, rules)):
+                raise EditError(f"❌ {item.name}: под ним нет подходящей опоры", "no_support")
+            cz = float(top[0]) + sz / 2
+        else:
+            cz = rules.center_z(room, sz)
+        if cz + sz / 2 > room.z_max + SUPPORT_EPS:
+            raise EditError(f"❌ {item.name} не помещается по высоте", "too_tall")
+
+        cand = Candidates(
+            np.array([x]), np.array([y]), cz, np.array([rot]),
+            [wall], np.array([True]), sx, sy, sz,
+        )
+        if not feasible_mask(cand, rules, self.store, room, sx, sy, sz, exclude=exclude, footprint=item.footprint)[0]:
+            raise EditError(f"❌ {item.name}: место занято или закрыта свободная зона", "collision_or_clearance")
+
+        return (x, y, cz, rot), wall
+
+    def _snap_to_wall(self, item: Item, x: float, y: float, rot: Optional[float]):
+        """
+        Предмет у стены: из допустимых стен и граней (и поворота rot, если
+        задан) выбирается стена, ближайшая к (x, y); предмет притягивается
+        к ней вплотную (и в ближайший угол для in_corner), если он ближе
+        WALL_SNAP_M. Возвращает (x, y, поворот, стена).
+        """
+        rules, room = item.rules, self.room
+        sides = SIDES if rules.wall_side == "any" else (rules.wall_side,)
+
+        best = None
+        for wall in rules.walls:
+            for side in sides:
+                r = (WALL_NORMAL_DEG[wall] - SIDE_NORMAL_DEG[side]) % 360.0
+                if rot is not None and abs((float(rot) - r + 180.0) % 360.0 - 180.0) > ANGLE_EPS:
+                    continue
+
+                hx, hy = (float(v) for v in half_extents(np.array([item.sx, item.sy]), r))
+                px, py = _against(room, wall, x, y, hx, hy)
+                if rules.in_corner:
+                    px, py = min(
+                        (_against(room, corner, px, py, hx, hy) for corner in WALL_NEIGHBOURS[wall]),
+                        key=lambda p: abs(p[0] - x) + abs(p[1] - y),
+                    )
+
+                gap = max(abs(px - x), abs(py - y))
+                if best is None or gap < best[0]:
+                    best = (gap, px, py, r, wall)
+
+        if best is None or best[0] > WALL_SNAP_M:
+            where = "в углу" if rules.in_corner else "у стены"
+            raise EditError(f"❌ {item.name} должен стоять {where}", "touch_wall")
+
+        _, px, py, r, wall = best
+        return px, py, r, wall
+
+    def _set(self, index: int, pose, wall):
+        self.store.move(index, pose[:3], pose[3], wall)
+
+    def _drop(self, index: int):
+        """Убирает предмет index со всеми индексами (без проверок)."""
+        store = self.store
+        box = store.aabbs[index].tolist()
+        store.remove(index)
+        del self.access[index]
+        self.heights.remove_item(store, index, box)
+        self.walls.rebuild(store)
+        # сетка только открывается — подход ни у кого не пропадёт
+        self._relayout(box, -1)
+
+    def _relayout(self, region, edited: int) -> List[str]:
+        """
+        Обновляет сетку и достижимость в окне region и перепроверяет подход
+        у затронутых предметов. Возвращает имена предметов без подхода.
+        """
+        store = self.store
+        window = update_walk_grid(self.walk, store.aabbs[: store.count], region, base=self.base)
+        changed = self._update_reach(window)
+
+        rechecked = [edited] if edited >= 0 else []
+        if changed is not None:
+            nx, ny = self.walk[0].shape
+            world_to_grid = self.walk[1]
+            for i in range(store.count):
+                if i == edited or not store.items[i].rules.needs_approach:
+                    continue
+                for tx, ty in self._targets(i):
+                    gx, gy = world_to_grid(tx, ty)
+                    if 0 <= gx < nx and 0 <= gy < ny and changed(gx, gy):
+                        rechecked.append(i)
+                        break
+
+        for i in rechecked:
+            self.access[i] = self._has_access(i)
+
+        self.last_edit = {"rechecked": [store.items[i].name for i in rechecked]}
+        return [store.items[i].name for i in rechecked if not self.access[i]]
+
+    def _update_reach(self, window):
+        """
+        Достижимость после update_walk_grid в окне window. Возвращает
+        changed(gx, gy) — могла ли у клетки смениться достижимость — или
+        None, если не сменилась нигде.
+        """
+        if self.hpa is None:
+            before = self.reach
+            self.reach = update_reachable(before, self.walk[0], self.sources, window)
+            changed = before != self.reach
+            return (lambda gx, gy: changed[gx, gy]) if changed.any() else None
+
+        before = self.hpa.reached
+        touched = self.hpa.update_region(window[0].start, window[0].stop - 1, window[1].start, window[1].stop - 1)
+        self.hpa.reach_from(self.sources)
+        # в перестроенных кластерах связность внутри могла смениться у любой клетки
+        dirty = touched | self.hpa.changed_clusters(before)
+        if not dirty:
+            return None
+        return lambda gx, gy: self.hpa.cluster_of((gx, gy)) in dirty
+
+    def _reachable(self, gx: int, gy: int) -> bool:
+        if self.hpa is not None:
+            return self.hpa.is_reachable((gx, gy))
+        return bool(self.reach[gx, gy])
+
+    def _has_access(self, i: int) -> bool:
+        """Та же проверка, что в check_human_access_astar: точка подхода достижима от входа."""
+        if not self.store.items[i].rules.needs_approach:
+            return True
+
+        world_to_grid = self.walk[1]
+        nx, ny = self.walk[0].shape
+        for tx, ty in self._targets(i):
+            gx, gy = world_to_grid(tx, ty)
+            if 0 <= gx < nx and 0 <= gy < ny and self._reachable(gx, gy):
+                return True
+        return False
+
+    def _targets(self, i: int):
+        """Точки подхода предмета i с разрешённых сторон (approach_sides)."""
+        store = self.store
+        box = dict(zip(AABB_KEYS, store.aabbs[i].tolist()))
+        return item_approach_targets(store.items[i].rules, box, float(store.rotations[i]))
+
+    def _finish(self, op: str, started: float, index: int):
+        self.last_edit.update({
+            "op": op,
+            "index": index,
+            "ms": (time.perf_counter() - started) * 1000,
+        })
+
+
+# ============================================================
+# ВСПОМОГАТЕЛЬНОЕ
+# ============================================================
+
+def _make_item(catalog: Dict[str, dict], name: str, color=None, size=None) -> Item:
+    """Item из записи каталога; size (м) — фиксированный размер из готового результата."""
+    if name not in catalog:
+        if size is None:
+            raise EditError(f"❌ В базе нет предмета: {name}", "unknown_item")
+        size_mm = [v * 1000.0 for v in size]
+        src = {"min_size_mm": size_mm, "max_size_mm": size_mm}
+    else:
+        src = catalog[name]
+
+    item = Item(name, src["min_size_mm"], src["max_size_mm"], color or src.get("color", [0.7, 0.7, 0.7]),
+                src.get("constraints", {}), src.get("mesh"))
+    if size is not None:
+        item.sx, item.sy, item.sz = (float(v) for v in size)
+    return item
+
+
+def _against(room: Room, wall: str, x: float, y: float, hx: float, hy: float) -> Tuple[float, float]:
+    """(x, y), сдвинутый вплотную к стене wall (остальная координата не меняется)."""
+    if wall == "front":
+        return x, room.y_min + hy + WALL_MARGIN
+    if wall == "back":
+        return x, room.y_max - hy - WALL_MARGIN
+    if wall == "left":
+        return room.x_min + hx + WALL_MARGIN, y
+    return room.x_max - hx - WALL_MARGIN, y
+
+
+def _union(a, b) -> List[float]:
+    return [min(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3]), min(a[4], b[4]), max(a[5], b[5])]
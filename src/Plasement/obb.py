@@ -0,0 +1,102 @@
+import math
+from typing import Tuple
+
+import numpy as np
+
+
+# ============================================================
+# ОРИЕНТИРОВАННЫЕ ПРЯМОУГОЛЬНИКИ В ПЛОСКОСТИ XY
+# ============================================================
+# Предмет с размером (sx, sy), повёрнутый на angle градусов вокруг Z:
+#   локальная ось X → (cos a, sin a)
+#   локальная ось Y → (-sin a, cos a)
+
+EPS = 1e-9
+
+
+def obb_axes(angle_deg: float) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+    a = math.radians(angle_deg)
+    c, s = math.cos(a), math.sin(a)
+    return (c, s), (-s, c)
+
+
+def obb_corners(cx: float, cy: float, sx: float, sy: float, angle_deg: float) -> np.ndarray:
+    """Четыре угла (против часовой стрелки), массив (4, 2)."""
+    (ux, uy), (vx, vy) = obb_axes(angle_deg)
+    hx, hy = sx / 2, sy / 2
+    signs = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=float)
+    return np.column_stack((
+        cx + signs[:, 0] * hx * ux + signs[:, 1] * hy * vx,
+        cy + signs[:, 0] * hx * uy + signs[:, 1] * hy * vy,
+    ))
+
+
+# ============================================================
+# SAT: ПАРЫ ПРЯМОУГОЛЬНИКОВ
+# ============================================================
+
+def obb_overlap_pairs(
+    centers_a: np.ndarray,
+    sizes_a: np.ndarray,
+    angles_a: np.ndarray,
+    centers_b: np.ndarray,
+    sizes_b: np.ndarray,
+    angles_b: np.ndarray,
+) -> np.ndarray:
+    """
+    Векторизованный тест разделяющих осей (SAT) для пар прямоугольников:
+    i-й из A против i-го из B (массивы транслируются по правилам numpy,
+    centers/sizes — (..., 2), angles — (...)). True — прямоугольники
+    перекрываются (касание перекрытием не считается).
+    """
+    a = np.radians(angles_a)
+    ux, uy = np.cos(a), np.sin(a)        # A.x; A.y = (-uy, ux)
+    b = np.radians(angles_b)
+    bc, bs = np.cos(b), np.sin(b)        # B.x; B.y = (-bs, bc)
+
+    hax, hay = sizes_a[..., 0] / 2, sizes_a[..., 1] / 2
+    hbx, hby = sizes_b[..., 0] / 2, sizes_b[..., 1] / 2
+
+    dx = centers_b[..., 0] - centers_a[..., 0]
+    dy = centers_b[..., 1] - centers_a[..., 1]
+
+    # проекции осей B на оси A (матрица поворота B относительно A)
+    a00 = np.abs(ux * bc + uy * bs)      # A.x · B.x
+    a01 = np.abs(-ux * bs + uy * bc)     # A.x · B.y
+    a10 = np.abs(-uy * bc + ux * bs)     # A.y · B.x
+    a11 = np.abs(uy * bs + ux * bc)      # A.y · B.y
+
+    # оси A
+    sep = np.abs(dx * ux + dy * uy) >= hax + hbx * a00 + hby * a01 - EPS
+    sep |= np.abs(-dx * uy + dy * ux) >= hay + hbx * a10 + hby * a11 - EPS
+
+    # оси B
+    sep |= np.abs(dx * bc + dy * bs) >= hbx + hax * a00 + hay * a10 - EPS
+    sep |= np.abs(-dx * bs + dy * bc) >= hby + hax * a01 + hay * a11 - EPS
+
+    return ~sep
+
+
+# ============================================================
+# SAT: ОДИН ПРЯМОУГОЛЬНИК ПРОТИВ МНОГИХ
+# ============================================================
+
+def obb_overlap_many(
+    center: Tuple[float, float],
+    size: Tuple[float, float],
+    angle_deg: float,
+    centers: np.ndarray,
+    sizes: np.ndarray,
+    angles_deg: np.ndarray,
+) -> np.ndarray:
+    """
+    Прямоугольник (center, size, angle) против N прямоугольников
+    (centers (N, 2), sizes (N, 2), angles (N,)). Возвращает булев массив (N,).
+    """
+    if len(centers) == 0:
+        return np.zeros(0, dtype=bool)
+
+    return obb_overlap_pairs(
+        np.asarray(center, dtype=float), np.asarray(size, dtype=float), angle_deg,
+        centers, sizes, angles_deg,
+    )
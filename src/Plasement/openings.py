@@ -0,0 +1,136 @@
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from glb_parser import Room
+from pathfinding_astar import HUMAN_SIZE
+
+
+# ============================================================
+# НАСТРОЙКИ
+# ============================================================
+
+DOOR_WIDTH_M = 0.9
+DOOR_HEIGHT_M = 2.1          # высота запретной зоны распашной двери
+WINDOW_SILL_M = 0.8          # ниже подоконника ставить можно
+WINDOW_CLEARANCE_M = 0.3     # свободная полоса перед окном
+RADIATOR_DEPTH_M = 0.1
+RADIATOR_HEIGHT_M = 0.6
+RADIATOR_CLEARANCE_M = 0.1   # зазор для конвекции перед радиатором
+
+KINDS = ("door", "window", "radiator")
+
+# стена -> (ось вдоль стены, внутренняя нормаль (nx, ny)); имена стен как в groups.wall_contact
+WALLS = {
+    "front": ("x", (0.0, 1.0)),    # y = y_min
+    "back": ("x", (0.0, -1.0)),    # y = y_max
+    "left": ("y", (1.0, 0.0)),     # x = x_min
+    "right": ("y", (-1.0, 0.0)),   # x = x_max
+}
+
+
+# ============================================================
+# ПРОЁМЫ И ПРИБОРЫ НА СТЕНАХ
+# ============================================================
+# Описание в objects.json ("openings") или в запросе сервиса:
+#   {"type": "door", "wall": "front", "offset_mm": 2000, "width_mm": 900, "swing_mm": 900}
+#   {"type": "window", "wall": "back", "offset_mm": 1500, "width_mm": 1200,
+#    "sill_mm": 800, "clearance_mm": 300}
+#   {"type": "radiator", "wall": "back", "offset_mm": 1500, "width_mm": 1000,
+#    "depth_mm": 100, "height_mm": 600, "clearance_mm": 100}
+# offset_mm — центр проёма вдоль стены от её начала (x_min для front/back,
+# y_min для left/right). Всё это не двигается между попытками и относится
+# к статическому слою комнаты (shared_room.static_layers):
+#   door     — зона открывания (ширина x swing_mm) пуста до DOOR_HEIGHT_M;
+#              клетка перед дверью — вход человека
+#   window   — полоса перед окном пуста выше подоконника
+#   radiator — сам прибор непроходим, прибор с зазором — пуст до его высоты
+
+class Opening:
+    __slots__ = ("kind", "wall", "offset", "width", "depth", "z0", "z1", "body_depth")
+
+    def __init__(self, spec: dict):
+        self.kind = spec.get("type")
+        self.wall = spec.get("wall")
+        if self.kind not in KINDS:
+            raise RuntimeError(f"❌ Неизвестный тип проёма {self.kind} (ожидается {', '.join(KINDS)})")
+        if self.wall not in WALLS:
+            raise RuntimeError(f"❌ {self.kind}: неизвестная стена {self.wall}")
+        if "offset_mm" not in spec:
+            raise RuntimeError(f"❌ {self.kind} у стены {self.wall}: нет offset_mm")
+
+        def m(key: str, default: float) -> float:
+            return float(spec[key]) / 1000.0 if key in spec else default
+
+        self.offset = m("offset_mm", 0.0)
+        self.body_depth = 0.0
+
+        # depth — глубина запретной зоны от стены, z0..z1 — её высоты над полом
+        if self.kind == "door":
+            self.width = m("width_mm", DOOR_WIDTH_M)
+            self.depth = m("swing_mm", self.width)
+            self.z0, self.z1 = 0.0, DOOR_HEIGHT_M
+        elif self.kind == "window":
+            self.width = m("width_mm", 1.0)
+            self.depth = m("clearance_mm", WINDOW_CLEARANCE_M)
+            self.z0, self.z1 = m("sill_mm", WINDOW_SILL_M), float("inf")
+        else:
+            self.width = m("width_mm", 1.0)
+            self.body_depth = m("depth_mm", RADIATOR_DEPTH_M)
+            self.depth = self.body_depth + m("clearance_mm", RADIATOR_CLEARANCE_M)
+            self.z0, self.z1 = 0.0, m("height_mm", RADIATOR_HEIGHT_M)
+
+    def rect(self, room: Room, depth: float) -> Tuple[float, float, float, float]:
+        """Прямоугольник x_min, x_max, y_min, y_max полосы глубины depth от стены."""
+        along, (nx, ny) = WALLS[self.wall]
+        lo = (room.x_min if along == "x" else room.y_min) + self.offset - self.width / 2
+        hi = lo + self.width
+
+        if along == "x":
+            y = room.y_min if ny > 0 else room.y_max
+            return lo, hi, min(y, y + ny * depth), max(y, y + ny * depth)
+        x = room.x_min if nx > 0 else room.x_max
+        return min(x, x + nx * depth), max(x, x + nx * depth), lo, hi
+
+    def entry_point(self, room: Room) -> Tuple[float, float]:
+        """Где стоит вошедший человек: центр проёма, на полчеловека от стены."""
+        _, (nx, ny) = WALLS[self.wall]
+        x0, x1, y0, y1 = self.rect(room, 0.0)
+        return (x0 + x1) / 2 + nx * HUMAN_SIZE[0] / 2, (y0 + y1) / 2 + ny * HUMAN_SIZE[1] / 2
+
+
+def load_openings(specs: Optional[Sequence[dict]]) -> List[Opening]:
+    return [Opening(spec) for spec in specs or ()]
+
+
+# ============================================================
+# СТАТИЧЕСКАЯ ГЕОМЕТРИЯ
+# ============================================================
+
+def keepout_boxes(room: Room, openings: Sequence[Opening]) -> np.ndarray:
+    """Запретные для мебели объёмы (K, 6) в порядке AABB_KEYS."""
+    boxes = [
+        (*op.rect(room, op.depth), room.z_min + op.z0, min(room.z_max, room.z_min + op.z1))
+        for op in openings if op.depth > 0
+    ]
+    return np.array(boxes, dtype=float).reshape(-1, 6)
+
+
+def obstacle_boxes(room: Room, openings: Sequence[Opening]) -> np.ndarray:
+    """Непроходимые для человека приборы (K, 6) — закрывают клетки сетки прохода."""
+    boxes = [
+        (*op.rect(room, op.body_depth), room.z_min, room.z_min + op.z1)
+        for op in openings if op.body_depth > 0
+    ]
+    return np.array(boxes, dtype=float).reshape(-1, 6)
+
+
+def entry_points(room: Room, openings: Sequence[Opening]) -> List[Tuple[float, float]]:
+    """
+    Точки входа человека — перед каждой дверью. Без дверей — прежний
+    вход: середина нижней стены (pathfinding_astar.start_cell_for).
+    """
+    doors = [op.entry_point(room) for op in openings if op.kind == "door"]
+    if doors:
+        return doors
+    return [((room.x_min + room.x_max) / 2, room.y_min + HUMAN_SIZE[1] / 2)]
@@ -2,6 +2,8 @@ import heapq
 import math
 from typing import Dict, List, Tuple, Optional
 
+import numpy as np
+
 
 # ============================================================
 # НАСТРОЙКИ ЧЕЛОВЕКА
@@ -15,16 +17,42 @@ GRID_STEP = 0.1               # шаг сетки
 # ПОСТРОЕНИЕ ПРОХОДИМОЙ 2D СЕТКИ (XY)
 # ============================================================
 
+def item_boxes(items) -> np.ndarray:
+    """
+    AABB предметов массивом (N, 6): x_min, x_max, y_min, y_max, z_min, z_max.
+    Принимает либо готовый массив (SceneStore.aabbs), либо список
+    словарей с ключом "aabb" (как в placement_result.json).
+    """
+    if isinstance(items, np.ndarray):
+        return items.reshape(-1, 6)
+
+    return np.array(
+        [
+            [
+                obj["aabb"]["x_min"], obj["aabb"]["x_max"],
+                obj["aabb"]["y_min"], obj["aabb"]["y_max"],
+                obj["aabb"]["z_min"], obj["aabb"]["z_max"],
+            ]
+            for obj in items
+        ],
+        dtype=float,
+    ).reshape(-1, 6)
+
+
 def build_walk_grid(
     room: Dict[str, float],
-    items: List[Dict],
+    items,
     human_size=HUMAN_SIZE,
     step=GRID_STEP,
+    base=None,
 ):
     """
-    Строит бинарную 2D-сетку:
+    Строит бинарную 2D-сетку (numpy, индексация grid[gx][gy]):
     True  = человек ПОЛНОСТЬЮ помещается
     False = заблокировано мебелью
+
+    base — статическая сетка пустой комнаты (shared_room.StaticRoom.walk),
+    мебель отмечается на её копии.
     """
 
     human_sx, human_sy, _ = human_size
@@ -48,27 +76,54 @@ def build_walk_grid(
         y = y_min + (gy + 0.5) * step
         return x, y
 
-    # изначально всё проходимо
-    grid = [[True for _ in range(ny)] for _ in range(nx)]
+    # изначально всё проходимо (или то, что проходимо в пустой комнате)
+    if base is None:
+        grid = np.ones((nx, ny), dtype=bool)
+    else:
+        if base.shape != (nx, ny):
+            raise RuntimeError(f"❌ Сетка прохода {base.shape} не подходит комнате ({nx}, {ny})")
+        grid = np.array(base, dtype=bool)
 
     # блокируем области под мебель + радиус человека
-    for obj in items:
-        box = obj["aabb"]
+    for box in item_boxes(items).tolist():
+        grid[_blocked_window(box, world_to_grid, human_sx, human_sy)] = False
+
+    return grid, world_to_grid, grid_to_world_center, in_bounds
 
-        bx_min = box["x_min"] - human_sx / 2
-        bx_max = box["x_max"] + human_sx / 2
-        by_min = box["y_min"] - human_sy / 2
-        by_max = box["y_max"] + human_sy / 2
 
-        gx_min, gy_min = world_to_grid(bx_min, by_min)
-        gx_max, gy_max = world_to_grid(bx_max, by_max)
+def _blocked_window(box, world_to_grid, human_sx: float, human_sy: float) -> Tuple[slice, slice]:
+    """Клетки, которые закрывает AABB box, раздутый на полчеловека."""
+    gx_min, gy_min = world_to_grid(box[0] - human_sx / 2, box[2] - human_sy / 2)
+    gx_max, gy_max = world_to_grid(box[1] + human_sx / 2, box[3] + human_sy / 2)
+    return slice(max(gx_min, 0), max(gx_max + 1, 0)), slice(max(gy_min, 0), max(gy_max + 1, 0))
 
-        for gx in range(gx_min, gx_max + 1):
-            for gy in range(gy_min, gy_max + 1):
-                if in_bounds(gx, gy):
-                    grid[gx][gy] = False
 
-    return grid, world_to_grid, grid_to_world_center, in_bounds
+def update_walk_grid(walk, items, region, human_size=HUMAN_SIZE, step=GRID_STEP, base=None) -> Tuple[slice, slice]:
+    """
+    Локально пересчитывает сетку build_walk_grid после того, как изменился
+    предмет в пределах AABB region (объединение старого и нового места):
+    клетки окна открываются (до base — статической сетки, с которой
+    строилась walk) и заново закрываются только предметами, которые до
+    окна дотягиваются. Возвращает окно (срезы сетки).
+    """
+    grid, world_to_grid, _, _ = walk
+    human_sx, human_sy, _ = human_size
+
+    window = _blocked_window(region, world_to_grid, human_sx, human_sy)
+    grid[window] = True if base is None else base[window]
+
+    # с запасом в клетку: усечение world_to_grid не должно потерять соседа
+    boxes = item_boxes(items)
+    reach_x = human_sx + step
+    reach_y = human_sy + step
+    near = (
+        (boxes[:, 0] <= region[1] + reach_x) & (boxes[:, 1] >= region[0] - reach_x) &
+        (boxes[:, 2] <= region[3] + reach_y) & (boxes[:, 3] >= region[2] - reach_y)
+    )
+    for box in boxes[near].tolist():
+        grid[_blocked_window(box, world_to_grid, human_sx, human_sy)] = False
+
+    return window
 
 
 # ============================================================
@@ -76,7 +131,7 @@ def build_walk_grid(
 # ============================================================
 
 def astar_path(
-    grid: List[List[bool]],
+    grid,
     start: Tuple[int, int],
     goal: Tuple[int, int],
     in_bounds
@@ -131,47 +186,113 @@ def astar_path(
 
 
 # ============================================================
-# ПОИСК ПУТИ ОТ СТЕНЫ К ОБЪЕКТУ
+# ДОСТИЖИМОСТЬ (ЗАЛИВКА ОТ СТАРТА)
 # ============================================================
 
-def find_path_to_object(
-    room: Dict[str, float],
-    items: List[Dict],
-    obj: Dict,
-):
+def reachable_mask(grid: np.ndarray, sources: List[Tuple[int, int]]) -> np.ndarray:
     """
-    Возвращает путь (в мировых координатах) шириной ровно человека.
-    Старт всегда от НИЖНЕЙ СТЕНЫ.
+    Все клетки, достижимые из любой из sources (4-связность).
+    Заливка волной целиком на numpy: один проход — один шаг фронта.
     """
+    return _flood(grid, _seed(grid, np.zeros_like(grid, dtype=bool), sources))
 
-    grid, world_to_grid, grid_to_world, in_bounds = build_walk_grid(room, items)
 
-    # ===== СТАРТ ОТ СТЕНЫ =====
-    start_world = (
+def update_reachable(reach: np.ndarray, grid: np.ndarray, sources: List[Tuple[int, int]], window) -> np.ndarray:
+    """
+    Достижимость после update_walk_grid в окне window. Если в окне не
+    закрылась ни одна достижимая клетка, область может только вырасти —
+    волна идёт от уже достижимых клеток (и от sources — вход мог
+    открыться). Иначе она могла распасться на части, и заливка
+    повторяется от sources.
+    """
+    if (reach[window] & ~grid[window]).any():
+        return reachable_mask(grid, sources)
+    return _flood(grid, _seed(grid, reach.copy(), sources))
+
+
+def _seed(grid: np.ndarray, reach: np.ndarray, sources: List[Tuple[int, int]]) -> np.ndarray:
+    nx, ny = grid.shape
+    for gx, gy in sources:
+        if 0 <= gx < nx and 0 <= gy < ny and grid[gx, gy]:
+            reach[gx, gy] = True
+    return reach
+
+
+def _flood(grid: np.ndarray, reach: np.ndarray) -> np.ndarray:
+    """Доращивает reach волной по проходимым клеткам (на месте)."""
+    frontier = reach.copy()
+    while frontier.any():
+        grown = np.zeros_like(reach)
+        grown[1:, :] |= frontier[:-1, :]
+        grown[:-1, :] |= frontier[1:, :]
+        grown[:, 1:] |= frontier[:, :-1]
+        grown[:, :-1] |= frontier[:, 1:]
+        frontier = grown & grid & ~reach
+        reach |= frontier
+
+    return reach
+
+
+def start_cell_for(room: Dict[str, float], world_to_grid) -> Tuple[int, int]:
+    """Точка входа человека: середина НИЖНЕЙ СТЕНЫ."""
+    return world_to_grid(
         (room["x_min"] + room["x_max"]) / 2,
-        room["y_min"] + HUMAN_SIZE[1] / 2
+        room["y_min"] + HUMAN_SIZE[1] / 2,
     )
-    start_cell = world_to_grid(*start_world)
 
-    # ===== ЦЕЛИ ПОДХОДА К ОБЪЕКТУ =====
-    box = obj["aabb"]
+
+def approach_targets(box: Dict[str, float]) -> List[Tuple[float, float]]:
+    """Точки, где может стоять человек у каждой из 4 сторон AABB."""
     offset = HUMAN_SIZE[1] / 2 + 0.05
 
-    targets_world = [
+    return [
         ((box["x_min"] + box["x_max"]) / 2, box["y_min"] - offset),
         ((box["x_min"] + box["x_max"]) / 2, box["y_max"] + offset),
         (box["x_min"] - offset, (box["y_min"] + box["y_max"]) / 2),
         (box["x_max"] + offset, (box["y_min"] + box["y_max"]) / 2),
     ]
 
-    for tx, ty in targets_world:
+
+# ============================================================
+# ПОИСК ПУТИ ОТ СТЕНЫ К ОБЪЕКТУ
+# ============================================================
+
+def find_path_to_object(
+    room: Dict[str, float],
+    items,
+    obj: Dict,
+    walk=None,
+    find_path=None,
+):
+    """
+    Возвращает путь (в мировых координатах) шириной ровно человека.
+    Старт всегда от НИЖНЕЙ СТЕНЫ.
+
+    walk — готовый результат build_walk_grid (чтобы не строить сетку
+    на каждый запрос), find_path(start, goal) — поиск по клеткам
+    (по умолчанию обычный A*, см. pathfinding_hpa.make_path_finder).
+    """
+
+    if walk is None:
+        walk = build_walk_grid(room, items)
+    grid, world_to_grid, grid_to_world, in_bounds = walk
+
+    if find_path is None:
+        def find_path(start, goal):
+            return astar_path(grid, start, goal, in_bounds)
+
+    # ===== СТАРТ ОТ СТЕНЫ =====
+    start_cell = start_cell_for(room, world_to_grid)
+
+    # ===== ЦЕЛИ ПОДХОДА К ОБЪЕКТУ =====
+    for tx, ty in approach_targets(obj["aabb"]):
         gx, gy = world_to_grid(tx, ty)
         if not in_bounds(gx, gy):
             continue
         if not grid[gx][gy]:
             continue
 
-        cell_path = astar_path(grid, start_cell, (gx, gy), in_bounds)
+        cell_path = find_path(start_cell, (gx, gy))
         if cell_path:
             return [grid_to_world(px, py) for px, py in cell_path]
 
@@ -0,0 +1,435 @@
+import heapq
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from pathfinding_astar import astar_path
+
+
+# ============================================================
+# НАСТРОЙКИ
+# ============================================================
+
+CLUSTER_SIZE = 16      # сторона кластера в клетках сетки
+MAX_RUN_SINGLE = 6     # вход короче — один переход посередине, длиннее — два по краям
+
+# "astar" — всегда плоский A*, "hpa" — всегда иерархический,
+# "auto" — иерархический, если в сетке не меньше HPA_MIN_CELLS клеток.
+PATHFINDING_MODE = "auto"
+HPA_MIN_CELLS = 40_000
+
+Cell = Tuple[int, int]
+ClusterId = Tuple[int, int]
+
+
+# ============================================================
+# ИЕРАРХИЧЕСКИЙ ГРАФ (HPA*)
+# ============================================================
+
+class HierarchicalGrid:
+    """
+    Иерархический поиск пути по проходимой сетке build_walk_grid.
+
+    Сетка режется на кластеры CLUSTER_SIZE x CLUSTER_SIZE. На общих
+    границах соседних кластеров ищутся входы (непрерывные участки, где
+    проходимы клетки с обеих сторон), их клетки — узлы абстрактного
+    графа. Рёбра: переходы через границу (стоимость 1) и расстояния
+    между узлами внутри одного кластера (BFS в пределах кластера).
+
+    Запрос: старт и цель временно подключаются к узлам своих кластеров,
+    A* идёт по абстрактному графу, затем каждый отрезок уточняется
+    обычным A* внутри одного кластера.
+
+    При изменении мебели update_region перестраивает только задетые
+    кластеры и их общие границы с соседями.
+
+    Достижимость от входов (reach_from / is_reachable) считается по тому
+    же графу: обход абстрактных узлов от входов, затем для клетки —
+    BFS только внутри её кластера до достижимого узла. Представитель
+    входа на границе связан внутри кластера со всем своим участком,
+    поэтому ответ точный, как у заливки reachable_mask.
+    """
+
+    def __init__(self, grid: np.ndarray, cluster_size: int = CLUSTER_SIZE):
+        self.grid = grid
+        self.nx, self.ny = grid.shape
+        self.cluster_size = cluster_size
+        self.ncx = -(-self.nx // cluster_size)
+        self.ncy = -(-self.ny // cluster_size)
+
+        # переходы на каждой границе, узлы по кластерам, рёбра абстрактного графа
+        self.borders: Dict[Tuple[ClusterId, ClusterId], List[Tuple[Cell, Cell]]] = {}
+        self.nodes: Dict[ClusterId, Set[Cell]] = {}
+        self.edges: Dict[Cell, Dict[Cell, int]] = {}
+
+        # входы по кластерам и достижимые из них узлы (и клетки входов)
+        self.sources: Dict[ClusterId, Set[Cell]] = {}
+        self.reached: Set[Cell] = set()
+
+        for cx in range(self.ncx):
+            for cy in range(self.ncy):
+                self.nodes[(cx, cy)] = set()
+
+        for cid in self.nodes:
+            for border in self._borders_of(cid):
+                if border[0] == cid:
+                    self._build_border(*border)
+
+        for cid in self.nodes:
+            self._build_intra(cid)
+
+    # ---------- геометрия кластеров ----------
+
+    def cluster_of(self, cell: Cell) -> ClusterId:
+        return cell[0] // self.cluster_size, cell[1] // self.cluster_size
+
+    def cluster_bounds(self, cid: ClusterId) -> Tuple[int, int, int, int]:
+        """x0, x1, y0, y1 (правые границы не включаются)."""
+        c = self.cluster_size
+        x0, y0 = cid[0] * c, cid[1] * c
+        return x0, min(x0 + c, self.nx), y0, min(y0 + c, self.ny)
+
+    def _borders_of(self, cid: ClusterId) -> List[Tuple[ClusterId, ClusterId]]:
+        """Границы кластера в виде пар (левый/нижний, правый/верхний)."""
+        cx, cy = cid
+        result = []
+        for a, b in (
+            ((cx - 1, cy), cid), (cid, (cx + 1, cy)),
+            ((cx, cy - 1), cid), (cid, (cx, cy + 1)),
+        ):
+            if a in self.nodes and b in self.nodes:
+                result.append((a, b))
+        return result
+
+    def _in_cluster(self, cid: ClusterId):
+        x0, x1, y0, y1 = self.cluster_bounds(cid)
+
+        def in_bounds(gx, gy):
+            return x0 <= gx < x1 and y0 <= gy < y1
+
+        return in_bounds
+
+    # ---------- абстрактный граф ----------
+
+    def _add_edge(self, a: Cell, b: Cell, cost: int):
+        self.edges.setdefault(a, {})[b] = cost
+        self.edges.setdefault(b, {})[a] = cost
+
+    def _build_border(self, a: ClusterId, b: ClusterId):
+        """Входы на общей границе кластеров a и b (b правее или выше a)."""
+        ax0, ax1, ay0, ay1 = self.cluster_bounds(a)
+
+        if b[0] != a[0]:
+            # вертикальная граница: колонка ax1-1 | ax1
+            pairs = [((ax1 - 1, y), (ax1, y)) for y in range(ay0, ay1)]
+        else:
+            # горизонтальная граница: строка ay1-1 | ay1
+            pairs = [((x, ay1 - 1), (x, ay1)) for x in range(ax0, ax1)]
+
+        transitions = []
+        run: List[Tuple[Cell, Cell]] = []
+        for pair in pairs + [None]:
+            if pair is not None and self.grid[pair[0]] and self.grid[pair[1]]:
+                run.append(pair)
+                continue
+
+            if run:
+                if len(run) <= MAX_RUN_SINGLE:
+                    transitions.append(run[len(run) // 2])
+                else:
+                    transitions.extend((run[0], run[-1]))
+                run = []
+
+        self.borders[(a, b)] = transitions
+        for ca, cb in transitions:
+            self.nodes[a].add(ca)
+            self.nodes[b].add(cb)
+            self._add_edge(ca, cb, 1)
+
+    def _build_intra(self, cid: ClusterId):
+        """Расстояния между всеми узлами кластера (BFS внутри кластера)."""
+        nodes = list(self.nodes[cid])
+        if len(nodes) < 2:
+            return
+
+        x0, _, y0, _ = self.cluster_bounds(cid)
+        dist = self._waves(cid, nodes)
+        for k, a in enumerate(nodes):
+            for b in nodes[k + 1:]:
+                d = int(dist[k, b[0] - x0, b[1] - y0])
+                if d >= 0:
+                    self._add_edge(a, b, d)
+
+    def _waves(self, cid: ClusterId, sources: List[Cell]) -> np.ndarray:
+        """
+        (K, w, h): BFS-расстояния внутри кластера от каждой из sources
+        (-1 — не дойти). Все K волн идут разом одним numpy-массивом.
+        """
+        x0, x1, y0, y1 = self.cluster_bounds(cid)
+        free = self.grid[x0:x1, y0:y1]
+
+        front = np.zeros((len(sources),) + free.shape, dtype=bool)
+        for k, (x, y) in enumerate(sources):
+            front[k, x - x0, y - y0] = True
+        seen = front.copy()
+        dist = np.where(front, 0, -1)
+
+        step = 0
+        while front.any():
+            step += 1
+            grown = np.zeros_like(front)
+            grown[:, 1:, :] |= front[:, :-1, :]
+            grown[:, :-1, :] |= front[:, 1:, :]
+            grown[:, :, 1:] |= front[:, :, :-1]
+            grown[:, :, :-1] |= front[:, :, 1:]
+            front = grown & free & ~seen
+            seen |= front
+            dist[front] = step
+
+        return dist
+
+    def _bfs(self, source: Cell, in_bounds, targets) -> Dict[Cell, int]:
+        """BFS от source в пределах in_bounds; расстояния до клеток из targets."""
+        found = {}
+        seen = {source: 0}
+        queue = deque([source])
+
+        while queue:
+            cur = queue.popleft()
+            d = seen[cur]
+            if cur in targets:
+                found[cur] = d
+                if len(found) == len(targets):
+                    break
+
+            x, y = cur
+            for nxt in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+                if nxt in seen or not in_bounds(*nxt) or not self.grid[nxt]:
+                    continue
+                seen[nxt] = d + 1
+                queue.append(nxt)
+
+        return found
+
+    def _remove_edge(self, a: Cell, b: Cell):
+        self.edges.get(a, {}).pop(b, None)
+        self.edges.get(b, {}).pop(a, None)
+
+    # ---------- инкрементальное обновление ----------
+
+    def update_region(self, gx_min: int, gx_max: int, gy_min: int, gy_max: int) -> Set[ClusterId]:
+        """
+        Клетки сетки в прямоугольнике [gx_min..gx_max] x [gy_min..gy_max]
+        изменились (self.grid уже обновлён). Перестраиваются границы
+        задетых кластеров и их внутренние рёбра целиком. У соседей по этим
+        границам сетка та же — снимаются рёбра пропавших узлов и считаются
+        расстояния только от новых. Остальной граф не трогается.
+        Возвращает задетые кластеры (связность внутри могла смениться).
+        """
+        c = self.cluster_size
+        if gx_max < gx_min or gy_max < gy_min:
+            return set()
+        touched = {
+            (cx, cy)
+            for cx in range(max(gx_min, 0) // c, min(gx_max, self.nx - 1) // c + 1)
+            for cy in range(max(gy_min, 0) // c, min(gy_max, self.ny - 1) // c + 1)
+        }
+
+        borders = {border for cid in touched for border in self._borders_of(cid)}
+        neighbours = {cid for border in borders for cid in border} - touched
+        old_nodes = {cid: set(self.nodes[cid]) for cid in neighbours}
+
+        # снимаем внутренние рёбра задетых кластеров
+        for cid in touched:
+            self._drop_intra(cid, self.nodes[cid])
+
+        # снимаем переходы на перестраиваемых границах
+        for border in borders:
+            for ca, cb in self.borders.pop(border, []):
+                self._remove_edge(ca, cb)
+
+        for border in borders:
+            self._build_border(*border)
+
+        # узлы кластера = клетки переходов на всех его границах
+        for cid in touched | neighbours:
+            nodes = set()
+            for a, b in self._borders_of(cid):
+                for ca, cb in self.borders.get((a, b), []):
+                    nodes.add(ca if a == cid else cb)
+            self.nodes[cid] = nodes
+
+        for cid in touched:
+            self._build_intra(cid)
+
+        for cid in neighbours:
+            nodes = self.nodes[cid]
+            self._drop_intra(cid, old_nodes[cid] - nodes)
+            added = list(nodes - old_nodes[cid])
+            if not added:
+                continue
+            x0, _, y0, _ = self.cluster_bounds(cid)
+            dist = self._waves(cid, added)
+            for k, a in enumerate(added):
+                for b in nodes:
+                    d = int(dist[k, b[0] - x0, b[1] - y0])
+                    if b != a and d >= 0:
+                        self._add_edge(a, b, d)
+
+        return touched
+
+    def _drop_intra(self, cid: ClusterId, nodes):
+        """Снимает рёбра узлов nodes внутри кластера cid."""
+        for node in nodes:
+            for other in list(self.edges.get(node, {})):
+                if self.cluster_of(other) == cid:
+                    self._remove_edge(node, other)
+
+    # ---------- достижимость от входов ----------
+
+    def reach_from(self, sources: List[Cell]) -> Set[Cell]:
+        """
+        Запоминает входы и пересчитывает self.reached — узлы абстрактного
+        графа, достижимые из них. После update_region вызывается снова:
+        обход идёт по узлам, а не по клеткам, поэтому дёшев.
+        """
+        self.sources = {}
+        reached: Set[Cell] = set()
+        queue = deque()
+
+        for cell in sources:
+            cell = tuple(cell)
+            if not (0 <= cell[0] < self.nx and 0 <= cell[1] < self.ny) or not self.grid[cell]:
+                continue
+            cid = self.cluster_of(cell)
+            self.sources.setdefault(cid, set()).add(cell)
+            if cell in reached:
+                continue
+            # вход может и сам быть узлом — его рёбра тоже обходятся
+            reached.add(cell)
+            queue.append(cell)
+            for node in self._bfs(cell, self._in_cluster(cid), self.nodes[cid]):
+                if node not in reached:
+                    reached.add(node)
+                    queue.append(node)
+
+        while queue:
+            for nxt in self.edges.get(queue.popleft(), {}):
+                if nxt not in reached:
+                    reached.add(nxt)
+                    queue.append(nxt)
+
+        self.reached = reached
+        return reached
+
+    def is_reachable(self, cell: Cell) -> bool:
+        """Достижима ли клетка от входов reach_from (BFS внутри её кластера)."""
+        if not (0 <= cell[0] < self.nx and 0 <= cell[1] < self.ny) or not self.grid[cell]:
+            return False
+        if cell in self.reached:
+            return True
+
+        cid = self.cluster_of(cell)
+        targets = {c for c in self.nodes[cid] | self.sources.get(cid, set()) if c in self.reached}
+        return bool(targets) and bool(self._bfs(cell, self._in_cluster(cid), targets))
+
+    def changed_clusters(self, before: Set[Cell]) -> Set[ClusterId]:
+        """Кластеры, где у узлов поменялась достижимость относительно before."""
+        return {self.cluster_of(cell) for cell in before ^ self.reached}
+
+    # ---------- запрос ----------
+
+    def find_path(self, start: Cell, goal: Cell) -> Optional[List[Cell]]:
+        if not (0 <= start[0] < self.nx and 0 <= start[1] < self.ny):
+            return None
+        if not (0 <= goal[0] < self.nx and 0 <= goal[1] < self.ny):
+            return None
+        if not self.grid[start] or not self.grid[goal]:
+            return None
+
+        start_cid = self.cluster_of(start)
+        goal_cid = self.cluster_of(goal)
+
+        if start_cid == goal_cid:
+            local = astar_path(self.grid, start, goal, self._in_cluster(start_cid))
+            if local is not None:
+                return local
+
+        # временно подключаем старт и цель к узлам своих кластеров
+        extra: Dict[Cell, Dict[Cell, int]] = {start: {}, goal: {}}
+        for cell, cid in ((start, start_cid), (goal, goal_cid)):
+            dist = self._bfs(cell, self._in_cluster(cid), self.nodes[cid])
+            for node, d in dist.items():
+                extra[cell][node] = d
+                extra.setdefault(node, {})[cell] = d
+
+        abstract = self._abstract_astar(start, goal, extra)
+        if abstract is None:
+            return None
+
+        # уточнение: каждый отрезок лежит в одном кластере или пересекает границу
+        path = [start]
+        for a, b in zip(abstract[:-1], abstract[1:]):
+            if abs(a[0] - b[0]) + abs(a[1] - b[1]) == 1:
+                path.append(b)
+                continue
+
+            cid = self.cluster_of(a)
+            segment = astar_path(self.grid, a, b, self._in_cluster(cid))
+            if segment is None:
+                return None
+            path.extend(segment[1:])
+
+        return path
+
+    def _abstract_astar(self, start: Cell, goal: Cell, extra) -> Optional[List[Cell]]:
+        def heuristic(a):
+            return abs(a[0] - goal[0]) + abs(a[1] - goal[1])
+
+        def neighbours(cell):
+            yield from self.edges.get(cell, {}).items()
+            yield from extra.get(cell, {}).items()
+
+        open_set = [(heuristic(start), start)]
+        came_from = {}
+        g_score = {start: 0}
+
+        while open_set:
+            _, current = heapq.heappop(open_set)
+
+            if current == goal:
+                path = [current]
+                while current in came_from:
+                    current = came_from[current]
+                    path.append(current)
+                path.reverse()
+                return path
+
+            for nxt, cost in neighbours(current):
+                tentative = g_score[current] + cost
+                if tentative < g_score.get(nxt, float("inf")):
+                    came_from[nxt] = current
+                    g_score[nxt] = tentative
+                    heapq.heappush(open_set, (tentative + heuristic(nxt), nxt))
+
+        return None
+
+
+# ============================================================
+# ВЫБОР РЕЖИМА ПОИСКА
+# ============================================================
+
+def make_path_finder(grid: np.ndarray, in_bounds, mode: str = PATHFINDING_MODE):
+    """
+    Функция find_path(start, goal) -> список клеток или None
+    для find_path_to_object. Иерархический граф строится один раз
+    и переиспользуется всеми запросами к этой сетке.
+    """
+    if mode == "hpa" or (mode == "auto" and grid.size >= HPA_MIN_CELLS):
+        return HierarchicalGrid(grid).find_path
+
+    def find_path(start, goal):
+        return astar_path(grid, start, goal, in_bounds)
+
+    return find_path
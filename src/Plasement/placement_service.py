@@ -0,0 +1,542 @@
+import argparse
+import asyncio
+import functools
+import json
+import math
+import os
+import random
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from glb_parser import load_room_from_glb, Room
+from anytime import place_anytime
+from capacity import CAPACITY_BUDGET_S, capacity
+from openings import load_openings
+from precheck import InfeasibleRequest, precheck
+from request_profile import PROFILE_DIR, profiling_requested, request_profile
+from shared_room import SHARED_ROOMS_MAX, SharedRoom, attach
+
+
+# ============================================================
+# НАСТРОЙКИ СЕРВИСА
+# ============================================================
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# пути от пакета, а не от текущей папки — сервис можно запускать откуда угодно
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+DEFAULT_GLB = str(DATA_DIR / "input" / "room.glb")
+FURNITURE_DB = str(DATA_DIR / "input" / "furniture_types.json")
+
+DEFAULT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+DEFAULT_QUEUE_LIMIT = 64     # сколько задач может ждать + выполняться одновременно
+DEFAULT_TIMEOUT_S = 10.0     # таймаут одной задачи по умолчанию
+RESULT_MARGIN_S = 0.25       # запас до таймаута на передачу результата из воркера
+LATENCY_WINDOW = 1000        # по скольким последним задачам считаем перцентили
+
+MAX_BODY_BYTES = 1 << 20
+
+
+# ============================================================
+# ТЁПЛОЕ СОСТОЯНИЕ (КОМНАТЫ + КАТАЛОГ)
+# ============================================================
+
+class WarmState:
+    """
+    Всё, что не меняется между запросами: каталог мебели и
+    распарсенные комнаты. Живёт в памяти процесса сервиса.
+
+    Статические слои каждой комнаты (shared_room.py) публикуются в
+    shared memory один раз; воркерам уходит только их handle, так что
+    память не растёт с числом воркеров, а комнату они не разбирают заново.
+    """
+
+    def __init__(self, furniture_db: str = FURNITURE_DB):
+        with open(furniture_db, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        self.catalog: Dict[str, dict] = {item["name"]: item for item in data["items"]}
+        self.groups: List[dict] = data.get("groups", [])
+        self.rooms: Dict[str, Room] = {}
+        self.shared: "OrderedDict[str, SharedRoom]" = OrderedDict()   # от давних к свежим
+        self.users: Dict[str, int] = {}      # сколько задач сейчас держат набор слоёв
+        self._published = 0
+
+    def room(self, glb_path: str) -> Room:
+        if not isinstance(glb_path, str):
+            raise ValueError("Поле room должно быть путём к GLB")
+        room = self.rooms.get(glb_path)
+        if room is None:
+            if not os.path.isfile(glb_path):
+                raise ValueError(f"Нет файла комнаты: {glb_path}")
+            try:
+                room = load_room_from_glb(glb_path)
+            except OSError as e:
+                raise ValueError(f"Не прочитать комнату {glb_path}: {e}")
+            self.rooms[glb_path] = room
+        return room
+
+    def room_handle(self, glb_path: str, openings: Optional[List[dict]] = None) -> dict:
+        """
+        Handle статических слоёв комнаты в shared memory (публикуются при
+        первом запросе). Двери, окна и радиаторы — часть статического слоя,
+        поэтому комната с другими openings публикуется отдельно. Наборов
+        держится не больше SHARED_ROOMS_MAX: самые давние из тех, что не
+        заняты задачами (acquire), закрываются.
+        """
+        name = _shared_name(glb_path, openings)
+        shared = self.shared.get(name)
+        if shared is None:
+            self._evict(SHARED_ROOMS_MAX - 1)
+            # ключ не повторяется: воркер кэширует подключение по нему
+            key = f"{os.getpid()}:{self._published}:{glb_path}"
+            shared = SharedRoom.publish(key, self.room(glb_path), openings=openings)
+            self._published += 1
+            self.shared[name] = shared
+        else:
+            self.shared.move_to_end(name)
+        return shared.handle
+
+    def acquire(self, glb_path: str, openings: Optional[List[dict]] = None) -> Tuple[str, dict]:
+        """room_handle для задачи: слои не закрываются, пока задача не вызовет release."""
+        handle = self.room_handle(glb_path, openings)
+        name = _shared_name(glb_path, openings)
+        self.users[name] = self.users.get(name, 0) + 1
+        return name, handle
+
+    def release(self, name: str):
+        left = self.users.pop(name) - 1
+        if left:
+            self.users[name] = left
+        self._evict(SHARED_ROOMS_MAX)
+
+    def _evict(self, keep: int):
+        for name in list(self.shared):
+            if len(self.shared) <= keep:
+                break
+            if name not in self.users:
+                self.shared.pop(name).close()
+
+    def close(self):
+        for shared in self.shared.values():
+            shared.close()
+        self.shared.clear()
+
+    def build_objects(self, requested: List) -> dict:
+        """
+        То же, что generate_objects_json в run_pipeline, но без записи на диск.
+        Элемент списка — имя из каталога или готовый словарь предмета.
+        """
+        items = []
+
+        for entry in requested:
+            if isinstance(entry, dict):
+                _check_item(entry)
+                items.append(entry)
+                continue
+
+            if not isinstance(entry, str) or entry not in self.catalog:
+                raise ValueError(f"❌ В базе нет предмета: {entry}")
+
+            src = self.catalog[entry]
+            items.append({
+                "name": src["name"],
+                "min_size_mm": src["min_size_mm"],
+                "max_size_mm": src["max_size_mm"],
+                "color": [0.7, 0.7, 0.7],
+                "constraints": src.get("constraints", {}),
+            })
+            if src.get("mesh"):
+                items[-1]["mesh"] = src["mesh"]
+
+        return {"items": items, "groups": self.groups}
+
+
+def _shared_name(glb_path: str, openings: Optional[List[dict]]) -> str:
+    return glb_path if not openings else f"{glb_path}#{json.dumps(openings, sort_keys=True)}"
+
+
+# ============================================================
+# ПРОВЕРКА ФОРМЫ ЗАПРОСА
+# ============================================================
+# Всё, что может упасть на чужом JSON, проверяется до очереди: ошибка
+# формы — ValueError (ответ 400), а не исключение в воркере.
+
+def _check_size(value, field: str):
+    if (not isinstance(value, list) or len(value) != 3
+            or not all(isinstance(v, (int, float)) and not isinstance(v, bool) and v > 0 for v in value)):
+        raise ValueError(f"Поле {field} должно быть тремя положительными числами (мм)")
+
+
+def _check_item(entry: dict):
+    """Предмет-словарь формата objects.json."""
+    if not isinstance(entry.get("name"), str):
+        raise ValueError("У предмета-словаря должно быть строковое поле name")
+    for field in ("min_size_mm", "max_size_mm"):
+        _check_size(entry.get(field), f"{entry['name']}.{field}")
+    if not isinstance(entry.get("constraints", {}), dict):
+        raise ValueError(f"Поле {entry['name']}.constraints должно быть объектом")
+
+
+def _check_job(job) -> dict:
+    """Общие поля place / capacity: тело — объект, seed, timeout_s, openings."""
+    if not isinstance(job, dict):
+        raise ValueError("Тело запроса должно быть JSON-объектом")
+    seed = job.get("seed")
+    if seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+        raise ValueError("Поле seed должно быть целым числом")
+    timeout = job.get("timeout_s")
+    if timeout is not None and (
+        not isinstance(timeout, (int, float)) or isinstance(timeout, bool)
+        or not math.isfinite(timeout) or timeout <= 0
+    ):
+        raise ValueError("Поле timeout_s должно быть положительным числом секунд")
+    openings = job.get("openings")
+    if openings is not None and (not isinstance(openings, list) or not all(isinstance(op, dict) for op in openings)):
+        raise ValueError("Поле openings должно быть списком объектов")
+    # описание проёмов проверяется до очереди: публикация слоёв идёт уже в занятом слоте
+    load_openings(openings)
+    return job
+
+
+# ============================================================
+# МЕТРИКИ
+# ============================================================
+
+class Metrics:
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.queued = 0      # ждут свободного воркера
+        self.running = 0     # выполняются (включая брошенные по таймауту)
+        self.completed = 0
+        self.failed = 0
+        self.timeouts = 0
+        self.rejected = 0    # отбиты из-за переполненной очереди
+        self.infeasible = 0  # отсечены предварительной проверкой (precheck.py)
+        self.latencies = deque(maxlen=window)
+
+    def snapshot(self) -> dict:
+        lat = sorted(self.latencies)
+
+        def pct(q: float) -> Optional[float]:
+            if not lat:
+                return None
+            return lat[min(len(lat) - 1, int(q * len(lat)))]
+
+        return {
+            "queue_depth": self.queued,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "timeouts": self.timeouts,
+            "rejected": self.rejected,
+            "infeasible": self.infeasible,
+            "latency_s": {
+                "count": len(lat),
+                "p50": pct(0.50),
+                "p95": pct(0.95),
+                "max": lat[-1] if lat else None,
+            },
+        }
+
+
+# ============================================================
+# ЗАДАЧА В ВОРКЕРЕ
+# ============================================================
+
+def _place_job(handle: dict, data: dict, seed: Optional[int], profile: bool, budget_s: float) -> dict:
+    # комната и её слои — из shared memory (подключение кэшируется на процесс)
+    static = attach(handle)
+    if seed is not None:
+        random.seed(seed)
+    # профиль запроса (request_profile.py) — по полю profile или PLACEMENT_PROFILE в окружении сервиса
+    with request_profile(
+        profiling_requested(profile), PROFILE_DIR, static.room, data, seed,
+        run={"mode": "place_anytime", "budget_s": budget_s},
+    ) as prof:
+        # к сроку воркер сам возвращает лучшую частичную расстановку (anytime.py)
+        result = place_anytime(static.room, data, budget_s, static=static)
+    if prof is not None:
+        result["profile"] = prof.files
+    return result
+
+
+def _capacity_job(
+    handle: dict, catalog: dict, name: str, placed: Optional[dict], size_mm, limit, seed: Optional[int], budget_s: float,
+) -> dict:
+    static = attach(handle)
+    if seed is not None:
+        random.seed(seed)
+    return capacity(
+        static.room, name, placed=placed, static=static, catalog=catalog,
+        size_mm=size_mm, limit=limit, budget_s=min(budget_s, CAPACITY_BUDGET_S),
+    )
+
+
+# ============================================================
+# СЕРВИС
+# ============================================================
+
+class PlacementService:
+    def __init__(
+        self,
+        state: WarmState,
+        workers: int = DEFAULT_WORKERS,
+        queue_limit: int = DEFAULT_QUEUE_LIMIT,
+        default_timeout: float = DEFAULT_TIMEOUT_S,
+    ):
+        self.state = state
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.default_timeout = default_timeout
+        self.metrics = Metrics()
+
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        # воркеры форкаются сразу, до первого соединения: форк посреди запроса
+        # унаследовал бы сокет клиента, и тот не дождался бы закрытия соединения
+        self.pool.submit(int).result()
+        self._slots = asyncio.Semaphore(workers)
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.state.close()
+
+    # ---------- выполнение ----------
+
+    def _release_slot(self, name: Optional[str], _fut=None):
+        self.metrics.running -= 1
+        self._slots.release()
+        if name is not None:
+            self.state.release(name)
+
+    async def place(self, job: dict) -> dict:
+        """
+        job = {"items": [...], "room": "path.glb", "openings": [...], "seed": 1, "timeout_s": 5, "profile": true}
+        openings — двери, окна и радиаторы комнаты (openings.py), необязательно.
+        profile — записать cProfile и tracemalloc задачи в PROFILE_DIR
+        (request_profile.py); пути — в поле profile ответа.
+        Таймаут считается от постановки в очередь. Воркеру отдаётся
+        оставшееся время (минус RESULT_MARGIN_S): к сроку он возвращает
+        лучшую частичную расстановку с complete=false и списком unplaced.
+        Воркер, всё же брошенный по таймауту, держит слот до фактического
+        завершения, чтобы очередь не переполняла пул.
+        """
+        _check_job(job)
+        requested = job.get("items")
+        if not isinstance(requested, list) or not requested:
+            raise ValueError("Поле items должно быть непустым списком")
+
+        room_path = job.get("room") or DEFAULT_GLB
+        room = self.state.room(room_path)
+        data = self.state.build_objects(requested)
+        seed = job.get("seed")
+        timeout = float(job.get("timeout_s") or self.default_timeout)
+
+        # заведомо невыполнимый запрос не занимает воркер
+        report = precheck(room, data)
+        if not report.ok:
+            self.metrics.infeasible += 1
+            raise InfeasibleRequest(report)
+
+        profile = bool(job.get("profile"))
+        return await self._submit(_place_job, room_path, job.get("openings"), timeout, data, seed, profile)
+
+    async def capacity(self, job: dict) -> dict:
+        """
+        job = {"item": "chair", "room": "path.glb", "openings": [...],
+               "placed": {...}, "size_mm": [...], "limit": 10, "seed": 1, "timeout_s": 2}
+        placed — уже стоящие предметы (ответ /place той же комнаты), необязательно.
+        Ответ — capacity.capacity: count и раскладка экземпляров. Очередь,
+        слоты и таймаут — как у place; воркеру отдаётся оставшееся время,
+        но не больше CAPACITY_BUDGET_S.
+        """
+        _check_job(job)
+        name = job.get("item")
+        if not isinstance(name, str) or name not in self.state.catalog:
+            raise ValueError(f"Поле item должно быть именем из каталога: {name}")
+
+        room_path = job.get("room") or DEFAULT_GLB
+        self.state.room(room_path)
+        placed = job.get("placed")
+        if placed is not None and not isinstance(placed, dict):
+            raise ValueError("Поле placed должно быть результатом /place")
+        limit = job.get("limit")
+        if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool) or limit < 1):
+            raise ValueError("Поле limit должно быть положительным целым числом")
+        if job.get("size_mm") is not None:
+            _check_size(job["size_mm"], "size_mm")
+        timeout = float(job.get("timeout_s") or self.default_timeout)
+
+        return await self._submit(
+            _capacity_job, room_path, job.get("openings"), timeout,
+            self.state.catalog, name, placed, job.get("size_mm"), limit, job.get("seed"),
+        )
+
+    async def _submit(self, fn, room_path: str, openings, timeout: float, *args) -> dict:
+        """
+        Задача fn(handle, *args, budget) в пуле воркеров: ограничение
+        очереди, ожидание слота и таймаут от постановки в очередь.
+        """
+        if self.metrics.queued + self.metrics.running >= self.queue_limit:
+            self.metrics.rejected += 1
+            raise OverflowError("Очередь переполнена")
+
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+
+        self.metrics.queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.queued -= 1
+
+        self.metrics.running += 1
+        name = None
+        try:
+            # разбор GLB и публикация слоёв могут упасть — слот не должен утечь
+            name, handle = self.state.acquire(room_path, openings)
+            budget = max(0.0, timeout - (time.perf_counter() - started) - RESULT_MARGIN_S)
+            fut = loop.run_in_executor(self.pool, fn, handle, *args, budget)
+        except Exception:
+            self._release_slot(name)
+            raise
+        fut.add_done_callback(functools.partial(self._release_slot, name))
+
+        remaining = max(0.0, timeout - (time.perf_counter() - started))
+        try:
+            result = await asyncio.wait_for(asyncio.shield(fut), remaining)
+        except asyncio.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        except Exception:
+            self.metrics.failed += 1
+            raise
+
+        self.metrics.completed += 1
+        self.metrics.latencies.append(time.perf_counter() - started)
+        return result
+
+    # ---------- HTTP ----------
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok", "workers": self.workers}
+
+        if method == "GET" and path == "/metrics":
+            return 200, self.metrics.snapshot()
+
+        if method == "POST" and path in ("/place", "/capacity"):
+            try:
+                job = json.loads(body or b"{}")
+                return 200, await (self.place(job) if path == "/place" else self.capacity(job))
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            except OverflowError as e:
+                return 503, {"error": str(e)}
+            except asyncio.TimeoutError:
+                return 504, {"error": "Таймаут расстановки"}
+            except InfeasibleRequest as e:
+                return 422, {"error": str(e), **e.report.to_dict()}
+            except RuntimeError as e:
+                return 422, {"error": str(e)}
+
+        return 404, {"error": f"Нет маршрута {method} {path}"}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+
+            method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0))
+            if length > MAX_BODY_BYTES:
+                status, payload = 413, {"error": "Слишком большое тело запроса"}
+            else:
+                body = await reader.readexactly(length) if length else b""
+                try:
+                    status, payload = await self._route(method, path, body)
+                except Exception as e:
+                    # непредвиденная ошибка — ответ 500, а не оборванное соединение
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+
+            raw = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            writer.write(
+                f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                "Content-Type: application/json; charset=utf-8\r\n"
+                f"Content-Length: {len(raw)}\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1") + raw
+            )
+            await writer.drain()
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+# ============================================================
+# ЗАПУСК
+# ============================================================
+
+async def serve(args):
+    state = WarmState(args.furniture_db)
+    # прогреваем комнату по умолчанию до первого запроса
+    state.room_handle(args.room)
+
+    service = PlacementService(
+        state,
+        workers=args.workers,
+        queue_limit=args.queue_limit,
+        default_timeout=args.timeout,
+    )
+
+    if args.unix:
+        server = await asyncio.start_unix_server(service.handle, path=args.unix)
+        where = args.unix
+    else:
+        server = await asyncio.start_server(service.handle, args.host, args.port)
+        where = f"http://{args.host}:{args.port}"
+
+    print(f"✅ Сервис расстановки слушает {where} (воркеров: {args.workers})")
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальный сервис расстановки мебели")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", help="путь к Unix-сокету вместо TCP")
+    parser.add_argument("--room", default=DEFAULT_GLB, help="комната, загружаемая при старте")
+    parser.add_argument("--furniture-db", default=FURNITURE_DB)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--queue-limit", type=int, default=DEFAULT_QUEUE_LIMIT)
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT_S)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
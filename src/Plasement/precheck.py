@@ -0,0 +1,198 @@
+from typing import List, Optional
+
+import numpy as np
+
+from constraints import ItemRules, compile_constraints, footprint_extents
+from glb_parser import Room
+from wall_slots import WallIntervals, wall_slots
+
+
+# ============================================================
+# НАСТРОЙКИ
+# ============================================================
+
+# повороты, перебираемые для предметов с непрерывным поворотом; габарит
+# при повороте на 180° тот же, так что полуоборота хватает
+PRECHECK_ROTATION_STEP_DEG = 1
+PRECHECK_ROTATIONS = tuple(range(0, 180, PRECHECK_ROTATION_STEP_DEG))
+
+
+# ============================================================
+# ОТЧЁТ
+# ============================================================
+
+class FeasibilityReport:
+    """
+    Результат предварительной проверки. problems — список словарей
+    {"check", "item", "message", "need", "have"}; item = None для
+    проверок по всему запросу (площадь, стены, углы).
+    """
+
+    __slots__ = ("problems", "bounds")
+
+    def __init__(self):
+        self.problems: List[dict] = []
+        self.bounds: dict = {}
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+    def add(self, check: str, item: Optional[str], message: str, need: float = None, have: float = None):
+        self.problems.append({
+            "check": check,
+            "item": item,
+            "message": message,
+            "need": None if need is None else round(float(need), 3),
+            "have": None if have is None else round(float(have), 3),
+        })
+
+    def to_dict(self) -> dict:
+        return {"feasible": self.ok, "problems": list(self.problems), "bounds": dict(self.bounds)}
+
+    def explain(self) -> str:
+        if self.ok:
+            return "✅ Запрос выполним по нижним оценкам"
+        lines = ["❌ Запрос невыполним:"]
+        for p in self.problems:
+            who = f"{p['item']}: " if p["item"] else ""
+            lines.append(f"  - [{p['check']}] {who}{p['message']}")
+        return "\n".join(lines)
+
+
+class InfeasibleRequest(RuntimeError):
+    """Запрос заведомо невыполним; report — подробности (FeasibilityReport)."""
+
+    def __init__(self, report: FeasibilityReport):
+        super().__init__(report.explain())
+        self.report = report
+
+
+# ============================================================
+# ПРОВЕРКИ ОДНОГО ПРЕДМЕТА
+# ============================================================
+
+def _fits_free(rules: ItemRules, room: Room, sx: float, sy: float) -> bool:
+    """
+    Помещается ли предмет с free_side полосами в пустую комнату хоть при
+    одном повороте. Дискретный поворот проверяется точно. Непрерывный —
+    по сетке PRECHECK_ROTATIONS с запасом: габарит фигуры радиуса r при
+    повороте на угол a (рад) меняется не больше чем на 2·r·a, так что
+    у подходящего промежуточного угла ближайший угол сетки вылезает
+    не больше чем на r·шаг. Проверка остаётся нижней оценкой — предмет,
+    который встаёт хоть под каким-то углом, не отсекается.
+    """
+    if rules.rotation_step:
+        rotations = np.arange(0.0, 360.0, float(rules.rotation_step))
+        slack = 0.0
+    else:
+        rotations = np.array(PRECHECK_ROTATIONS, dtype=float)
+        lo_x, hi_x, lo_y, hi_y = footprint_extents(rules, sx, sy, np.zeros(1))
+        radius = np.hypot(max(-lo_x[0], hi_x[0]), max(-lo_y[0], hi_y[0]))
+        slack = float(radius) * np.radians(PRECHECK_ROTATION_STEP_DEG)
+
+    lo_x, hi_x, lo_y, hi_y = footprint_extents(rules, sx, sy, rotations)
+    fits = (hi_x - lo_x <= room.width + slack + 1e-9) & (hi_y - lo_y <= room.depth + slack + 1e-9)
+    return bool(fits.any())
+
+
+def _wall_length(rules: ItemRules, sx: float, sy: float) -> float:
+    """Сколько стены минимум занимает предмет, прижатый нужной гранью."""
+    if rules.wall_side in ("front", "back"):
+        return sx
+    if rules.wall_side in ("left", "right"):
+        return sy
+    return min(sx, sy)
+
+
+def _check_item(report: FeasibilityReport, name: str, rules: ItemRules, room: Room, size) -> None:
+    sx, sy, sz = size
+
+    if sz > room.height + 1e-9:
+        report.add("height", name, "выше комнаты даже при минимальном размере", sz, room.height)
+        return
+
+    if rules.mount_height is not None:
+        top = rules.mount_height + sz / 2
+        bottom = rules.mount_height - sz / 2
+        if top > room.height + 1e-9 or bottom < -1e-9:
+            report.add("mount_height", name, "на высоте mount_height_m не помещается по вертикали", top, room.height)
+            return
+
+    if rules.wall_side is not None:
+        if not wall_slots(WallIntervals(room), rules, room, sx, sy, sz):
+            check = "corner_fit" if rules.in_corner else "wall_fit"
+            report.add(check, name, "не встаёт к стене пустой комнаты вместе со свободными зонами")
+        return
+
+    if not _fits_free(rules, room, sx, sy):
+        report.add("fit", name, "не помещается в пустую комнату вместе со свободными зонами")
+
+
+# ============================================================
+# ПРЕДВАРИТЕЛЬНАЯ ПРОВЕРКА ЗАПРОСА
+# ============================================================
+
+def precheck(room: Room, data: dict) -> FeasibilityReport:
+    """
+    Нижние оценки до поиска (миллисекунды): по минимальным размерам
+    каталога проверяются высота, "помещается ли каждый предмет в пустую
+    комнату со своими зонами", суммарная площадь напольных предметов,
+    суммарная длина стен под touch_wall, число углов под in_corner
+    и наличие опор для предметов on_top.
+    Случайные размеры не сэмплируются — проверка детерминирована.
+    """
+    report = FeasibilityReport()
+
+    floor_area = room.width * room.depth
+    perimeter = 2 * (room.width + room.depth)
+    area = 0.0
+    wall_length = 0.0
+    corners = 0
+    names = {obj["name"] for obj in data["items"]}
+    supports = set()
+
+    for obj in data["items"]:
+        rules = compile_constraints(obj.get("constraints", {}))
+        if rules.is_support and rules.mount != "on_top":
+            supports.add(obj["name"])
+
+    for obj in data["items"]:
+        name = obj["name"]
+        rules = compile_constraints(obj.get("constraints", {}))
+        size = tuple(v / 1000.0 for v in obj["min_size_mm"])
+
+        _check_item(report, name, rules, room, size)
+
+        if rules.mount == "on_top":
+            allowed = (set(rules.support_names) & names) if rules.support_names else supports
+            if not allowed & supports:
+                report.add("support", name, "в запросе нет предмета, на который его можно поставить")
+
+        # напольные предметы не могут перекрываться ни в плане, ни вдоль стен
+        on_floor = rules.mount == "floor" and rules.mount_height is None
+        if not on_floor:
+            continue
+
+        area += size[0] * size[1]
+        if rules.wall_side is not None:
+            wall_length += _wall_length(rules, size[0], size[1])
+        if rules.in_corner:
+            corners += 1
+
+    report.bounds = {
+        "floor_area_m2": round(floor_area, 3),
+        "items_area_m2": round(area, 3),
+        "perimeter_m": round(perimeter, 3),
+        "wall_length_m": round(wall_length, 3),
+        "corners": corners,
+    }
+
+    if area > floor_area + 1e-9:
+        report.add("area", None, "суммарная площадь напольных предметов больше площади пола", area, floor_area)
+    if wall_length > perimeter + 1e-9:
+        report.add("wall_length", None, "предметам у стены не хватает длины стен", wall_length, perimeter)
+    if corners > 4:
+        report.add("corners", None, "предметов in_corner больше, чем углов", corners, 4)
+
+    return report
@@ -0,0 +1,618 @@
+import math
+import random
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from constraints import (
+    ACCESS_DEPTH_M,
+    SIDES,
+    half_extents,
+    item_approach_targets,
+    item_zones,
+    reserve_zones,
+    side_rects,
+)
+from glb_parser import Room
+from groups import Group, flatten, wall_contact
+from obb import obb_axes, obb_overlap_many
+from pathfinding_astar import (
+    HUMAN_SIZE,
+    build_walk_grid,
+    reachable_mask,
+)
+from scene_store import AABB_KEYS, SceneStore
+from shared_room import entry_sources
+from heightfield import HeightField
+from CubePlacement import Item, commit_group, item_center_z, place_unit, random_rotation
+
+
+# ============================================================
+# НАСТРОЙКИ ЛОКАЛЬНОГО ПОИСКА
+# ============================================================
+
+REPAIR_TIME_BUDGET_S = 2.0
+REPAIR_MAX_STEPS = 2000  # ходов отжига; температура падает по номеру хода, бюджет — только отсечка
+T_START = 1.0           # начальная температура отжига
+T_END = 0.01            # конечная температура
+JITTER_M = 0.3          # сигма сдвига при "мелком" ходе
+
+W_OVERLAP = 10.0        # за м² пересечения (с предметами и запретными зонами комнаты)
+W_OUTSIDE = 10.0        # за м вылета за комнату
+W_WALL = 5.0            # за м зазора до стены у touch_wall
+W_FREE_SIDE = 1.0       # за каждый предмет в свободной зоне (free_side, под люстрой)
+W_ACCESS = 2.0          # за каждый предмет без подхода (или без multi_side_access)
+
+WALL_EPS = 0.02
+
+
+# ============================================================
+# СОСТОЯНИЕ РАССТАНОВКИ
+# ============================================================
+
+class LayoutState:
+    """
+    Расстановка для локального поиска: по массиву на каждую координату
+    и кэш попарных штрафов (пересечения, занятые free_side), чтобы ход
+    одного предмета пересчитывал только его строку и столбец.
+    static — статические слои комнаты (shared_room.StaticRoom) или None:
+    запретные зоны идут в штраф предмета, сетка прохода и входы — в подход.
+    Группа (groups.Group) — одна переменная: её оболочка с правилами группы.
+    """
+
+    def __init__(self, room: Room, items: List[Item], static=None):
+        n = len(items)
+        self.room = room
+        self.items = items
+        self.static = static
+        self.keepout = None if static is None else static.keepout
+
+        self.cx = np.zeros(n)
+        self.cy = np.zeros(n)
+        self.cz = np.zeros(n)
+        self.rot = np.zeros(n)
+        self.size = np.array([(it.sx, it.sy, it.sz) for it in items], dtype=float)
+
+        # попарные штрафы: overlap[i, j] симметричен, blocked[i, j] — j в свободной зоне предмета i
+        self.overlap = np.zeros((n, n))
+        self.blocked = np.zeros((n, n))
+        self.unary = np.zeros(n)        # вылет за комнату + запретные зоны + зазор до стены
+        self.access = np.zeros(n)       # 1, если к предмету нет подхода
+
+        # скомпилированные ограничения (constraints.py)
+        self.rules = [it.rules for it in items]
+        self.wall_side = [r.wall_side for r in self.rules]
+        self.has_zones = np.array(
+            [bool(r.free_sides) or r.free_below > 0 or r.free_above > 0 for r in self.rules]
+        )
+
+    # ---------- геометрия ----------
+
+    def aabbs(self, idx=None) -> np.ndarray:
+        idx = slice(None) if idx is None else idx
+        a = np.radians(self.rot[idx])
+        c, s = np.abs(np.cos(a)), np.abs(np.sin(a))
+        sx, sy, sz = self.size[idx, 0], self.size[idx, 1], self.size[idx, 2]
+        hx = (sx * c + sy * s) / 2
+        hy = (sx * s + sy * c) / 2
+        return np.stack([
+            self.cx[idx] - hx, self.cx[idx] + hx,
+            self.cy[idx] - hy, self.cy[idx] + hy,
+            self.cz[idx] - sz / 2, self.cz[idx] + sz / 2,
+        ], axis=-1)
+
+    def member_boxes(self, i: int):
+        """Группа i: [(правила участника, AABB (6,), поворот)] по позе оболочки (Group.poses)."""
+        group = self.items[i]
+        out = []
+        for item, (x, y, r) in zip(group.members, group.poses(self.cx[i], self.cy[i], self.rot[i]).tolist()):
+            hx, hy = half_extents(np.array([item.sx, item.sy]), r)
+            cz = item_center_z(self.room, item)
+            out.append((item.rules, np.array([x - hx, x + hx, y - hy, y + hy, cz - item.sz / 2, cz + item.sz / 2]), r))
+        return out
+
+    def _zones(self, i: int):
+        """Свободные зоны предмета i: [(центр (2,), размер (2,), z0, z1)]."""
+        return item_zones(
+            self.rules[i], self.room,
+            self.cx[i], self.cy[i], self.cz[i], self.rot[i],
+            self.size[i, 0], self.size[i, 1], self.size[i, 2],
+        )
+
+    def _in_zone(self, zone, rot: float, idx: np.ndarray) -> np.ndarray:
+        """Какие предметы idx заходят в зону (повёрнутую на rot)."""
+        center, size, z0, z1 = zone
+        z_lo = self.cz[idx] - self.size[idx, 2] / 2
+        z_hi = self.cz[idx] + self.size[idx, 2] / 2
+        hit = (z_lo < z1) & (z_hi > z0)
+        if hit.any():
+            hit[hit] = obb_overlap_many(
+                center, size, rot,
+                np.column_stack((self.cx[idx[hit]], self.cy[idx[hit]])),
+                self.size[idx[hit], :2], self.rot[idx[hit]],
+            )
+        return hit
+
+    # ---------- штрафы ----------
+
+    def _overlap_row(self, i: int) -> np.ndarray:
+        boxes = self.aabbs()
+        b = boxes[i]
+
+        ix = np.clip(np.minimum(boxes[:, 1], b[1]) - np.maximum(boxes[:, 0], b[0]), 0, None)
+        iy = np.clip(np.minimum(boxes[:, 3], b[3]) - np.maximum(boxes[:, 2], b[2]), 0, None)
+        iz = np.minimum(boxes[:, 5], b[5]) > np.maximum(boxes[:, 4], b[4])
+
+        area = ix * iy * iz
+        cand = np.flatnonzero(area > 0)
+        cand = cand[cand != i]
+        row = np.zeros(len(self.items))
+
+        if cand.size:
+            hit = obb_overlap_many(
+                (self.cx[i], self.cy[i]), self.size[i, :2], self.rot[i],
+                np.column_stack((self.cx[cand], self.cy[cand])),
+                self.size[cand, :2], self.rot[cand],
+            )
+            row[cand[hit]] = area[cand[hit]]
+
+        return row
+
+    def _blocked_row(self, i: int) -> np.ndarray:
+        """Какие предметы занимают свободные зоны предмета i."""
+        row = np.zeros(len(self.items))
+        if not self.has_zones[i]:
+            return row
+
+        others = np.arange(len(self.items))
+        others = others[others != i]
+        if others.size:
+            for zone in self._zones(i):
+                row[others[self._in_zone(zone, self.rot[i], others)]] = 1.0
+
+        return row
+
+    def _blocked_col(self, i: int) -> np.ndarray:
+        """В чьих свободных зонах стоит предмет i."""
+        col = np.zeros(len(self.items))
+        me = np.array([i])
+
+        for j in np.flatnonzero(self.has_zones):
+            if j == i:
+                continue
+            for zone in self._zones(j):
+                if self._in_zone(zone, self.rot[j], me)[0]:
+                    col[j] = 1.0
+                    break
+
+        return col
+
+    def _unary(self, i: int) -> float:
+        room = self.room
+        b = self.aabbs(i)
+
+        outside = (
+            max(0.0, room.x_min - b[0]) + max(0.0, b[1] - room.x_max) +
+            max(0.0, room.y_min - b[2]) + max(0.0, b[3] - room.y_max) +
+            max(0.0, room.z_min - b[4]) + max(0.0, b[5] - room.z_max)
+        )
+        cost = W_OUTSIDE * outside
+
+        if self.keepout is not None and len(self.keepout):
+            k = self.keepout
+            dx = np.minimum(b[1], k[:, 1]) - np.maximum(b[0], k[:, 0])
+            dy = np.minimum(b[3], k[:, 3]) - np.maximum(b[2], k[:, 2])
+            hit = (dx > 0) & (dy > 0) & (b[4] < k[:, 5]) & (b[5] > k[:, 4])
+            cost += W_OVERLAP * float((dx * dy)[hit].sum())
+
+        sx, sy = self.size[i, 0], self.size[i, 1]
+        for side, dist in self.rules[i].free_sides:
+            center, size = side_rects(self.cx[i], self.cy[i], self.rot[i], sx, sy, side, dist)
+            hx, hy = half_extents(size, self.rot[i])
+            strip_out = (
+                max(0.0, room.x_min - (center[0] - hx)) + max(0.0, center[0] + hx - room.x_max) +
+                max(0.0, room.y_min - (center[1] - hy)) + max(0.0, center[1] + hy - room.y_max)
+            )
+            cost += W_OUTSIDE * strip_out
+
+        if self.wall_side[i] is not None:
+            cost += W_WALL * self.wall_gap(i)
+            if self.rules[i].in_corner:
+                cost += W_WALL * self.corner_gap(i)
+
+        return cost
+
+    def _wall_gaps(self, i: int) -> dict:
+        """Зазоры AABB предмета до стен, по направлению внешней нормали стены."""
+        room = self.room
+        b = self.aabbs(i)
+        return {
+            (0, -1): b[2] - room.y_min,
+            (0, 1): room.y_max - b[3],
+            (-1, 0): b[0] - room.x_min,
+            (1, 0): room.x_max - b[1],
+        }
+
+    def _wall_key(self, i: int):
+        """
+        Направление стены, к которой должна прилегать нужная грань
+        (None — грань не параллельна стенам). "any" — ближайшая стена.
+        """
+        gaps = self._wall_gaps(i)
+        side = self.wall_side[i]
+        if side == "any":
+            return min(gaps, key=gaps.get)
+
+        (rx, ry), (fx, fy) = obb_axes(self.rot[i])
+        normal = {
+            "front": (fx, fy), "back": (-fx, -fy),
+            "right": (rx, ry), "left": (-rx, -ry),
+        }[side]
+
+        key = (int(round(normal[0])), int(round(normal[1])))
+        if key not in gaps or abs(normal[0]) + abs(normal[1]) > 1 + 1e-6:
+            return None
+        return key
+
+    def wall_gap(self, i: int) -> float:
+        """
+        Зазор между нужной гранью предмета и ближайшей стеной,
+        в которую эта грань смотрит. "any" — любая грань.
+        """
+        key = self._wall_key(i)
+        if key is None:
+            # грань не параллельна стенам — к стене её не прижать
+            return max(self.room.width, self.room.depth)
+        return max(0.0, self._wall_gaps(i)[key])
+
+    def corner_gap(self, i: int) -> float:
+        """in_corner: зазор до ближайшей из двух стен, соседних с основной."""
+        key = self._wall_key(i)
+        if key is None:
+            return max(self.room.width, self.room.depth)
+
+        gaps = self._wall_gaps(i)
+        lateral = [(key[1], key[0]), (-key[1], -key[0])]
+        return max(0.0, min(gaps[k] for k in lateral))
+
+    def free_side_count(self, i: int, depth: float) -> int:
+        """Со скольких сторон у предмета i есть полоса depth внутри комнаты без предметов."""
+        room = self.room
+        sx, sy = self.size[i, 0], self.size[i, 1]
+        others = np.arange(len(self.items))
+        others = others[others != i]
+        z0, z1 = room.z_min, room.z_min + HUMAN_SIZE[2]
+
+        count = 0
+        for side in SIDES:
+            center, size = side_rects(self.cx[i], self.cy[i], self.rot[i], sx, sy, side, depth)
+            hx, hy = half_extents(size, self.rot[i])
+            if (
+                center[0] - hx < room.x_min or center[0] + hx > room.x_max or
+                center[1] - hy < room.y_min or center[1] + hy > room.y_max
+            ):
+                continue
+            if others.size and self._in_zone((center, size, z0, z1), self.rot[i], others).any():
+                continue
+            count += 1
+
+        return count
+
+    def refresh(self, i: int):
+        row = self._overlap_row(i)
+        self.overlap[i, :] = row
+        self.overlap[:, i] = row
+
+        self.blocked[i, :] = self._blocked_row(i)
+        self.blocked[:, i] = self._blocked_col(i)
+        self.blocked[i, i] = 0.0
+
+        self.unary[i] = self._unary(i)
+
+    def refresh_all(self):
+        for i in range(len(self.items)):
+            self.refresh(i)
+
+    def geometric_cost(self) -> float:
+        return (
+            W_OVERLAP * self.overlap.sum() / 2 +
+            W_FREE_SIDE * self.blocked.sum() +
+            self.unary.sum()
+        )
+
+    def evaluate_access(self):
+        """
+        Одна заливка от всех входов на весь слой — подход ко всем предметам
+        сразу. Группа проверяется поучастно, как в итоговой сцене: проход
+        загораживают участники, а не оболочка с общими полосами.
+        """
+        self.access[:] = 0.0
+        boxes = self.aabbs()
+        groups = {i: self.member_boxes(i) for i, it in enumerate(self.items) if isinstance(it, Group)}
+        obstacles = [b for i, b in enumerate(boxes) if i not in groups]
+        obstacles += [b for parts in groups.values() for _, b, _ in parts]
+
+        base = None if self.static is None else self.static.walk
+        grid, world_to_grid, _, _ = build_walk_grid(vars(self.room), np.array(obstacles).reshape(-1, 6), base=base)
+        reach = reachable_mask(grid, entry_sources(self.room, world_to_grid, self.static))
+        nx, ny = reach.shape
+
+        def reachable(rules, box, rot) -> bool:
+            for tx, ty in item_approach_targets(rules, dict(zip(AABB_KEYS, box)), rot):
+                gx, gy = world_to_grid(tx, ty)
+                if 0 <= gx < nx and 0 <= gy < ny and reach[gx, gy]:
+                    return True
+            return False
+
+        for i, rules in enumerate(self.rules):
+            if i in groups:
+                ok = all(reachable(member, box, r) for member, box, r in groups[i] if member.needs_approach)
+                self.access[i] = 0.0 if ok else 1.0
+                continue
+            if rules.multi_side_access and self.free_side_count(i, ACCESS_DEPTH_M) < rules.multi_side_access:
+                self.access[i] = 1.0
+                continue
+            if rules.free_any_side and self.free_side_count(i, rules.free_any_side) < 1:
+                self.access[i] = 1.0
+                continue
+            if not rules.needs_approach:
+                continue
+            self.access[i] = 0.0 if reachable(rules, boxes[i], self.rot[i]) else 1.0
+
+    def violators(self) -> np.ndarray:
+        bad = (
+            (self.overlap.sum(axis=1) > 0) |
+            (self.blocked.sum(axis=1) > 0) |
+            (self.blocked.sum(axis=0) > 0) |
+            (self.unary > 1e-9) |
+            (self.access > 0)
+        )
+        return np.flatnonzero(bad)
+
+    # ---------- снимок для отката ----------
+
+    def snapshot(self, i: int):
+        return (
+            self.cx[i], self.cy[i], self.cz[i], self.rot[i], self.size[i].copy(),
+            self.overlap[i].copy(), self.blocked[i].copy(), self.blocked[:, i].copy(),
+            self.unary[i],
+        )
+
+    def restore(self, i: int, snap):
+        (self.cx[i], self.cy[i], self.cz[i], self.rot[i], size,
+         row, b_row, b_col, self.unary[i]) = snap
+        self.size[i] = size
+        self.overlap[i, :] = row
+        self.overlap[:, i] = row
+        self.blocked[i, :] = b_row
+        self.blocked[:, i] = b_col
+
+
+# ============================================================
+# ХОДЫ
+# ============================================================
+
+def _snap_to_wall(state: LayoutState, i: int):
+    """Прижимает нужную грань к стене, в которую она смотрит."""
+    side = state.wall_side[i]
+    room = state.room
+    b = state.aabbs(i)
+    hx, hy = (b[1] - b[0]) / 2, (b[3] - b[2]) / 2
+
+    if side == "any":
+        (fx, fy) = random.choice(((0, -1), (0, 1), (-1, 0), (1, 0)))
+    else:
+        (rx, ry), (fx, fy) = obb_axes(state.rot[i])
+        fx, fy = {
+            "front": (fx, fy), "back": (-fx, -fy),
+            "right": (rx, ry), "left": (-rx, -ry),
+        }[side]
+        fx, fy = round(fx), round(fy)
+
+    directions = [(fx, fy)]
+    if state.rules[i].in_corner:
+        directions.append(random.choice(((fy, fx), (-fy, -fx))))
+
+    for d in directions:
+        if d == (0, -1):
+            state.cy[i] = room.y_min + hy
+        elif d == (0, 1):
+            state.cy[i] = room.y_max - hy
+        elif d == (-1, 0):
+            state.cx[i] = room.x_min + hx
+        elif d == (1, 0):
+            state.cx[i] = room.x_max - hx
+
+
+def _propose(state: LayoutState, i: int, temperature: float):
+    item = state.items[i]
+    room = state.room
+    kind = random.random()
+
+    if kind < 0.6:
+        # сдвиг: мелкий при низкой температуре, прыжок при высокой
+        if random.random() < temperature:
+            state.cx[i] = random.uniform(room.x_min, room.x_max)
+            state.cy[i] = random.uniform(room.y_min, room.y_max)
+        else:
+            state.cx[i] += random.gauss(0.0, JITTER_M)
+            state.cy[i] += random.gauss(0.0, JITTER_M)
+    elif kind < 0.85 or isinstance(item, Group):
+        # оболочку группы задают размеры участников — группа не ужимается
+        state.rot[i] = random_rotation(item)
+    else:
+        # ресайз: в пределах каталога, с уклоном к минимальному размеру
+        lo, hi = item.min_size, item.max_size
+        for k in range(3):
+            target = random.uniform(lo[k], state.size[i, k])
+            state.size[i, k] = min(hi[k], max(lo[k], target))
+        saved = (item.sx, item.sy, item.sz)
+        item.sx, item.sy, item.sz = state.size[i]
+        state.cz[i] = item_center_z(room, item)
+        item.sx, item.sy, item.sz = saved
+
+    if state.wall_side[i] is not None:
+        _snap_to_wall(state, i)
+
+
+def _start_pose(room: Room, unit, known: dict):
+    """
+    (cx, cy, cz, rot) предмета или оболочки группы по стартовой сцене
+    или None. Оболочка восстанавливается по опорному участнику: его
+    поворот в осях группы нулевой, центр — в начале её осей.
+    """
+    if not isinstance(unit, Group):
+        p = known.get(id(unit))
+        return None if p is None else (p.cx, p.cy, p.cz, p.rotation)
+
+    p = known.get(id(unit.members[0]))
+    if p is None:
+        return None
+    a = math.radians(p.rotation)
+    ox, oy = unit.offset
+    return (
+        p.cx + ox * math.cos(a) - oy * math.sin(a),
+        p.cy + ox * math.sin(a) + oy * math.cos(a),
+        item_center_z(room, unit),
+        p.rotation,
+    )
+
+
+def _add_group(room: Room, placed: SceneStore, group: Group, cx: float, cy: float, rot: float):
+    """Участники группы в сцену по позам оболочки (groups.Group.poses)."""
+    poses = []
+    for item, (x, y, r) in zip(group.members, group.poses(cx, cy, rot).tolist()):
+        wall = None
+        if item.rules.wall_side is not None:
+            wall = wall_contact(room, item.rules, x, y, r, item.sx, item.sy)
+        poses.append(((x, y, item_center_z(room, item)), r, wall))
+    commit_group(room, placed, group, poses, cx, cy, rot)
+
+
+# ============================================================
+# ОТЖИГ
+# ============================================================
+
+def repair_layout(
+    room: Room,
+    units: List,
+    start: Optional[SceneStore] = None,
+    time_budget_s: float = REPAIR_TIME_BUDGET_S,
+    stop=None,
+    static=None,
+    max_steps: int = REPAIR_MAX_STEPS,
+) -> Optional[SceneStore]:
+    """
+    Доводит почти допустимую расстановку до допустимой локальным
+    поиском (min-conflicts + имитация отжига): двигает, вращает и
+    уменьшает только предметы, нарушающие ограничения (пересечения,
+    touch_wall, in_corner, свободные зоны, multi_side_access, нет
+    подхода). Предметы, которых нет в start, ставятся в случайную точку.
+    Предметы on_top в отжиге не участвуют — их ставят на опоры по карте
+    высот, когда пол уже решён. Возвращает SceneStore или None, если за
+    max_steps ходов (или time_budget_s) решение не найдено.
+
+    Температура зависит только от номера хода, поэтому при том же сиде
+    поиск идёт одинаково; time_budget_s лишь обрывает его.
+
+    units — предметы и группы (groups.Group): группа двигается и
+    вращается целиком, позы участников выводятся из оболочки.
+
+    stop — anytime.Deadline вызывающего: поиск прерывается и при его
+    истечении (или отмене), даже если свой бюджет ещё не вышел.
+    static — статические слои комнаты (shared_room.StaticRoom) или None.
+    """
+    deadline = time.perf_counter() + time_budget_s
+    stacked = [u for u in units if u.rules.mount == "on_top"]
+    items = [u for u in units if u.rules.mount != "on_top"]
+    state = LayoutState(room, items, static)
+
+    known = {}
+    if start is not None:
+        for p in start:
+            known[id(p.item)] = p
+
+    for i, item in enumerate(items):
+        pose = _start_pose(room, item, known)
+        if pose is not None:
+            state.cx[i], state.cy[i], state.cz[i], state.rot[i] = pose
+        else:
+            state.rot[i] = random_rotation(item)
+            state.cx[i] = random.uniform(room.x_min, room.x_max)
+            state.cy[i] = random.uniform(room.y_min, room.y_max)
+            state.cz[i] = item_center_z(room, item)
+            if state.wall_side[i] is not None:
+                _snap_to_wall(state, i)
+
+    state.refresh_all()
+    geom = state.geometric_cost()
+    if geom == 0:
+        state.evaluate_access()
+    cost = geom + W_ACCESS * state.access.sum()
+
+    for step in range(max_steps):
+        if cost <= 0:
+            break
+        if time.perf_counter() >= deadline or (stop is not None and stop.expired()):
+            return None
+
+        temperature = T_START * (T_END / T_START) ** (step / max_steps)
+
+        bad = state.violators()
+        i = int(random.choice(bad)) if bad.size else random.randrange(len(items))
+
+        snap = state.snapshot(i)
+        access_before = state.access.copy()
+
+        _propose(state, i, temperature)
+        state.refresh(i)
+
+        new_geom = state.geometric_cost()
+        if new_geom == 0:
+            state.evaluate_access()
+        else:
+            state.access[:] = 0.0
+        new_cost = new_geom + W_ACCESS * state.access.sum()
+
+        delta = new_cost - cost
+        if delta <= 0 or random.random() < math.exp(-delta / temperature):
+            cost = new_cost
+        else:
+            state.restore(i, snap)
+            state.access[:] = access_before
+
+    if cost > 0:
+        return None
+
+    # ---------- в SceneStore ----------
+    for i, item in enumerate(items):
+        item.sx, item.sy, item.sz = state.size[i]
+
+    placed = SceneStore(capacity=len(flatten(units)), keepout=state.keepout)
+    for i, item in enumerate(items):
+        if isinstance(item, Group):
+            _add_group(room, placed, item, state.cx[i], state.cy[i], state.rot[i])
+            continue
+
+        wall_contact_side = None
+        if state.wall_side[i] is not None:
+            b = state.aabbs(i)
+            for side, gap in (
+                ("front", b[2] - room.y_min), ("back", room.y_max - b[3]),
+                ("left", b[0] - room.x_min), ("right", room.x_max - b[1]),
+            ):
+                if gap < WALL_EPS:
+                    wall_contact_side = side
+                    break
+
+        index = placed.add(item, (state.cx[i], state.cy[i], state.cz[i]), state.rot[i], wall_contact_side)
+        reserve_zones(placed, index, item.rules, room)
+
+    heights = HeightField(room)
+    heights.rebuild(placed)
+    for unit in stacked:
+        if not place_unit(room, placed, unit, heights=heights, deadline=stop):
+            return None
+
+    return placed
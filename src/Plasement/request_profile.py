@@ -0,0 +1,159 @@
+import cProfile
+import hashlib
+import json
+import os
+import pstats
+import random
+import time
+import tracemalloc
+from contextlib import nullcontext
+from typing import Optional
+
+import numpy as np
+
+
+# ============================================================
+# НАСТРОЙКИ
+# ============================================================
+
+PROFILE_ENV = "PLACEMENT_PROFILE"   # 1 — профилировать каждый запрос без флага
+PROFILE_DIR = "src/data/output/profiles"
+TOP_ALLOCATIONS = 30                # строк в отчёте tracemalloc
+TRACE_FRAMES = 8                    # глубина стека на выделение (для отчёта по traceback)
+TOP_FUNCTIONS = 40                  # строк cumtime в текстовой сводке cProfile
+
+
+# ============================================================
+# МЕТКА ЗАПРОСА
+# ============================================================
+
+def input_hash(room, data: dict) -> str:
+    """Хэш входа запроса: границы комнаты + предметы/проёмы (канонический JSON)."""
+    payload = json.dumps({"room": vars(room), "data": data}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def profiling_requested(flag: bool = False) -> bool:
+    """Профиль включён флагом запроса или переменной окружения PLACEMENT_PROFILE."""
+    return flag or os.environ.get(PROFILE_ENV, "").strip() not in ("", "0")
+
+
+# ============================================================
+# ПРОФИЛЬ ОДНОГО ЗАПРОСА
+# ============================================================
+
+class RequestProfile:
+    """
+    cProfile и tracemalloc на время одного запроса:
+
+        with RequestProfile(out_dir, room, data, seed, run={"mode": "place_anytime", "budget_s": 2}) as prof:
+            result = place_anytime(...)
+        result["profile"] = prof.files
+
+    run — как запускали: mode (run_placement / place_anytime) и его
+    параметры (budget_s, attempts). floor_mask, mask_step — маска пола
+    комнаты плана. Без сида он выбирается здесь и ставится в random на
+    входе, иначе выброс не повторить.
+
+    По выходе в out_dir пишутся файлы с общим префиксом
+    profile_seed<seed>_<input_hash>:
+      .prof        — статистика cProfile (pstats, snakeviz)
+      .txt         — сводка: время, пик памяти, топ функций по cumtime
+                     и топ выделений tracemalloc по строкам и по стекам
+      .input.json  — room, data, маска пола, сид и run: по нему выброс
+                     воспроизводится офлайн (python src/Plasement --replay)
+    Профиль пишется и когда запрос упал — исключение не глотается.
+    """
+
+    __slots__ = (
+        "out_dir", "room", "data", "seed", "seeded", "run", "floor_mask", "mask_step",
+        "tag", "files", "_profiler", "_started", "_owns_trace",
+    )
+
+    def __init__(
+        self,
+        out_dir: str,
+        room,
+        data: dict,
+        seed: Optional[int],
+        run: Optional[dict] = None,
+        floor_mask: Optional[np.ndarray] = None,
+        mask_step: Optional[float] = None,
+    ):
+        self.out_dir = out_dir
+        self.room = room
+        self.data = data
+        # сид задан — генератор уже засеян вызывающим; иначе свой, записанный в профиль
+        self.seeded = seed is None
+        self.seed = random.randrange(2 ** 31) if seed is None else seed
+        self.run = dict(run or {})
+        self.floor_mask = floor_mask
+        self.mask_step = mask_step
+        self.tag = f"profile_seed{self.seed}_{input_hash(room, data)}"
+        self.files: dict = {}
+        self._profiler = cProfile.Profile()
+        self._started = 0.0
+        self._owns_trace = False
+
+    def __enter__(self) -> "RequestProfile":
+        if self.seeded:
+            random.seed(self.seed)
+        # трассировку уже включил кто-то снаружи — не выключаем её за ним
+        self._owns_trace = not tracemalloc.is_tracing()
+        if self._owns_trace:
+            tracemalloc.start(TRACE_FRAMES)
+        tracemalloc.reset_peak()
+        self._started = time.perf_counter()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profiler.disable()
+        elapsed = time.perf_counter() - self._started
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        if self._owns_trace:
+            tracemalloc.stop()
+
+        self.files = self._write(elapsed, peak, snapshot, failed=exc_type is not None)
+        print(f"⏱️ Профиль запроса: {self.files['stats']} ({elapsed:.2f} с, пик {peak / 2**20:.1f} МБ)")
+        return False
+
+    def _write(self, elapsed: float, peak: int, snapshot, failed: bool) -> dict:
+        os.makedirs(self.out_dir, exist_ok=True)
+        base = os.path.join(self.out_dir, self.tag)
+        files = {"stats": base + ".prof", "report": base + ".txt", "input": base + ".input.json"}
+
+        self._profiler.dump_stats(files["stats"])
+
+        replay = {"seed": self.seed, "run": self.run, "room": vars(self.room), "data": self.data}
+        if self.floor_mask is not None:
+            replay["floor_mask"] = {"step": self.mask_step, "cells": np.asarray(self.floor_mask, dtype=int).tolist()}
+        with open(files["input"], "w", encoding="utf-8") as f:
+            json.dump(replay, f, indent=2, ensure_ascii=False)
+
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        with open(files["report"], "w", encoding="utf-8") as f:
+            f.write(f"tag: {self.tag}\nseed: {self.seed}\nrun: {json.dumps(self.run)}\n")
+            f.write(f"elapsed_s: {elapsed:.3f}\npeak_mb: {peak / 2**20:.2f}\nfailed: {failed}\n")
+
+            f.write(f"\n=== cProfile: топ {TOP_FUNCTIONS} по cumtime ===\n")
+            pstats.Stats(self._profiler, stream=f).sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+
+            f.write(f"=== tracemalloc: топ {TOP_ALLOCATIONS} живых выделений по строкам ===\n")
+            for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+                f.write(f"{stat}\n")
+
+            f.write(f"\n=== tracemalloc: топ {TOP_ALLOCATIONS // 3} по стекам ===\n")
+            for stat in snapshot.statistics("traceback")[:TOP_ALLOCATIONS // 3]:
+                f.write(f"\n{stat.size / 1024:.1f} КиБ в {stat.count} блоках\n")
+                f.writelines(f"  {line}\n" for line in stat.traceback.format())
+        return files
+
+
+def request_profile(enabled: bool, out_dir: str, room, data: dict, seed: Optional[int], **kwargs):
+    """RequestProfile, если профиль включён, иначе пустой контекст (files нет)."""
+    return RequestProfile(out_dir, room, data, seed, **kwargs) if enabled else nullcontext()
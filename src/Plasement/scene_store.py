@@ -0,0 +1,339 @@
+import math
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from obb import obb_axes
+
+
+# Порядок колонок в массиве AABB (совпадает с ключами словаря aabb()).
+AABB_KEYS = ("x_min", "x_max", "y_min", "y_max", "z_min", "z_max")
+
+
+# ============================================================
+# ЗОНЫ, КОТОРЫЕ ДОЛЖНЫ ОСТАТЬСЯ СВОБОДНЫМИ
+# ============================================================
+
+class ZoneSet:
+    """
+    Зарезервированные объёмы (free_side, свободное место под/над
+    предметом): повёрнутый прямоугольник в XY + диапазон высот.
+    owner — индекс предмета в SceneStore, которому принадлежит зона.
+    """
+
+    __slots__ = ("centers", "sizes", "angles", "z", "owners", "count")
+
+    def __init__(self, capacity: int = 16):
+        capacity = max(1, capacity)
+        self.centers = np.empty((capacity, 2))
+        self.sizes = np.empty((capacity, 2))
+        self.angles = np.empty(capacity)
+        self.z = np.empty((capacity, 2))
+        self.owners = np.empty(capacity, dtype=int)
+        self.count = 0
+
+    def add(self, owner: int, center, size, angle_deg: float, z0: float, z1: float):
+        if self.count == len(self.angles):
+            capacity = self.count * 2
+            for name in ("centers", "sizes", "angles", "z", "owners"):
+                old = getattr(self, name)
+                new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+                new[: self.count] = old[: self.count]
+                setattr(self, name, new)
+
+        i = self.count
+        self.centers[i] = center
+        self.sizes[i] = size
+        self.angles[i] = angle_deg
+        self.z[i] = (z0, z1)
+        self.owners[i] = owner
+        self.count += 1
+
+    def remove_owner(self, owner: int, shift: bool = True):
+        """
+        Удаляет зоны предмета owner и (shift=True) сдвигает индексы
+        следующих предметов — как после SceneStore.remove.
+        """
+        n = self.count
+        keep = self.owners[:n] != owner
+        m = int(keep.sum())
+        for name in ("centers", "sizes", "angles", "z", "owners"):
+            arr = getattr(self, name)
+            arr[:m] = arr[:n][keep]
+        if shift:
+            self.owners[:m][self.owners[:m] > owner] -= 1
+        self.count = m
+
+    def copy(self) -> "ZoneSet":
+        other = ZoneSet(capacity=max(1, self.count))
+        n = self.count
+        for name in ("centers", "sizes", "angles", "z", "owners"):
+            getattr(other, name)[:n] = getattr(self, name)[:n]
+        other.count = n
+        return other
+
+    def clear(self):
+        self.count = 0
+
+
+# ============================================================
+# ХРАНИЛИЩЕ СЦЕНЫ (STRUCT OF ARRAYS)
+# ============================================================
+
+class SceneStore:
+    """
+    Все размещённые предметы сцены в непрерывных массивах:
+      centers   (N, 3) — центр AABB
+      sizes     (N, 3) — размер предмета в его локальных осях (sx, sy, sz)
+      rotations (N,)   — поворот вокруг Z в градусах
+      aabbs     (N, 6) — закэшированный AABB в мировых осях (см. AABB_KEYS)
+      zones              — зарезервированные свободные зоны предметов (ZoneSet)
+      clearance          — необязательный растр занятости с таблицей сумм
+                           (clearance.ClearanceMap), ведётся вместе со сценой
+      keepout   (K, 6)   — статические запретные объёмы комнаты (двери, окна,
+                           радиаторы; shared_room.StaticRoom.keepout) или None.
+                           Общие для всех копий и не сбрасываются clear()
+      rejects            — необязательная тепловая карта отклонённых кандидатов
+                           (debug_raster.RejectMap) для отладочных снимков;
+                           не копируется и не сбрасывается clear()
+
+    Объекты-представления PlacedItem создаются только по запросу
+    (итерация, view(i)) и хранят лишь ссылку на хранилище и индекс.
+    """
+
+    __slots__ = (
+        "centers", "sizes", "rotations", "aabbs", "items", "wall_sides", "zones", "clearance", "keepout", "rejects",
+        "count",
+    )
+
+    def __init__(self, capacity: int = 16, clearance=None, keepout=None, rejects=None):
+        capacity = max(1, capacity)
+        self.centers = np.empty((capacity, 3))
+        self.sizes = np.empty((capacity, 3))
+        self.rotations = np.empty(capacity)
+        self.aabbs = np.empty((capacity, 6))
+        self.items: List = []
+        self.wall_sides: List[Optional[str]] = []
+        self.zones = ZoneSet()
+        self.clearance = clearance
+        self.keepout = keepout
+        self.rejects = rejects
+        self.count = 0
+
+    # ---------- изменение ----------
+
+    def _grow(self):
+        capacity = len(self.rotations) * 2
+        for name in ("centers", "sizes", "rotations", "aabbs"):
+            old = getattr(self, name)
+            new = np.empty((capacity,) + old.shape[1:])
+            new[: self.count] = old[: self.count]
+            setattr(self, name, new)
+
+    def add(
+        self,
+        item,
+        center: Tuple[float, float, float],
+        rotation_deg: float,
+        wall_contact_side: Optional[str] = None,
+    ) -> int:
+        if self.count == len(self.rotations):
+            self._grow()
+
+        i = self.count
+        self.sizes[i] = (item.sx, item.sy, item.sz)
+        self.items.append(item)
+        self.wall_sides.append(wall_contact_side)
+        self.count += 1
+
+        self._set_pose(i, center, rotation_deg)
+        if self.clearance is not None:
+            self.clearance.add_item(self, i)
+        return i
+
+    def _set_pose(self, i: int, center: Tuple[float, float, float], rotation_deg: float):
+        cx, cy, cz = center
+        sx, sy, sz = self.sizes[i].tolist()
+
+        a = math.radians(rotation_deg)
+        cos_a = abs(math.cos(a))
+        sin_a = abs(math.sin(a))
+        hx = (sx * cos_a + sy * sin_a) / 2
+        hy = (sx * sin_a + sy * cos_a) / 2
+
+        self.centers[i] = center
+        self.rotations[i] = rotation_deg
+        self.aabbs[i] = (cx - hx, cx + hx, cy - hy, cy + hy, cz - sz / 2, cz + sz / 2)
+
+    def move(
+        self,
+        index: int,
+        center: Tuple[float, float, float],
+        rotation_deg: float,
+        wall_contact_side: Optional[str] = None,
+    ):
+        """
+        Переставляет предмет, не меняя его индекс. Зоны предмета снимаются —
+        их заново резервирует вызывающий (constraints.reserve_zones).
+        """
+        if self.clearance is not None:
+            self.clearance.add_item(self, index, sign=-1)
+
+        self._set_pose(index, center, rotation_deg)
+        self.wall_sides[index] = wall_contact_side
+        self.zones.remove_owner(index, shift=False)
+
+        if self.clearance is not None:
+            self.clearance.add_item(self, index)
+
+    def remove(self, index: int):
+        """Удаляет предмет, сдвигая хвост (порядок предметов сохраняется)."""
+        if self.clearance is not None:
+            self.clearance.add_item(self, index, sign=-1)
+
+        n = self.count
+        for arr in (self.centers, self.sizes, self.rotations, self.aabbs):
+            arr[index: n - 1] = arr[index + 1: n]
+        del self.items[index]
+        del self.wall_sides[index]
+        self.zones.remove_owner(index)
+        self.count -= 1
+
+    def copy(self) -> "SceneStore":
+        other = SceneStore(capacity=max(1, self.count), keepout=self.keepout)
+        n = self.count
+        other.centers[:n] = self.centers[:n]
+        other.sizes[:n] = self.sizes[:n]
+        other.rotations[:n] = self.rotations[:n]
+        other.aabbs[:n] = self.aabbs[:n]
+        other.items = list(self.items)
+        other.wall_sides = list(self.wall_sides)
+        other.zones = self.zones.copy()
+        other.clearance = None if self.clearance is None else self.clearance.copy()
+        other.count = n
+        return other
+
+    def clear(self):
+        """Сброс без освобождения памяти — для повторных попыток расстановки."""
+        self.items.clear()
+        self.wall_sides.clear()
+        self.zones.clear()
+        if self.clearance is not None:
+            self.clearance.clear()
+        self.count = 0
+
+    # ---------- запросы ----------
+
+    def overlapping(self, box) -> np.ndarray:
+        """
+        Индексы предметов, чей AABB пересекается с box
+        (x_min, x_max, y_min, y_max, z_min, z_max). Касание — не пересечение.
+        """
+        a = self.aabbs[: self.count]
+        hit = (
+            (a[:, 0] < box[1]) & (a[:, 1] > box[0]) &
+            (a[:, 2] < box[3]) & (a[:, 3] > box[2]) &
+            (a[:, 4] < box[5]) & (a[:, 5] > box[4])
+        )
+        return np.flatnonzero(hit)
+
+    def view(self, index: int) -> "PlacedItem":
+        return PlacedItem(self, index)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator["PlacedItem"]:
+        for i in range(self.count):
+            yield PlacedItem(self, i)
+
+    def __getitem__(self, index: int) -> "PlacedItem":
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return PlacedItem(self, index)
+
+
+# ============================================================
+# ПРЕДСТАВЛЕНИЕ ОДНОГО ПРЕДМЕТА
+# ============================================================
+
+class PlacedItem:
+    """
+    Лёгкое представление i-го предмета SceneStore с прежним интерфейсом
+    (item, cx/cy/cz, rotation, aabb(), local_sides(), ...).
+    """
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, store: SceneStore, index: int):
+        self.store = store
+        self.index = index
+
+    @property
+    def item(self):
+        return self.store.items[self.index]
+
+    @property
+    def cx(self) -> float:
+        return float(self.store.centers[self.index, 0])
+
+    @property
+    def cy(self) -> float:
+        return float(self.store.centers[self.index, 1])
+
+    @property
+    def cz(self) -> float:
+        return float(self.store.centers[self.index, 2])
+
+    @property
+    def rotation(self) -> float:
+        return float(self.store.rotations[self.index])
+
+    @property
+    def wall_contact_side(self) -> Optional[str]:
+        return self.store.wall_sides[self.index]
+
+    @property
+    def rx(self) -> float:
+        box = self.store.aabbs[self.index]
+        return float(box[1] - box[0])
+
+    @property
+    def ry(self) -> float:
+        box = self.store.aabbs[self.index]
+        return float(box[3] - box[2])
+
+    # ---------- геометрия ----------
+
+    def aabb(self) -> dict:
+        return dict(zip(AABB_KEYS, self.store.aabbs[self.index].tolist()))
+
+    def forward_vector(self) -> Tuple[float, float, float]:
+        """
+        Направление "вперёд" предмета в мировых координатах.
+        По соглашению: локальная ось +Y.
+        """
+        _, (fx, fy) = obb_axes(self.rotation)
+        return fx, fy, 0.0
+
+    def local_sides(self) -> dict:
+        """
+        Центры каждой стороны (front/back/left/right/top/bottom)
+        в мировых координатах — по ориентированному прямоугольнику,
+        а не по AABB: front/back на расстоянии sy/2 вдоль "вперёд",
+        right/left на расстоянии sx/2 вдоль локальной +X.
+        """
+        cx, cy, cz = self.store.centers[self.index].tolist()
+        sx, sy, sz = self.store.sizes[self.index].tolist()
+        (rx, ry), (fx, fy) = obb_axes(self.rotation)
+
+        return {
+            "front": (cx + fx * sy / 2, cy + fy * sy / 2, cz),
+            "back":  (cx - fx * sy / 2, cy - fy * sy / 2, cz),
+            "right": (cx + rx * sx / 2, cy + ry * sx / 2, cz),
+            "left":  (cx - rx * sx / 2, cy - ry * sx / 2, cz),
+            "top":   (cx, cy, cz + sz / 2),
+            "bottom": (cx, cy, cz - sz / 2),
+        }
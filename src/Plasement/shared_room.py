@@ -0,0 +1,307 @@
+import math
+from collections import OrderedDict
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from clearance import CLEARANCE_STEP
+from glb_parser import Room
+from openings import entry_points, keepout_boxes, load_openings, obstacle_boxes
+from pathfinding_astar import GRID_STEP, HUMAN_SIZE, build_walk_grid, start_cell_for
+
+
+# ============================================================
+# СТАТИЧЕСКИЕ СЛОИ КОМНАТЫ
+# ============================================================
+# Всё, что зависит только от комнаты и не меняется между запросами:
+#   bounds    (6,)          — x_min, x_max, y_min, y_max, z_min, z_max
+#   walk      (nx, ny) bool — пустая проходимая сетка build_walk_grid
+#                             (клетки, где человек задевает край пола
+#                             или радиатор, закрыты)
+#   clearance (nx+1, ny+1)  — таблица сумм растра занятости ClearanceMap
+#                             без предметов (вне пола — занято)
+#   keepout   (K, 6)        — запретные для мебели объёмы: зоны открывания
+#                             дверей, полосы перед окнами и радиаторами (openings.py),
+#                             а у непрямоугольной комнаты ещё и всё, что вне пола
+#   entries   (E, 2) int    — клетки сетки прохода, откуда входит человек
+#                             (перед каждой дверью; без дверей — середина нижней стены)
+#   floor     (mx, my) bool — маска пола, если комната не прямоугольная
+# Сервис считает их один раз и кладёт в shared_memory; воркеры
+# подключаются к блокам как к numpy-массивам только для чтения.
+# Динамический слой — мебель одной попытки: SceneStore со своим
+# ClearanceMap, сетка прохода на копии walk; сброс попытки (clear)
+# возвращает их к статическому слою.
+
+LAYERS = ("bounds", "walk", "clearance", "keepout", "entries", "floor")
+
+
+def _cell_centers(origin: float, n: int, step: float) -> np.ndarray:
+    return origin + (np.arange(n) + 0.5) * step
+
+
+def _on_floor(room: Room, floor_mask: Optional[np.ndarray], mask_step: float, xs, ys) -> np.ndarray:
+    """Лежат ли точки сетки xs x ys на полу (без маски — весь AABB комнаты)."""
+    inside = (
+        ((xs >= room.x_min) & (xs <= room.x_max))[:, None] &
+        ((ys >= room.y_min) & (ys <= room.y_max))[None, :]
+    )
+    if floor_mask is None:
+        return inside
+
+    mx, my = floor_mask.shape
+    ix = np.floor((xs - room.x_min) / mask_step).astype(int)
+    iy = np.floor((ys - room.y_min) / mask_step).astype(int)
+    ok_x, ok_y = (ix >= 0) & (ix < mx), (iy >= 0) & (iy < my)
+    floor = np.zeros((len(xs), len(ys)), dtype=bool)
+    floor[np.ix_(ok_x, ok_y)] = floor_mask[np.ix_(ix[ok_x], iy[ok_y])]
+    return inside & floor
+
+
+def _off_floor_boxes(room: Room, floor_mask: np.ndarray, mask_step: float) -> np.ndarray:
+    """
+    Часть AABB комнаты вне маски пола — объёмами (K, 6) во всю высоту:
+    полосы подряд идущих клеток вне пола по y, слитые между соседними
+    столбцами x с той же полосой. Для комнат из прямых стен их немного.
+    """
+    nx = max(1, int(math.ceil((room.x_max - room.x_min) / mask_step - 1e-9)))
+    ny = max(1, int(math.ceil((room.y_max - room.y_min) / mask_step - 1e-9)))
+    off = np.ones((nx, ny), dtype=bool)
+    mx, my = min(nx, floor_mask.shape[0]), min(ny, floor_mask.shape[1])
+    off[:mx, :my] = ~floor_mask[:mx, :my]
+
+    def runs(column: np.ndarray) -> List[Tuple[int, int]]:
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], column.astype(np.int8), [0]))))
+        return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+
+    boxes = []
+    open_runs: Dict[Tuple[int, int], int] = {}      # полоса (j0, j1) -> столбец, где началась
+    for i in range(nx + 1):
+        current = set(runs(off[i])) if i < nx else set()
+        for run in [r for r in open_runs if r not in current]:
+            boxes.append((open_runs.pop(run), i, *run))
+        for run in current:
+            open_runs.setdefault(run, i)
+
+    return np.array([
+        (
+            room.x_min + i0 * mask_step, min(room.x_max, room.x_min + i1 * mask_step),
+            room.y_min + j0 * mask_step, min(room.y_max, room.y_min + j1 * mask_step),
+            room.z_min, room.z_max,
+        )
+        for i0, i1, j0, j1 in boxes
+    ], dtype=float).reshape(-1, 6)
+
+
+def _window_any(mask: np.ndarray, rx: int, ry: int) -> np.ndarray:
+    """True там, где в окне ±rx x ±ry клеток есть хоть одна True (через таблицу сумм)."""
+    nx, ny = mask.shape
+    sat = np.zeros((nx + 1, ny + 1), dtype=np.int32)
+    sat[1:, 1:] = mask.cumsum(axis=0).cumsum(axis=1)
+    x0 = np.clip(np.arange(nx) - rx, 0, nx)
+    x1 = np.clip(np.arange(nx) + rx + 1, 0, nx)
+    y0 = np.clip(np.arange(ny) - ry, 0, ny)
+    y1 = np.clip(np.arange(ny) + ry + 1, 0, ny)
+    total = sat[np.ix_(x1, y1)] - sat[np.ix_(x0, y1)] - sat[np.ix_(x1, y0)] + sat[np.ix_(x0, y0)]
+    return total > 0
+
+
+def static_layers(
+    room: Room,
+    floor_mask: Optional[np.ndarray] = None,
+    mask_step: float = GRID_STEP,
+    openings: Optional[Sequence[dict]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Считает статические слои комнаты (см. LAYERS). floor_mask — маска
+    пола в клетках mask_step от (x_min, y_min) (svg_plan.PlanRoom);
+    None — пол занимает весь AABB. openings — двери, окна и радиаторы
+    в формате openings.py.
+    """
+    parsed = load_openings(openings)
+
+    # --- сетка прохода: те же nx, ny, что в build_walk_grid ---
+    nx = int((room.x_max - room.x_min) / GRID_STEP) + 1
+    ny = int((room.y_max - room.y_min) / GRID_STEP) + 1
+    off = ~_on_floor(
+        room, floor_mask, mask_step,
+        _cell_centers(room.x_min, nx, GRID_STEP), _cell_centers(room.y_min, ny, GRID_STEP),
+    )
+    if floor_mask is None:
+        # прямоугольный пол: сетка открыта целиком, как в build_walk_grid
+        walk = np.ones((nx, ny), dtype=bool)
+    else:
+        rx = int(math.ceil(HUMAN_SIZE[0] / 2 / GRID_STEP))
+        ry = int(math.ceil(HUMAN_SIZE[1] / 2 / GRID_STEP))
+        walk = ~_window_any(off, rx, ry)
+
+    obstacles = obstacle_boxes(room, parsed)
+    if len(obstacles):
+        walk = build_walk_grid(vars(room), obstacles, base=walk)[0]
+
+    # те же клетки, что у world_to_grid из build_walk_grid
+    entries = np.array([
+        (int((x - room.x_min) / GRID_STEP), int((y - room.y_min) / GRID_STEP))
+        for x, y in entry_points(room, parsed)
+    ], dtype=np.int64)
+
+    # --- растр занятости: те же nx, ny, что в ClearanceMap ---
+    cx = max(1, int(math.ceil(room.width / CLEARANCE_STEP)))
+    cy = max(1, int(math.ceil(room.depth / CLEARANCE_STEP)))
+    clearance = np.zeros((cx + 1, cy + 1), dtype=np.int32)
+    if floor_mask is not None:
+        blocked = ~_on_floor(
+            room, floor_mask, mask_step,
+            _cell_centers(room.x_min, cx, CLEARANCE_STEP), _cell_centers(room.y_min, cy, CLEARANCE_STEP),
+        )
+        clearance[1:, 1:] = blocked.cumsum(axis=0).cumsum(axis=1)
+
+    # вне пола мебель не ставится так же, как в зону открывания двери
+    keepout = keepout_boxes(room, parsed)
+    if floor_mask is not None:
+        keepout = np.vstack((keepout, _off_floor_boxes(room, floor_mask, mask_step)))
+
+    layers = {
+        "bounds": np.array([room.x_min, room.x_max, room.y_min, room.y_max, room.z_min, room.z_max]),
+        "walk": walk,
+        "clearance": clearance,
+        "keepout": keepout,
+        "entries": entries,
+    }
+    if floor_mask is not None:
+        layers["floor"] = np.ascontiguousarray(floor_mask, dtype=bool)
+    return layers
+
+
+class StaticRoom:
+    """
+    Комната вместе с её статическими слоями. Массивы могут быть
+    представлениями shared_memory — их не меняют: build_walk_grid и
+    ClearanceMap копируют их как основу для своей сцены.
+    """
+
+    __slots__ = ("room", "walk", "clearance", "keepout", "entries", "floor_mask")
+
+    def __init__(self, layers: Dict[str, np.ndarray]):
+        self.room = Room(*layers["bounds"].tolist())
+        self.walk = layers["walk"]
+        self.clearance = layers["clearance"]
+        self.keepout = layers["keepout"]
+        self.entries = layers["entries"]
+        self.floor_mask = layers.get("floor")
+
+    @classmethod
+    def build(
+        cls,
+        room: Room,
+        floor_mask: Optional[np.ndarray] = None,
+        mask_step: float = GRID_STEP,
+        openings: Optional[Sequence[dict]] = None,
+    ) -> "StaticRoom":
+        """Слои в памяти процесса — для запуска без воркеров."""
+        return cls(static_layers(room, floor_mask, mask_step, openings))
+
+
+def entry_sources(room: Room, world_to_grid, static: Optional[StaticRoom] = None) -> List[Tuple[int, int]]:
+    """Клетки входа для заливки достижимости: из статического слоя или середина нижней стены."""
+    if static is None:
+        return [start_cell_for(vars(room), world_to_grid)]
+    return [tuple(cell) for cell in static.entries.tolist()]
+
+
+# ============================================================
+# ПУБЛИКАЦИЯ В SHARED MEMORY (ПРОЦЕСС СЕРВИСА)
+# ============================================================
+
+class SharedRoom:
+    """
+    Статические слои одной комнаты в блоках shared_memory. Владелец —
+    процесс сервиса: он создаёт блоки (publish) и освобождает их (close).
+    Воркерам передаётся только handle — имена блоков, формы и dtype,
+    а не сами массивы.
+    """
+
+    __slots__ = ("key", "blocks", "handle")
+
+    def __init__(self, key: str, layers: Dict[str, np.ndarray]):
+        self.key = key
+        self.blocks = []
+        self.handle = {"key": key, "layers": {}}
+
+        try:
+            for name, array in layers.items():
+                shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+                self.blocks.append(shm)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+                self.handle["layers"][name] = (shm.name, array.shape, array.dtype.str)
+        except Exception:
+            self.close()
+            raise
+
+    @classmethod
+    def publish(
+        cls,
+        key: str,
+        room: Room,
+        floor_mask: Optional[np.ndarray] = None,
+        mask_step: float = GRID_STEP,
+        openings: Optional[Sequence[dict]] = None,
+    ) -> "SharedRoom":
+        return cls(key, static_layers(room, floor_mask, mask_step, openings))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(shm.size for shm in self.blocks)
+
+    def close(self):
+        for shm in self.blocks:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self.blocks = []
+
+
+# ============================================================
+# ПОДКЛЮЧЕНИЕ (ПРОЦЕСС ВОРКЕРА)
+# ============================================================
+
+SHARED_ROOMS_MAX = 16    # наборов слоёв в shared memory у сервиса и подключений у воркера
+
+# key -> (StaticRoom, открытые блоки): подключаемся к комнате один раз на процесс,
+# давние подключения сверх SHARED_ROOMS_MAX закрываются (сервис их уже мог выгрузить)
+_ATTACHED: "OrderedDict[str, tuple]" = OrderedDict()
+
+
+def attach(handle: dict) -> StaticRoom:
+    """
+    StaticRoom по handle из SharedRoom: массивы смотрят прямо в блоки
+    shared_memory (без копирования) и помечены только для чтения.
+    """
+    key = handle["key"]
+    cached = _ATTACHED.get(key)
+    if cached is not None:
+        _ATTACHED.move_to_end(key)
+        return cached[0]
+
+    while len(_ATTACHED) >= SHARED_ROOMS_MAX:
+        _, (_, old_blocks) = _ATTACHED.popitem(last=False)
+        for shm in old_blocks:
+            try:
+                shm.close()
+            except BufferError:
+                # на блок ещё смотрит живой массив — отображение уйдёт вместе с ним
+                pass
+
+    blocks, layers = [], {}
+    for name, (shm_name, shape, dtype) in handle["layers"].items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        blocks.append(shm)
+        array = np.ndarray(tuple(shape), dtype=np.dtype(dtype), buffer=shm.buf)
+        array.flags.writeable = False
+        layers[name] = array
+
+    static = StaticRoom(layers)
+    _ATTACHED[key] = (static, blocks)
+    return static
@@ -0,0 +1,416 @@
+import hashlib
+import os
+import re
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from glb_parser import Room
+
+
+# ============================================================
+# НАСТРОЙКИ
+# ============================================================
+
+# кэш рядом с данными пакета (src/data/cache), от какого бы каталога ни шёл запуск
+PLAN_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "cache")
+PLAN_STEP_M = 0.02            # сторона клетки растра заливки (линии на плане ~3 см)
+ROOM_POOL = 3                 # клеток заливки в клетке растра комнат (0.06 м)
+PLAN_WALL_HEIGHT_M = 2.8      # высота выдавливания (как у room.glb)
+MIN_WALL_M = 0.5              # прямой отрезок контура короче — не стена
+DOOR_GAP_M = 0.5              # разрывы линий уже этого (дверные дуги) закрываются при разметке комнат
+ROOM_MIN_AREA_M2 = 2.0        # меньше — буквы, стрелки, промежутки внутри стен
+ROOM_MIN_SIDE_M = 1.0         # узкие полосы между линиями двойной стены — не комнаты
+
+_TOKEN = re.compile(r"[MmLlHhVvCcSsQqTtAaZz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_ARGS = {"M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "A": 7, "Z": 0}
+_TRANSFORM = re.compile(r"(translate|scale|matrix)\(([^)]*)\)")
+
+# кэш в памяти процесса: ключ — хэш файла + параметры
+_LOADED: Dict[str, "Plan"] = {}
+
+
+# ============================================================
+# РАЗБОР PATH DATA
+# ============================================================
+
+def tokenize(d: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Токены path data одним проходом регулярного выражения, числа
+    переводятся в float одним вызовом numpy. Возвращает
+    (команды, позиции команд в потоке токенов, все числа).
+    """
+    tokens = np.array(_TOKEN.findall(d))
+    if tokens.size == 0:
+        return np.array([], dtype=str), np.array([], dtype=int), np.array([])
+
+    is_cmd = np.char.isalpha(tokens)
+    numbers = tokens[~is_cmd].astype(float)
+    # позиция команды = сколько чисел было до неё
+    starts = np.cumsum(~is_cmd)[is_cmd] - (~is_cmd)[is_cmd]
+    return tokens[is_cmd], starts, numbers
+
+
+def parse_path(d: str) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Контуры path: [(вершины (N, 2), straight (N,))], straight[i] — ребро
+    из вершины i в i+1 (по кругу) — прямой отрезок, а не кривая.
+    Кривые заменяются хордами (для стен и заливки хватает концов):
+    концы всех повторов одной команды считаются сразу, cumsum'ом.
+    """
+    cmds, starts, numbers = tokenize(d)
+    ends = np.append(starts[1:], numbers.size)
+
+    contours = []
+    points: List[np.ndarray] = []
+    straight: List[np.ndarray] = []
+    cur = np.zeros(2)
+    start = np.zeros(2)
+
+    def close():
+        if points:
+            pts = np.vstack(points)
+            flags = np.concatenate(straight)
+            if len(pts) > 2:
+                contours.append((pts, np.append(flags[1:], True)))
+        points.clear()
+        straight.clear()
+
+    for cmd, a, b in zip(cmds.tolist(), starts.tolist(), ends.tolist()):
+        upper = cmd.upper()
+        relative = cmd != upper
+        args = numbers[a:b]
+
+        if upper == "Z":
+            close()
+            cur = start.copy()
+            continue
+
+        n = _ARGS[upper]
+        args = args[: len(args) // n * n].reshape(-1, n)
+        if len(args) == 0:
+            continue
+
+        if upper == "H":
+            ends_xy = np.column_stack((args[:, 0], np.zeros(len(args)) if relative else np.full(len(args), cur[1])))
+        elif upper == "V":
+            ends_xy = np.column_stack((np.zeros(len(args)) if relative else np.full(len(args), cur[0]), args[:, 0]))
+        else:
+            ends_xy = args[:, -2:]
+
+        pts = cur + np.cumsum(ends_xy, axis=0) if relative else ends_xy.copy()
+        line = upper in ("M", "L", "H", "V")
+
+        if upper == "M":
+            close()
+            start = pts[0].copy()
+        points.append(pts)
+        straight.append(np.full(len(pts), line))
+        cur = pts[-1].copy()
+
+    close()
+    return contours
+
+
+def parse_transform(text: Optional[str]) -> np.ndarray:
+    """Атрибут transform -> аффинная матрица 3x3 (translate / scale / matrix)."""
+    m = np.eye(3)
+    for name, raw in _TRANSFORM.findall(text or ""):
+        v = [float(x) for x in re.split(r"[\s,]+", raw.strip()) if x]
+        t = np.eye(3)
+        if name == "translate":
+            t[0, 2], t[1, 2] = v[0], v[1] if len(v) > 1 else 0.0
+        elif name == "scale":
+            t[0, 0], t[1, 1] = v[0], v[1] if len(v) > 1 else v[0]
+        else:
+            t[:2, :] = np.array(v).reshape(3, 2).T
+        m = m @ t
+    return m
+
+
+def read_svg(path: str) -> Tuple[List[Tuple[np.ndarray, np.ndarray]], Tuple[float, float, float, float]]:
+    """Все контуры всех <path> в координатах viewBox и сам viewBox."""
+    root = ET.parse(path).getroot()
+    box = root.get("viewBox")
+    if box:
+        view = tuple(float(v) for v in re.split(r"[\s,]+", box.strip()))
+    else:
+        view = (0.0, 0.0, float(re.sub(r"[a-z]+$", "", root.get("width"))),
+                float(re.sub(r"[a-z]+$", "", root.get("height"))))
+
+    contours = []
+
+    def walk(node, m):
+        m = m @ parse_transform(node.get("transform"))
+        if node.tag.endswith("path") and node.get("d"):
+            for pts, flags in parse_path(node.get("d")):
+                xy = pts @ m[:2, :2].T + m[:2, 2]
+                contours.append((xy, flags))
+        for child in node:
+            walk(child, m)
+
+    walk(root, np.eye(3))
+    return contours, view
+
+
+# ============================================================
+# РАСТР
+# ============================================================
+
+def fill_evenodd(contours, x0: float, y0: float, step: float, nx: int, ny: int) -> np.ndarray:
+    """
+    Заливка контуров по правилу even-odd в растр (nx, ny), центры клеток.
+    Все рёбра сразу: для каждой пары (ребро, строка) — точка пересечения,
+    переключатель чётности в её столбце и cumsum по строке.
+    """
+    edges = np.vstack([np.hstack((pts, np.roll(pts, -1, axis=0))) for pts, _ in contours])
+    ax, ay, bx, by = edges.T
+
+    lo = np.ceil((np.minimum(ay, by) - y0) / step - 0.5).astype(int)
+    hi = np.ceil((np.maximum(ay, by) - y0) / step - 0.5).astype(int)   # строки [lo, hi)
+    lo, hi = np.clip(lo, 0, ny), np.clip(hi, 0, ny)
+    counts = hi - lo
+
+    e = np.repeat(np.arange(len(edges)), counts)
+    rows = np.repeat(lo, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+    yc = y0 + (rows + 0.5) * step
+    x = ax[e] + (yc - ay[e]) * (bx[e] - ax[e]) / (by[e] - ay[e])
+    cols = np.clip(np.ceil((x - x0) / step - 0.5).astype(int), 0, nx)
+
+    toggles = np.zeros((ny, nx + 1), dtype=np.int32)
+    np.add.at(toggles, (rows, cols), 1)
+    return (np.cumsum(toggles[:, :nx], axis=1) % 2 == 1).T
+
+
+def _open_hairlines(ink: np.ndarray) -> np.ndarray:
+    """
+    Морфологическое открытие квадратом 2x2: линии тоньше двух клеток
+    (штриховка, тонкие буквы) пропадают, стены остаются.
+    """
+    core = ink.copy()
+    core[:-1, :] &= ink[1:, :]
+    core[:, :-1] &= ink[:, 1:]
+    core[:-1, :-1] &= ink[1:, 1:]
+    core[-1, :] = False
+    core[:, -1] = False
+
+    opened = core.copy()
+    opened[1:, :] |= core[:-1, :]
+    opened[:, 1:] |= core[:, :-1]
+    opened[1:, 1:] |= core[:-1, :-1]
+    return opened
+
+
+def _grow(mask: np.ndarray) -> np.ndarray:
+    """Расширение на клетку (4-связность)."""
+    out = mask.copy()
+    out[1:, :] |= mask[:-1, :]
+    out[:-1, :] |= mask[1:, :]
+    out[:, 1:] |= mask[:, :-1]
+    out[:, :-1] |= mask[:, 1:]
+    return out
+
+
+def label_regions(free: np.ndarray) -> np.ndarray:
+    """Компоненты связности (4-связность) свободных клеток: метки 1..K, 0 — занято."""
+    labels = np.zeros(free.shape, dtype=np.int32)
+    todo = free.copy()
+    k = 0
+    while todo.any():
+        k += 1
+        seed = np.unravel_index(np.argmax(todo), todo.shape)
+        region = np.zeros_like(todo)
+        region[seed] = True
+        frontier = region.copy()
+        while frontier.any():
+            frontier = _grow(frontier) & todo & ~region
+            region |= frontier
+        labels[region] = k
+        todo &= ~region
+    return labels
+
+
+def _grow_labels(labels: np.ndarray, free: np.ndarray, steps: int) -> np.ndarray:
+    """
+    Метки расползаются на steps клеток (8-связность — углы комнат
+    восстанавливаются прямыми) по свободным клеткам без метки.
+    """
+    labels = labels.copy()
+    for _ in range(steps):
+        spread = labels.copy()
+        for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1)):
+            src = labels[max(-dx, 0): labels.shape[0] - max(dx, 0), max(-dy, 0): labels.shape[1] - max(dy, 0)]
+            dst = spread[max(dx, 0): labels.shape[0] - max(-dx, 0), max(dy, 0): labels.shape[1] - max(-dy, 0)]
+            np.maximum(dst, src, out=dst)
+        take = free & (labels == 0)
+        labels[take] = spread[take]
+    return labels
+
+
+# ============================================================
+# ПЛАН
+# ============================================================
+
+class PlanRoom:
+    """Комната плана: Room (AABB, выдавленный на высоту) и маска пола внутри него."""
+
+    __slots__ = ("room", "floor_mask", "area")
+
+    def __init__(self, room: Room, floor_mask: np.ndarray, area: float):
+        self.room = room
+        self.floor_mask = floor_mask
+        self.area = area
+
+
+class Plan:
+    """
+    Разобранный план этажа в метрах (x вправо, y вверх по плану):
+      walls     (K, 4) — прямые отрезки контуров длиннее MIN_WALL_M
+      ink       (nx, ny) — клетки, занятые линиями плана
+      labels    (nx, ny) — номер комнаты клетки (0 — не комната)
+      rooms     — PlanRoom для каждой метки (метка i -> rooms[i - 1])
+    """
+
+    __slots__ = ("x_min", "y_min", "step", "walls", "ink", "labels", "rooms")
+
+    def __init__(self, x_min, y_min, step, walls, ink, labels, height: float = PLAN_WALL_HEIGHT_M):
+        self.x_min, self.y_min, self.step = float(x_min), float(y_min), float(step)
+        self.walls = walls
+        self.ink = ink
+        self.labels = labels
+        self.rooms: List[PlanRoom] = []
+
+        for k in range(1, int(labels.max(initial=0)) + 1):
+            gx, gy = np.nonzero(labels == k)
+            x0, x1, y0, y1 = gx.min(), gx.max() + 1, gy.min(), gy.max() + 1
+            room = Room(
+                self.x_min + x0 * step, self.x_min + x1 * step,
+                self.y_min + y0 * step, self.y_min + y1 * step,
+                0.0, height,
+            )
+            mask = labels[x0:x1, y0:y1] == k
+            self.rooms.append(PlanRoom(room, mask, float(mask.sum()) * step * step))
+
+    def largest_room(self) -> PlanRoom:
+        return max(self.rooms, key=lambda r: r.area)
+
+
+def build_plan(
+    contours,
+    view: Tuple[float, float, float, float],
+    mm_per_unit: float,
+    step: float = PLAN_STEP_M,
+    height: float = PLAN_WALL_HEIGHT_M,
+) -> Plan:
+    """Контуры в единицах viewBox -> Plan в метрах."""
+    scale = mm_per_unit / 1000.0
+    vx, vy, vw, vh = view
+
+    # в метры; ось y плана в SVG смотрит вниз — переворачиваем
+    contours = [
+        (np.column_stack(((pts[:, 0] - vx) * scale, (vy + vh - pts[:, 1]) * scale)), flags)
+        for pts, flags in contours
+    ]
+
+    nx = max(1, int(np.ceil(vw * scale / step)))
+    ny = max(1, int(np.ceil(vh * scale / step)))
+    filled = fill_evenodd(contours, 0.0, 0.0, step, nx, ny)
+    # линии плана — меньшая по площади часть (potrace заливает фон или линии)
+    ink = _open_hairlines(filled if filled.mean() < 0.5 else ~filled)
+
+    # ---------- стены: длинные прямые рёбра контуров, лежащие на линиях ----------
+    near = _grow(ink)
+    segs = []
+    for pts, flags in contours:
+        a, b = pts, np.roll(pts, -1, axis=0)
+        keep = flags & (np.hypot(*(b - a).T) >= MIN_WALL_M)
+        for t in (0.25, 0.5, 0.75):
+            if not keep.any():
+                break
+            p = a + t * (b - a)
+            gx = np.clip((p[:, 0] / step).astype(int), 0, nx - 1)
+            gy = np.clip((p[:, 1] / step).astype(int), 0, ny - 1)
+            keep &= near[gx, gy]
+        segs.append(np.hstack((a[keep], b[keep])))
+    walls = np.vstack(segs) if segs else np.zeros((0, 4))
+
+    # ---------- комнаты на растре крупнее: ROOM_POOL x ROOM_POOL клеток ----------
+    f = ROOM_POOL
+    cx, cy = nx // f, ny // f
+    ink = ink[: cx * f, : cy * f].reshape(cx, f, cy, f).any(axis=(1, 3))
+    step *= f
+
+    # дверные проёмы закрываем расширением линий, потом комнаты отрастают обратно
+    seal = int(np.ceil(DOOR_GAP_M / 2 / step))
+    sealed = ink
+    for _ in range(seal):
+        sealed = _grow(sealed)
+    labels = label_regions(~sealed)
+
+    # области, касающиеся края листа, — улица, а не комнаты
+    border = np.unique(np.concatenate((labels[0], labels[-1], labels[:, 0], labels[:, -1])))
+    labels[np.isin(labels, border)] = 0
+    labels = _grow_labels(labels, ~ink, seal)
+
+    rooms = np.zeros_like(labels)
+    k = 0
+    for label in np.unique(labels[labels > 0]).tolist():
+        gx, gy = np.nonzero(labels == label)
+        w = (gx.max() - gx.min() + 1) * step
+        h = (gy.max() - gy.min() + 1) * step
+        if gx.size * step * step < ROOM_MIN_AREA_M2 or min(w, h) < ROOM_MIN_SIDE_M:
+            continue
+        k += 1
+        rooms[gx, gy] = k
+
+    return Plan(0.0, 0.0, step, walls, ink, rooms, height)
+
+
+# ============================================================
+# ЗАГРУЗКА С КЭШЕМ
+# ============================================================
+
+def file_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_plan(
+    path: str,
+    mm_per_unit: float,
+    step: float = PLAN_STEP_M,
+    height: float = PLAN_WALL_HEIGHT_M,
+    cache_dir: Optional[str] = PLAN_CACHE_DIR,
+) -> Plan:
+    """
+    План этажа из SVG. Результат кэшируется по хэшу содержимого файла
+    и параметрам: в памяти процесса и в cache_dir (.npz) — повторная
+    загрузка того же плана не разбирает path data заново.
+    mm_per_unit — сколько миллиметров в единице viewBox.
+    """
+    key = f"{file_hash(path)[:16]}_{mm_per_unit:g}_{step:g}_{height:g}"
+    if key in _LOADED:
+        return _LOADED[key]
+
+    cached = os.path.join(cache_dir, f"plan_{key}.npz") if cache_dir else None
+    if cached and os.path.exists(cached):
+        with np.load(cached) as z:
+            plan = Plan(z["origin"][0], z["origin"][1], float(z["step"]), z["walls"],
+                        z["ink"], z["labels"], height)
+    else:
+        print("Разбор SVG-плана:", path)
+        contours, view = read_svg(path)
+        plan = build_plan(contours, view, mm_per_unit, step, height)
+        if cached:
+            os.makedirs(cache_dir, exist_ok=True)
+            np.savez_compressed(
+                cached, origin=np.array([plan.x_min, plan.y_min]), step=plan.step,
+                walls=plan.walls, ink=plan.ink, labels=plan.labels,
+            )
+
+    _LOADED[key] = plan
+    return plan
@@ -0,0 +1,296 @@
+import bisect
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from constraints import (
+    BATCH_SIZE,
+    SIDE_NORMAL_DEG,
+    SIDES,
+    WALL_MARGIN,
+    WALL_NORMAL_DEG,
+    Candidates,
+    ItemRules,
+    footprint_extents,
+    half_extents,
+    make_rng,
+)
+from glb_parser import Room
+from pathfinding_astar import HUMAN_SIZE
+
+
+# ============================================================
+# СТЕНЫ КОМНАТЫ
+# ============================================================
+# Для каждой стены: ось вдоль стены (0 — X, 1 — Y), ось нормали
+# и направление внутрь комнаты (+1 / -1).
+
+WALL_AXES = {
+    "front": (0, 1, +1),   # y = y_min
+    "back":  (0, 1, -1),   # y = y_max
+    "left":  (1, 0, +1),   # x = x_min
+    "right": (1, 0, -1),   # x = x_max
+}
+
+Interval = Tuple[float, float]
+
+
+def _bounds(room: Room):
+    """Диапазоны комнаты по осям: [(x_min, x_max), (y_min, y_max)]."""
+    return [(room.x_min, room.x_max), (room.y_min, room.y_max)]
+
+
+def _wall_coord(room: Room, wall: str) -> float:
+    return {"front": room.y_min, "back": room.y_max, "left": room.x_min, "right": room.x_max}[wall]
+
+
+# ============================================================
+# ЗАНЯТЫЕ УЧАСТКИ ВДОЛЬ СТЕН
+# ============================================================
+
+class WallIntervals:
+    """
+    Занятые участки вдоль каждой из четырёх стен. Запись —
+    (начало, конец, отступ от стены, z0, z1): проекция AABB предмета
+    (или его свободной зоны) на стену и расстояние от стены до ближайшей
+    грани. Списки отсортированы по началу и пополняются по мере
+    расстановки (add_item), так что свободные участки для предмета любой
+    глубины получаются одним проходом без сэмплирования.
+
+    keepout — запретные зоны статического слоя (K, 6): зоны открывания
+    дверей, полосы перед окнами и радиаторами. Они занимают стены
+    с самого начала и переживают clear / rebuild.
+    """
+
+    __slots__ = ("room", "keepout", "occupied")
+
+    def __init__(self, room: Room, keepout: Optional[np.ndarray] = None):
+        self.room = room
+        self.keepout = np.zeros((0, 6)) if keepout is None else np.asarray(keepout, dtype=float).reshape(-1, 6)
+        self.occupied: Dict[str, List[Tuple[float, float, float, float, float]]] = {
+            wall: [] for wall in WALL_AXES
+        }
+        self.clear()
+
+    def clear(self):
+        """Пустая сцена: заняты только запретные зоны."""
+        for records in self.occupied.values():
+            records.clear()
+        for box in self.keepout.tolist():
+            self.add_box(box)
+
+    def add_box(self, box):
+        """box — (x_min, x_max, y_min, y_max, z_min, z_max)."""
+        room = self.room
+        depth = {
+            "front": box[2] - room.y_min,
+            "back": room.y_max - box[3],
+            "left": box[0] - room.x_min,
+            "right": room.x_max - box[1],
+        }
+        for wall, (along, _, _) in WALL_AXES.items():
+            a, b = box[2 * along], box[2 * along + 1]
+            bisect.insort(self.occupied[wall], (a, b, depth[wall], box[4], box[5]))
+
+    def add_item(self, store, index: int):
+        """Регистрирует предмет index сцены и его зарезервированные зоны."""
+        self.add_box(store.aabbs[index].tolist())
+
+        zones = store.zones
+        for z in np.flatnonzero(zones.owners[: zones.count] == index):
+            hx, hy = half_extents(zones.sizes[z], zones.angles[z])
+            cx, cy = zones.centers[z]
+            z0, z1 = zones.z[z]
+            self.add_box((cx - hx, cx + hx, cy - hy, cy + hy, z0, z1))
+
+    def rebuild(self, store):
+        """Заново по всей сцене — после удаления или переноса предмета."""
+        self.clear()
+        for i in range(store.count):
+            self.add_item(store, i)
+
+    def free(self, wall: str, lo: float, hi: float, depth: float, z0: float, z1: float) -> List[Interval]:
+        """
+        Свободные участки [lo, hi] вдоль стены для полосы глубиной depth
+        и высотой z0..z1: всё, что ближе depth к стене и пересекается
+        по высоте, вычитается.
+        """
+        result = []
+        cur = lo
+        for a, b, d, oz0, oz1 in self.occupied[wall]:
+            if a >= hi:
+                break
+            if d >= depth or oz1 <= z0 or oz0 >= z1 or b <= cur:
+                continue
+            if a > cur:
+                result.append((cur, a))
+            cur = max(cur, b)
+        if cur < hi:
+            result.append((cur, hi))
+        return result
+
+
+# ============================================================
+# СЛОТЫ ДЛЯ ПРЕДМЕТОВ У СТЕНЫ И В УГЛУ
+# ============================================================
+
+class WallSlot:
+    """
+    Допустимое положение у стены: поворот, координата центра поперёк
+    стены и отрезок допустимых координат центра вдоль неё
+    (для угла — точка, lo == hi). slack — на сколько предмет ещё может
+    вырасти вдоль стены, оставаясь в том же свободном участке.
+    """
+
+    __slots__ = ("wall", "rotation", "perp", "lo", "hi", "slack")
+
+    def __init__(self, wall: str, rotation: float, perp: float, lo: float, hi: float, slack: float):
+        self.wall = wall
+        self.rotation = rotation
+        self.perp = perp
+        self.lo = lo
+        self.hi = hi
+        self.slack = slack
+
+    def along_axis(self) -> int:
+        """Локальная ось предмета (0 — x, 1 — y), идущая вдоль стены."""
+        along = WALL_AXES[self.wall][0]
+        return along if round(self.rotation) % 180 == 0 else 1 - along
+
+
+def wall_slots(
+    intervals: WallIntervals,
+    rules: ItemRules,
+    room: Room,
+    sx: float,
+    sy: float,
+    sz: float,
+) -> List[WallSlot]:
+    """
+    Перебирает стены и совместимые с ними повороты (нужная грань —
+    к стене) и возвращает все свободные слоты. Габарит берётся вместе с
+    free_side полосами, занятые участки — по AABB предметов и их зон,
+    поэтому слот заведомо не пересекает уже поставленное.
+    """
+    if sz > room.height:
+        return []
+
+    bounds = _bounds(room)
+    cz = rules.center_z(room, sz)
+    z0, z1 = cz - sz / 2, cz + sz / 2
+    if rules.free_sides:
+        z0, z1 = min(z0, room.z_min), max(z1, room.z_min + HUMAN_SIZE[2])
+
+    faces = SIDES if rules.wall_side == "any" else (rules.wall_side,)
+    slots = []
+
+    for wall in rules.walls:
+        along, perp, inward = WALL_AXES[wall]
+        for face in faces:
+            rot = (WALL_NORMAL_DEG[wall] - SIDE_NORMAL_DEG[face]) % 360.0
+            ext = [float(v[0]) for v in footprint_extents(rules, sx, sy, np.array([rot]))]
+            lo_a, hi_a = ext[2 * along], ext[2 * along + 1]
+            lo_p, hi_p = ext[2 * perp], ext[2 * perp + 1]
+            half = half_extents(np.array([sx, sy]), np.array([rot]))
+            h_a, h_p = float(half[along][0]), float(half[perp][0])
+
+            # полосы не должны уходить за грань, прижатую к стене
+            behind = -lo_p if inward > 0 else hi_p
+            if behind > h_p + 1e-9:
+                continue
+
+            center_p = _wall_coord(room, wall) + inward * (h_p + WALL_MARGIN)
+            reach = h_p + WALL_MARGIN + (hi_p if inward > 0 else -lo_p)
+            room_lo, room_hi = bounds[perp]
+            if reach > room_hi - room_lo:
+                continue
+
+            a_min, a_max = bounds[along]
+            for a, b in intervals.free(wall, a_min, a_max, reach, z0, z1):
+                lo, hi = a - lo_a, b - hi_a
+                if lo > hi:
+                    continue
+
+                slack = hi - lo
+                if not rules.in_corner:
+                    slots.append(WallSlot(wall, rot, center_p, lo, hi, slack))
+                    continue
+
+                # в углу: боковая грань вплотную к соседней стене
+                if lo_a >= -h_a - 1e-9 and abs(a - a_min) < 1e-9:
+                    c = a_min + h_a + WALL_MARGIN
+                    if lo <= c <= hi:
+                        slots.append(WallSlot(wall, rot, center_p, c, c, slack))
+                if hi_a <= h_a + 1e-9 and abs(b - a_max) < 1e-9:
+                    c = a_max - h_a - WALL_MARGIN
+                    if lo <= c <= hi:
+                        slots.append(WallSlot(wall, rot, center_p, c, c, slack))
+
+    return slots
+
+
+def sample_slot_size(
+    intervals: WallIntervals,
+    rules: ItemRules,
+    room: Room,
+    min_size: Tuple[float, float, float],
+    upper: Tuple[float, float, float],
+) -> Optional[Tuple[float, float, float]]:
+    """
+    Размер предмета у стены, подобранный под один из свободных слотов:
+    слоты ищутся для минимального размера, слот выбирается по его запасу,
+    вдоль стены размер берётся из [min, min + запас слота] (там предмет
+    по длине заведомо помещается), по остальным осям — из [min, upper].
+    None — даже минимальный предмет ни в один слот не встаёт.
+    """
+    slots = wall_slots(intervals, rules, room, *min_size)
+    if not slots:
+        return None
+
+    rng = make_rng()
+    weights = np.array([s.slack for s in slots]) + 1e-3
+    slot = slots[rng.choice(len(slots), p=weights / weights.sum())]
+
+    hi = list(upper)
+    axis = slot.along_axis()
+    hi[axis] = min(hi[axis], min_size[axis] + slot.slack)
+    return tuple(float(rng.uniform(lo, max(lo, h))) for lo, h in zip(min_size, hi))
+
+
+def sample_wall_slots(
+    intervals: WallIntervals,
+    rules: ItemRules,
+    room: Room,
+    sx: float,
+    sy: float,
+    sz: float,
+    k: int = BATCH_SIZE,
+) -> Optional[Candidates]:
+    """
+    k кандидатов прямо из свободных слотов (вероятность слота —
+    по длине его отрезка). None — слотов нет.
+    """
+    slots = wall_slots(intervals, rules, room, sx, sy, sz)
+    if not slots:
+        return None
+
+    rng = make_rng()
+    weights = np.array([s.hi - s.lo for s in slots]) + 1e-3
+    pick = rng.choice(len(slots), size=k, p=weights / weights.sum())
+    t = rng.uniform(0.0, 1.0, k)
+
+    cx, cy, rot = np.empty(k), np.empty(k), np.empty(k)
+    walls = []
+    for n, s in enumerate(pick):
+        slot = slots[s]
+        pos = slot.lo + t[n] * (slot.hi - slot.lo)
+        along = WALL_AXES[slot.wall][0]
+        if along == 0:
+            cx[n], cy[n] = pos, slot.perp
+        else:
+            cx[n], cy[n] = slot.perp, pos
+        rot[n] = slot.rotation
+        walls.append(slot.wall)
+
+    cz = rules.center_z(room, sz)
+    return Candidates(cx, cy, cz, rot, walls, np.ones(k, dtype=bool), sx, sy, sz)
@@ -1,19 +1,18 @@
 import json
 import subprocess
 import sys
-import time
 from pathlib import Path
 
 # ============================================================
 # НАСТРОЙКИ ПУТЕЙ
 # ============================================================
 
-CUBE_SCRIPT = "src/Plasement/CubePlacement.py"
-VIS_SCRIPT = "src/Plasement/VisualizePlacement.py"
+PLACEMENT_PACKAGE = "src/Plasement"  # точка входа: src/Plasement/__main__.py
 FURNITURE_DB = "src/data/input/furniture_types.json"
 OBJECTS_JSON = "src/data/input/objects.json"
 
 MAX_ATTEMPTS = 30  # сколько раз пытаться пересобрать сцену
+INFEASIBLE_EXIT_CODE = 3  # CubePlacement: запрос заведомо невыполним — повторять бессмысленно
 
 
 # ============================================================
@@ -25,7 +24,9 @@ def load_furniture_db():
         data = json.load(f)
 
     db = {item["name"]: item for item in data["items"]}
-    return db
+    # шаблоны жёстких групп (кровать + тумбочки, стол + стулья) — groups.py
+    groups = data.get("groups", [])
+    return db, groups
 
 
 # ============================================================
@@ -33,7 +34,7 @@ def load_furniture_db():
 # ============================================================
 
 def generate_objects_json(requested_names):
-    db = load_furniture_db()
+    db, groups = load_furniture_db()
 
     items = []
 
@@ -50,8 +51,10 @@ def generate_objects_json(requested_names):
             "color": [0.7, 0.7, 0.7],
             "constraints": src.get("constraints", {})
         })
+        if src.get("mesh"):
+            items[-1]["mesh"] = src["mesh"]
 
-    data = {"items": items}
+    data = {"items": items, "groups": groups}
 
     with open(OBJECTS_JSON, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2, ensure_ascii=False)
@@ -64,30 +67,27 @@ def generate_objects_json(requested_names):
 # ============================================================
 
 def run_pipeline():
-    for attempt in range(1, MAX_ATTEMPTS + 1):
-        print(f"\n========== ПОПЫТКА {attempt} ==========")
-
-        try:
-            # ✅ ВСЕГДА ИСПОЛЬЗУЕМ ТОТ ЖЕ PYTHON, ЧТО ЗАПУСТИЛ ЭТОТ ФАЙЛ
-            subprocess.run(
-                [sys.executable, CUBE_SCRIPT],
-                check=True
-            )
-
-            subprocess.run(
-                [sys.executable, VIS_SCRIPT],
-                check=True
-            )
-
-            print("\n✅ УСПЕХ! СЦЕНА СОБРАНА И ПРОХОДЫ КОРРЕКТНЫ")
-            return
-
-        except subprocess.CalledProcessError:
-            print("⚠️ Неудачная попытка, пересборка...")
-            time.sleep(0.2)
-
-    print("\n❌ НЕ УДАЛОСЬ СОБРАТЬ КОРРЕКТНУЮ СЦЕНУ")
-    sys.exit(1)
+    # попытки пересборки идут внутри одного процесса (run_placement),
+    # без повторного старта интерпретатора и парсинга GLB
+    try:
+        # ✅ ВСЕГДА ИСПОЛЬЗУЕМ ТОТ ЖЕ PYTHON, ЧТО ЗАПУСТИЛ ЭТОТ ФАЙЛ
+        subprocess.run(
+            [
+                sys.executable, PLACEMENT_PACKAGE,
+                "--items", OBJECTS_JSON,
+                "--attempts", str(MAX_ATTEMPTS),
+                "--render",
+            ],
+            check=True
+        )
+    except subprocess.CalledProcessError as e:
+        if e.returncode == INFEASIBLE_EXIT_CODE:
+            print("\n❌ ЗАПРОС НЕВЫПОЛНИМ — ПОВТОРЫ НЕ ПОМОГУТ")
+        else:
+            print("\n❌ НЕ УДАЛОСЬ СОБРАТЬ КОРРЕКТНУЮ СЦЕНУ")
+        sys.exit(1)
+
+    print("\n✅ УСПЕХ! СЦЕНА СОБРАНА И ПРОХОДЫ КОРРЕКТНЫ")
 
 
 # ============================================================
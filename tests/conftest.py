@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# модули src/Plasement импортируют друг друга плоско, как при запуске python src/Plasement
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "Plasement"))
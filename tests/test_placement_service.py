@@ -0,0 +1,128 @@
+import asyncio
+import json
+
+import pytest
+
+from placement_service import PlacementService, WarmState
+
+
+# ============================================================
+# HTTP-КЛИЕНТ К СЕРВИСУ НА СВОБОДНОМ ПОРТУ
+# ============================================================
+
+def request(method: str, path: str, body=None, patch=None):
+    """
+    Поднимает сервис (один воркер) на свободном порту, шлёт один запрос
+    и возвращает (статус, JSON ответа). patch(service) — подмена перед запросом.
+    """
+    if body is None:
+        raw = b""
+    elif isinstance(body, bytes):
+        raw = body
+    else:
+        raw = json.dumps(body).encode("utf-8")
+
+    async def go():
+        service = PlacementService(WarmState(), workers=1)
+        if patch is not None:
+            patch(service)
+        server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(
+                f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(raw)}\r\n\r\n".encode("latin-1")
+                + raw
+            )
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+
+        head, _, payload = response.partition(b"\r\n\r\n")
+        return int(head.split()[1]), json.loads(payload)
+
+    return asyncio.run(go())
+
+
+# ============================================================
+# 200
+# ============================================================
+
+def test_health():
+    status, payload = request("GET", "/health")
+    assert status == 200
+    assert payload["status"] == "ok"
+
+
+def test_place_ok():
+    status, payload = request("POST", "/place", {"items": ["nightstand", "wardrobe"], "seed": 1, "timeout_s": 30})
+    assert status == 200
+    assert sorted(item["name"] for item in payload["items"]) == ["nightstand", "wardrobe"]
+    assert payload["complete"] is True
+
+
+# ============================================================
+# 400 — ОШИБКА ФОРМЫ ЗАПРОСА
+# ============================================================
+
+@pytest.mark.parametrize("body", [
+    b"{not json",
+    [1, 2],
+    {"items": []},
+    {"items": ["no_such_item"]},
+    {"items": ["chair"], "seed": "1"},
+    {"items": ["chair"], "timeout_s": [1]},
+    {"items": ["chair"], "timeout_s": "5"},
+    {"items": ["chair"], "timeout_s": 0},
+    {"items": ["chair"], "timeout_s": -1},
+    {"items": ["chair"], "timeout_s": True},
+    {"items": ["chair"], "openings": {"door": 1}},
+    {"items": ["chair"], "room": ["a.glb"]},
+    {"items": [{"name": "box", "min_size_mm": [1, 2], "max_size_mm": [1, 2, 3]}]},
+])
+def test_place_malformed(body):
+    status, payload = request("POST", "/place", body)
+    assert status == 400
+    assert payload["error"]
+
+
+def test_place_nan_timeout():
+    # json.loads пропускает NaN — бесконечный или нечисловой таймаут не должен дойти до очереди
+    status, _ = request("POST", "/place", b'{"items": ["chair"], "timeout_s": NaN}')
+    assert status == 400
+
+
+@pytest.mark.parametrize("body", [
+    {"item": "no_such_item"},
+    {"item": "chair", "limit": 0},
+    {"item": "chair", "size_mm": [500, 500]},
+    {"item": "chair", "timeout_s": -2},
+])
+def test_capacity_malformed(body):
+    status, _ = request("POST", "/capacity", body)
+    assert status == 400
+
+
+# ============================================================
+# 500 / 504
+# ============================================================
+
+def test_unexpected_error():
+    def patch(service):
+        def broken(requested):
+            raise ZeroDivisionError("boom")
+        service.state.build_objects = broken
+
+    status, payload = request("POST", "/place", {"items": ["chair"]}, patch=patch)
+    assert status == 500
+    assert "ZeroDivisionError" in payload["error"]
+
+
+def test_timeout():
+    status, payload = request("POST", "/place", {"items": ["chair"], "seed": 1, "timeout_s": 1e-6})
+    assert status == 504
+    assert payload["error"]